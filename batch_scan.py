@@ -0,0 +1,35 @@
+from __future__ import annotations
+from models.BatchScanner import BatchScanner, RULES
+import argparse
+import time
+
+# scans all OHLC csv files of a directory or glob for impulses, leading diagonals and corrections and writes all hits
+# to one Parquet (or Arrow IPC, e.g. hits.arrow) file, e.g.
+#   python batch_scan.py data --output hits.parquet --up-to 6 --cache scans.sqlite
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan many symbols for Elliott wave patterns.')
+    parser.add_argument('paths', help='directory or glob pattern of csv files with Date, Low and High')
+    parser.add_argument('--output', default='hits.parquet', help='.parquet or .arrow / .feather / .ipc file')
+    parser.add_argument('--rules', nargs='+', default=list(RULES), choices=list(RULES))
+    parser.add_argument('--up-to', type=int, default=6, help='skip limit per wave')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes, defaults to the CPUs')
+    parser.add_argument('--cache', default=None, help='SQLite file to keep the results for the next run')
+    args = parser.parse_args()
+
+    scanner = BatchScanner(args.paths, rules=tuple(args.rules), up_to=args.up_to, workers=args.workers,
+                           cache=args.cache)
+
+    start = time.perf_counter()
+    hits = scanner.scan()
+    duration = time.perf_counter() - start
+
+    BatchScanner.write(hits, args.output)
+    print(f'{len(hits)} hits in {len(scanner.paths)} symbols written to {args.output} '
+          f'({len(scanner.paths) / duration:.2f} symbols/s)')
+
+
+if __name__ == '__main__':
+    # the worker processes import this module, with the spawn start method the scan must not run again
+    main()
@@ -0,0 +1,315 @@
+from __future__ import annotations
+from models.MonoWave import MonoWaveUp
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveOptions import WaveOptionsGenerator5
+from models.WavePattern import WavePattern
+from models.WaveRules import Impulse
+from models.functions import hi, lo, next_hi, next_lo
+import numpy as np
+import pandas as pd
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# Benchmarks of the kernels, the searches and the rule evaluation on the bundled csv files and on seeded random walks.
+# Run from the root of the repository:
+#
+#   python -m benchmarks.run_benchmarks                       # compare with benchmarks/baseline.json
+#   python -m benchmarks.run_benchmarks --sizes 1000 1000000  # other random walk lengths
+#   python -m benchmarks.run_benchmarks --save-baseline       # store the results as new baseline
+#
+# Every benchmark is timed after a warm-up run (numba compilation). A measurement repeats the run until it took at
+# least --min-seconds, so benchmarks of a few microseconds are not dominated by timer noise, and the mean time per run
+# of the best of --repeat measurements is reported together with the throughput and the peak memory of a separate run
+# under tracemalloc. The exit code is 1 if a benchmark is slower or needs more memory than the baseline by more than
+# --tolerance.
+#
+# The times of baseline.json are specific to the machine it was saved on (see its '_about' entry). On another
+# machine save a baseline of the unchanged code first and compare against that one.
+
+BENCHMARK_DIR = os.path.dirname(__file__)
+DATA_DIR = os.path.join(BENCHMARK_DIR, '..', 'data')
+BASELINE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+
+SIZES = [1000, 10000, 100000, 1000000]
+MIN_SECONDS = 0.1  # minimal duration of a measurement
+
+
+def random_walk(n: int, seed: int = 42) -> pd.DataFrame:
+    """
+    seeded random walk with the columns of the bundled csv files
+
+    :param n: number of candles
+    :param seed:
+    :return:
+    """
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = closes * rng.uniform(0, 0.01, n)
+    return pd.DataFrame({'Date': pd.date_range('2000-01-01', periods=n, freq='min').astype(str),
+                         'Open': closes, 'High': closes + spread, 'Low': closes - spread, 'Close': closes})
+
+
+def datasets(sizes: list) -> dict:
+    data = {'btc': pd.read_csv(os.path.join(DATA_DIR, 'btc-usd_1d.csv')),
+            'aapl': pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))}
+    for size in sizes:
+        data[f'random_walk_{size}'] = random_walk(size)
+    return data
+
+
+# a benchmark gets a dataframe and returns (run, units, unit, setup): run() is timed, units / seconds is the
+# throughput. setup() is called before every run without being timed, e.g. to start a search with empty caches
+
+def bench_hi_lo(df: pd.DataFrame):
+    lows, highs = np.array(df['Low'], dtype=np.float64), np.array(df['High'], dtype=np.float64)
+
+    def run():
+        # chain of MonoWaves over the whole series, alternating hi and lo
+        idx = 0
+        while idx < len(lows) - 1:
+            _, idx = hi(lows, highs, idx)
+            _, idx = lo(lows, highs, idx)
+            idx += 1
+
+    return run, len(lows), 'candles', None
+
+
+def bench_next_hi_lo(df: pd.DataFrame):
+    lows, highs = np.array(df['Low'], dtype=np.float64), np.array(df['High'], dtype=np.float64)
+
+    def run():
+        idx, high = 0, highs[0]
+        while True:
+            high, high_idx = next_hi(lows, highs, idx, high)
+            if high_idx is None:
+                break
+            low, low_idx = next_lo(lows, highs, high_idx, lows[high_idx])
+            if low_idx is None:
+                break
+            idx, high = low_idx, highs[low_idx]
+
+    return run, len(lows), 'candles', None
+
+
+def bench_monowave_up(df: pd.DataFrame):
+    lows, highs, dates = np.array(df['Low']), np.array(df['High']), np.array(df['Date'])
+    starts = np.linspace(0, len(lows) - 2, 1000).astype(int)
+
+    def run():
+        for idx_start in starts:
+            MonoWaveUp(lows, highs, dates, int(idx_start), skip=2)
+
+    return run, len(starts), 'monowaves', None
+
+
+def bench_wave_analyzer(df: pd.DataFrame):
+    def run():
+        WaveAnalyzer(df=df)
+
+    return run, len(df), 'candles', None
+
+
+def bench_find_impulsive_wave(df: pd.DataFrame):
+    wa = WaveAnalyzer(df=df, cache_bytes=0)
+    idx_start = int(np.argmin(wa.lows[:200]))
+    options = WaveOptionsGenerator5(4).options_sorted
+
+    def run():
+        for wave_options in options:
+            wa.find_impulsive_wave(idx_start=idx_start, wave_config=wave_options.values)
+
+    return run, len(options), 'options', None
+
+
+def bench_find_impulsive_waves(df: pd.DataFrame):
+    wa = WaveAnalyzer(df=df)
+    idx_start = int(np.argmin(wa.lows[:200]))
+
+    def run():
+        for _ in wa.find_impulsive_waves(idx_start=idx_start, up_to=6):
+            pass
+
+    return run, WaveOptionsGenerator5(6).number, 'options', wa.invalidate
+
+
+def bench_check_rule(df: pd.DataFrame):
+    wa = WaveAnalyzer(df=df)
+    patterns = list()
+    for idx_start in wa.pivot_index.swing_lows[:20]:
+        patterns.extend(WavePattern(waves) for _, waves in wa.find_impulsive_waves(int(idx_start), up_to=4))
+    impulse = Impulse('impulse')
+
+    def run():
+        for pattern in patterns:
+            pattern.check_rule(impulse)
+
+    return run, len(patterns), 'patterns', None
+
+
+def bench_next_cycle(df: pd.DataFrame):
+    wa = WaveAnalyzer(df=df)
+    wa.set_combinatorial_limits(5, 5)
+    idx_start = int(np.argmin(wa.lows[:200]))
+
+    def run():
+        list(wa.next_cycle(idx_start))
+
+    return run, WaveOptionsGenerator5(5).number, 'options', wa.invalidate
+
+
+def bench_waveoptions_generator(df: pd.DataFrame = None):
+    def run():
+        WaveOptionsGenerator5(15).options_sorted
+
+    return run, WaveOptionsGenerator5(15).number, 'options', None
+
+
+BENCHMARKS = {'hi_lo': bench_hi_lo,
+              'next_hi_lo': bench_next_hi_lo,
+              'monowave_up': bench_monowave_up,
+              'wave_analyzer': bench_wave_analyzer,
+              'find_impulsive_wave': bench_find_impulsive_wave,
+              'find_impulsive_waves': bench_find_impulsive_waves,
+              'check_rule': bench_check_rule,
+              'next_cycle': bench_next_cycle}
+
+# benchmarks which do not depend on the data
+GLOBAL_BENCHMARKS = {'waveoptions_generator5': bench_waveoptions_generator}
+
+
+def measure(benchmark, df: pd.DataFrame = None, repeat: int = 3, min_seconds: float = MIN_SECONDS) -> dict:
+    """
+    :return: seconds per run (best of repeat measurements of at least min_seconds), throughput in units per second and
+             peak memory of a run in bytes
+    """
+    run, units, unit, setup = benchmark(df)
+    setup = setup or (lambda: None)
+
+    setup()
+    run()  # warm-up, e.g. numba compilation
+
+    seconds = min(timed(run, setup, min_seconds) for _ in range(repeat))
+
+    setup()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': seconds, 'throughput': units / seconds if seconds > 0 else float('inf'), 'unit': unit,
+            'peak_bytes': peak}
+
+
+def timed(run, setup, min_seconds: float = 0) -> float:
+    """
+    :return: mean seconds of the runs of a measurement which repeats run until it took at least min_seconds, the
+             time of setup is not counted
+    """
+    total, runs = 0.0, 0
+    while runs == 0 or total < min_seconds:
+        setup()
+        start = time.perf_counter()
+        run()
+        total += time.perf_counter() - start
+        runs += 1
+    return total / runs
+
+
+def run_benchmarks(sizes: list = None, names: list = None, repeat: int = 3, min_seconds: float = MIN_SECONDS) -> dict:
+    """
+    :param sizes: lengths of the random walks, defaults to SIZES
+    :param names: only run the benchmarks whose name contains one of these
+    :param repeat:
+    :param min_seconds: minimal duration of a measurement
+    :return: results by '<benchmark>/<dataset>'
+    """
+    def selected(name):
+        return not names or any(part in name for part in names)
+
+    results = dict()
+    for name, benchmark in GLOBAL_BENCHMARKS.items():
+        if selected(name):
+            results[name] = measure(benchmark, repeat=repeat, min_seconds=min_seconds)
+            report(name, results[name])
+
+    for data_name, df in datasets(SIZES if sizes is None else sizes).items():
+        for name, benchmark in BENCHMARKS.items():
+            if selected(name):
+                key = f'{name}/{data_name}'
+                results[key] = measure(benchmark, df, repeat=repeat, min_seconds=min_seconds)
+                report(key, results[key])
+
+    return results
+
+
+def report(key: str, result: dict):
+    print(f"{key:<45} {result['seconds'] * 1e3:>12.3f} ms {result['throughput']:>14.1f} {result['unit']}/s "
+          f"{result['peak_bytes'] / 2**20:>10.2f} MiB", flush=True)
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.3) -> list:
+    """
+    :param results: as returned by run_benchmarks
+    :param baseline: former results
+    :param tolerance: allowed relative increase of time and peak memory (on top of a small absolute slack)
+    :return: messages of the regressions, benchmarks missing in the baseline are ignored
+    """
+    regressions = list()
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+
+        for metric, slack in [('seconds', 1e-4), ('peak_bytes', 2**20)]:
+            before, after = baseline[key][metric], result[metric]
+            # the absolute slack keeps timer and allocator noise of tiny benchmarks from being reported
+            if after > before * (1 + tolerance) + slack:
+                increase = after / before - 1 if before else float('inf')
+                regressions.append(f'{key}: {metric} {before:.6g} -> {after:.6g} (+{increase:.0%})')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks of ElliottWaveAnalyzer.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='lengths of the random walks')
+    parser.add_argument('--filter', nargs='+', default=None, help='only run benchmarks containing these names')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS, help='minimal duration of a measurement')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.3)
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as baseline')
+    parser.add_argument('--output', default=None, help='json file for the results')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.filter, args.repeat, args.min_seconds)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = dict()
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        baseline['_about'] = {'note': 'times are specific to this machine, save a new baseline on another one',
+                              'machine': platform.machine(), 'processor': platform.processor(),
+                              'cpus': os.cpu_count(), 'python': platform.python_version()}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f'baseline saved to {args.baseline}')
+
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            sys.exit(1)
+        print('no regressions')
@@ -3,45 +3,52 @@ from models.WavePattern import WavePattern
 from models.WaveRules import Impulse, LeadingDiagonal
 from models.WaveAnalyzer import WaveAnalyzer
 from models.WaveOptions import WaveOptionsGenerator5
-from models.helpers import plot_pattern
+from models.ChartRenderer import ChartRenderer
 import pandas as pd
 import numpy as np
 import yfinance as yf
 from pprint import pprint
 
-# end_date = pd.Timestamp.now()
-# start_date = end_date - pd.DateOffset(days=360)
-# df = yf.download('MSFT', start=start_date, end=end_date)
+if __name__ == '__main__':
+    # the chart workers import this module, with the spawn start method the search must not run again
 
-df = pd.read_csv(r'data\btc-usd_1d.csv')
-idx_start = np.argmin(np.array(list(df['Low'])))
+    # end_date = pd.Timestamp.now()
+    # start_date = end_date - pd.DateOffset(days=360)
+    # df = yf.download('MSFT', start=start_date, end=end_date)
 
-wa = WaveAnalyzer(df=df, verbose=False) # .reset_index()
-wave_options_impulse = WaveOptionsGenerator5(up_to=15)  # generates WaveOptions up to [15, 15, 15, 15, 15]
+    df = pd.read_csv(r'data\btc-usd_1d.csv')
+    idx_start = np.argmin(np.array(list(df['Low'])))
 
-impulse = Impulse('impulse')
-leading_diagonal = LeadingDiagonal('leading diagonal')
-rules_to_check = [impulse, leading_diagonal]
+    wa = WaveAnalyzer(df=df, verbose=False) # .reset_index()
+    wave_options_impulse = WaveOptionsGenerator5(up_to=15)  # generates WaveOptions up to [15, 15, 15, 15, 15]
 
-print(f'Start at idx: {idx_start}')
-print(f"will run up to {wave_options_impulse.number / 1e6}M combinations.")
+    impulse = Impulse('impulse')
+    leading_diagonal = LeadingDiagonal('leading diagonal')
+    rules_to_check = [impulse, leading_diagonal]
 
-# set up a set to store already found wave counts
-# it can be the case, that 2 WaveOptions lead to the same WavePattern.
-# This can be seen in a chart, where for example we try to skip more maxima as there are. In such a case
-# e.g. [1,2,3,4,5] and [1,2,3,4,10] will lead to the same WavePattern (has same sub-wave structure, same begin / end,
-# same high / low etc.
-# If we find the same WavePattern, we skip and do not plot it
+    print(f'Start at idx: {idx_start}')
+    print(f"will run up to {wave_options_impulse.number / 1e6}M combinations.")
 
-wavepatterns_up = set()
+    # set up a set to store already found wave counts
+    # it can be the case, that 2 WaveOptions lead to the same WavePattern.
+    # After a tie (a later candle reaches the extreme a wave ends on but does not exceed it) every larger skip of the
+    # wave ends on the same extreme, e.g. [1,2,3,4,5] and [1,2,3,4,10] then lead to the same WavePattern (same
+    # sub-wave structure, same begin / end, same high / low etc.).
+    # find_impulsive_waves does not walk the skips past such a repetition, only few duplicates are left (e.g. skip 1
+    # repeating skip 0). If we find the same WavePattern (same wave indices, see WavePattern.nodes), we skip and do
+    # not plot it.
+    # For scans with millions of patterns, a PatternFilter keeps the memory of this set bounded.
 
-# loop over all combinations of wave options [i,j,k,l,m] for impulsive waves sorted from small, e.g.  [0,1,...] to
-# large e.g. [3,2, ...]
-for new_option_impulse in wave_options_impulse.options_sorted:
+    wavepatterns_up = set()
 
-    waves_up = wa.find_impulsive_wave(idx_start=idx_start, wave_config=new_option_impulse.values)
+    # the charts are written in background processes, so the search does not wait for the image export
+    renderer = ChartRenderer(df)
+
+    # loop over all combinations of wave options [i,j,k,l,m] for impulsive waves sorted from small, e.g.  [0,1,...] to
+    # large e.g. [3,2, ...]. The depth-first search only returns options for which all 5 waves exist and builds
+    # the waves of a common prefix, e.g. [3,2,...], only once.
+    for new_option_impulse, waves_up in wa.find_impulsive_waves(idx_start=idx_start, up_to=wave_options_impulse.up_to):
 
-    if waves_up:
         wavepattern_up = WavePattern(waves_up, verbose=True)
 
         for rule in rules_to_check:
@@ -52,4 +59,6 @@ for new_option_impulse in wave_options_impulse.options_sorted:
                 else:
                     wavepatterns_up.add(wavepattern_up)
                     print(f'{rule.name} found: {new_option_impulse.values}')
-                    plot_pattern(df=df, wave_pattern=wavepattern_up, title=str(new_option_impulse))
+                    renderer.submit(wavepattern_up, title=str(new_option_impulse))
+
+    renderer.close()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveRules import Impulse, LeadingDiagonal, Correction
+from models.ScanCache import ScanCache
+from models.ingest import format_date
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import glob
+import os
+
+RULES = {'impulse': Impulse, 'leading_diagonal': LeadingDiagonal, 'correction': Correction}
+
+HIT_COLUMNS = ['symbol', 'rule', 'options', 'nodes', 'idx_start', 'idx_end', 'date_start', 'date_end']
+
+
+def warm_up():
+    """
+    Compiles the numba functions used by scan_file on a tiny series, run once per worker process so the first symbol
+    of every worker is not slowed down by the JIT. The scans take the same path as scan_file, as numba compiles
+    another version of a function for other argument types. The compiled code is cached on disk, so only the first
+    worker compiles.
+
+    :return:
+    """
+    closes = 10 + np.sin(np.arange(40) / 2) + np.arange(40) / 10
+    df = pd.DataFrame({'Date': [str(i) for i in range(40)], 'Low': closes - 0.1, 'High': closes + 0.1})
+    wa = WaveAnalyzer(df=df)
+    wa.scan_impulsive_waves_from(wa.pivot_index.swing_lows, up_to=2, rules=[Impulse('impulse')], workers=1)
+    wa.scan_corrective_waves_from(wa.pivot_index.swing_highs, up_to=2, rules=[Correction('correction')])
+
+
+def scan_file(path: str, rules: tuple, up_to: int, cache: str = None) -> dict:
+    """
+    Scans one OHLC file (like data/btc-usd_1d.csv) for the rules. Impulses and leading diagonals are searched from
+    every swing low with the compiled scan, corrections from every swing high.
+
+    :param path: csv file with Date, Low and High
+    :param rules: names of RULES
+    :param up_to: skip limit per wave
+    :param cache: SQLite file of a ScanCache to read and store the results, disabled if None
+    :return: dict of HIT_COLUMNS, one entry per hit
+    """
+    symbol = os.path.splitext(os.path.basename(path))[0]
+    result_cache = ScanCache(cache) if cache is not None else None
+    wa = WaveAnalyzer(df=pd.read_csv(path), result_cache=result_cache)
+    hits = {column: list() for column in HIT_COLUMNS}
+
+    def add(rule, options, nodes):
+        hits['symbol'].append(symbol)
+        hits['rule'].append(rule)
+        hits['options'].append([int(skip) for skip in options])
+        hits['nodes'].append([int(node) for node in nodes])
+        hits['idx_start'].append(int(nodes[0]))
+        hits['idx_end'].append(int(nodes[-1]))
+        hits['date_start'].append(format_date(wa.dates[nodes[0]]))
+        hits['date_end'].append(format_date(wa.dates[nodes[-1]]))
+
+    impulse_rules = [rule for rule in rules if rule in ['impulse', 'leading_diagonal']]
+    if impulse_rules:
+        options, nodes, matches = wa.scan_impulsive_waves_from(wa.pivot_index.swing_lows, up_to=up_to,
+                                                               rules=[RULES[rule](rule) for rule in impulse_rules],
+                                                               workers=1)
+        for i in range(len(options)):
+            for r, rule in enumerate(impulse_rules):
+                if matches[i, r]:
+                    add(rule, options[i], nodes[i])
+
+    if 'correction' in rules:
+        options, nodes, _ = wa.scan_corrective_waves_from(wa.pivot_index.swing_highs, up_to=up_to,
+                                                          rules=[Correction('correction')])
+        for i in range(len(options)):
+            add('correction', options[i], nodes[i])
+
+    if result_cache is not None:
+        result_cache.close()
+    return hits
+
+
+class BatchScanner:
+    """
+    Scans many symbols, e.g. all csv files of a directory, for impulses, leading diagonals and corrections in a pool
+    of worker processes. The hits of all symbols are collected in one table and can be written as Parquet or Arrow
+    IPC file (needs pyarrow).
+    """
+    def __init__(self,
+                 paths: str,
+                 rules: tuple = ('impulse', 'leading_diagonal', 'correction'),
+                 up_to: int = 6,
+                 workers: int = None,
+                 cache: str = None):
+        """
+        :param paths: directory, glob pattern (e.g. 'data/*.csv') or list of files
+        :param rules: names of RULES to scan for
+        :param up_to: skip limit per wave
+        :param workers: number of processes, defaults to the number of CPUs
+        :param cache: SQLite file of a ScanCache shared by the workers, e.g. to rescan only the new candles of the
+                      symbols in the next run, disabled if None
+        """
+        for rule in rules:
+            if rule not in RULES:
+                raise ValueError(f'Unknown rule {rule}, use one of {list(RULES)}.')
+
+        if isinstance(paths, str):
+            pattern = os.path.join(paths, '*.csv') if os.path.isdir(paths) else paths
+            paths = sorted(glob.glob(pattern))
+
+        self.paths = list(paths)
+        self.rules = tuple(rules)
+        self.up_to = up_to
+        self.workers = workers or os.cpu_count()
+        self.cache = cache
+
+    def scan(self) -> pd.DataFrame:
+        """
+        :return: one row per hit with HIT_COLUMNS, in the order of the files
+        """
+        hits = {column: list() for column in HIT_COLUMNS}
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=warm_up) as executor:
+            for file_hits in executor.map(scan_file, self.paths, [self.rules] * len(self.paths),
+                                          [self.up_to] * len(self.paths), [self.cache] * len(self.paths)):
+                for column in HIT_COLUMNS:
+                    hits[column].extend(file_hits[column])
+
+        return pd.DataFrame(hits, columns=HIT_COLUMNS)
+
+    @staticmethod
+    def write(hits: pd.DataFrame, path: str):
+        """
+        Writes the hits as Parquet file or, for the suffixes .arrow, .feather and .ipc, as Arrow IPC file
+
+        :param hits: as returned by scan
+        :param path:
+        :return:
+        """
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError('Writing the hits needs pyarrow, install it via pip install pyarrow.')
+
+        schema = pa.schema([('symbol', pa.string()),
+                            ('rule', pa.string()),
+                            ('options', pa.list_(pa.int8())),
+                            ('nodes', pa.list_(pa.int64())),
+                            ('idx_start', pa.int64()),
+                            ('idx_end', pa.int64()),
+                            ('date_start', pa.string()),
+                            ('date_end', pa.string())])
+        table = pa.Table.from_pandas(hits, schema=schema, preserve_index=False)
+
+        if os.path.splitext(path)[1] in ['.arrow', '.feather', '.ipc']:
+            with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(table)
+        else:
+            import pyarrow.parquet as pq
+            pq.write_table(table, path)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+from models.helpers import chart_figure, chart_points, wave_trace, write_figure
+from concurrent.futures import ProcessPoolExecutor
+import plotly.colors
+import pandas as pd
+import os
+
+# figure of a worker process: the OHLC trace of the dataframe, built once, and the trace of the hit, updated per hit
+_figure = None
+
+
+def _init_worker(df: pd.DataFrame):
+    global _figure
+    _figure = chart_figure(df, [wave_trace([], [])])
+
+
+def _render(points: tuple, title: str, path: str) -> str:
+    dates, values, labels = points
+    _figure.data[1].update(x=dates, y=values, text=labels)
+    _figure.update_layout(title=title)
+    write_figure(_figure, path)
+    return path
+
+
+class ChartRenderer:
+    """
+    Renders the charts of many hits in a pool of worker processes, so a scan does not wait for the image export
+    (kaleido takes far longer per chart than the search of a pattern). submit only queues the points of a hit, every
+    worker builds the OHLC trace of the dataframe once and only replaces the line of the hit for every chart.
+
+    The format is the suffix of the files: png, svg, ... need kaleido, html and json are written by plotly itself and
+    are much faster. overlay draws many hits into one chart instead.
+    """
+    def __init__(self,
+                 df: pd.DataFrame,
+                 directory: str = 'images',
+                 format: str = 'png',
+                 workers: int = None):
+        """
+        :param df: dataframe with the columns Date, Open, High, Low and Close
+        :param directory: directory of the charts, created if it does not exist
+        :param format: file suffix, e.g. 'png', 'html' or 'json'
+        :param workers: number of processes, defaults to the number of CPUs
+        """
+        self.df = df
+        self.directory = directory
+        self.format = format
+        self.workers = workers or os.cpu_count()
+
+        self.futures = list()
+        self.__prefix = pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')
+        self.__executor = None
+
+    def submit(self, wave, title: str = '', filename: str = None):
+        """
+        Queues the chart of a hit and returns at once
+
+        :param wave: MonoWave, WavePattern or WaveCycle
+        :param title:
+        :param filename: name of the file in directory, numbered in the order of submit by default
+        :return: Future of the path of the written file
+        """
+        if self.__executor is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.__executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                  initargs=(self.df, ))
+
+        if filename is None:
+            filename = f'{self.__prefix}_{len(self.futures):06d}.{self.format}'
+        future = self.__executor.submit(_render, chart_points(wave), title, os.path.join(self.directory, filename))
+        self.futures.append(future)
+        return future
+
+    def overlay(self, waves: list, filename: str, title: str = '', names: list = None) -> str:
+        """
+        Draws all waves into one chart over a single OHLC trace, e.g. all hits of a scan in one html file. Every wave
+        gets its own colour and legend entry.
+
+        :param waves: MonoWaves, WavePatterns or WaveCycles
+        :param filename: name of the file in directory, the suffix selects the format
+        :param title:
+        :param names: legend entries of the waves, numbered in the order of waves by default
+        :return: path of the written file
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if names is None:
+            names = [str(i) for i in range(len(waves))]
+        palette = plotly.colors.qualitative.Plotly
+        traces = [wave_trace(*chart_points(wave), name=name, color=palette[i % len(palette)])
+                  for i, (wave, name) in enumerate(zip(waves, names))]
+        figure = chart_figure(self.df, traces, title)
+        figure.update_layout(showlegend=True)
+        path = os.path.join(self.directory, filename)
+        write_figure(figure, path)
+        return path
+
+    def wait(self) -> list:
+        """
+        Waits until all queued charts are written, exceptions of the workers are raised here
+
+        :return: paths of the written files in the order of submit
+        """
+        return [future.result() for future in self.futures]
+
+    def close(self) -> list:
+        """
+        :return: see wait
+        """
+        try:
+            return self.wait()
+        finally:
+            if self.__executor is not None:
+                self.__executor.shutdown()
+                self.__executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
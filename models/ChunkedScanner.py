@@ -0,0 +1,222 @@
+from __future__ import annotations
+from models.MonoWave import MonoWaveUp, MonoWaveDown
+from models.WaveAnalyzer import WaveAnalyzer
+from models.functions import running_min_records
+from models.ingest import open_column, as_prices
+import numpy as np
+import warnings
+
+RECORD_BLOCK_SIZE = 4096  # candles per block of the minima / maxima used to skip through the rest of the history
+MAX_SPAN_WINDOWS = 1  # cap of the estimated max_span in windows, a loaded window has at most 2 cores of candles
+
+
+class ChunkedScanner:
+    """
+    Impulse scan of a history which does not fit into memory next to the search state, e.g. years of minute bars in
+    memory-mapped .npy files. The history is scanned in overlapping windows and only one window is loaded and
+    indexed at a time, so the peak memory depends on the window size and not on the length of the history.
+
+    Every start belongs to the core of exactly one window and the window reaches max_span candles beyond its core. A
+    pattern spanning at most max_span candles therefore lies completely inside the window of its start and is found
+    exactly once. Longer patterns are not returned: dropped counts the ones found by the last scan and a warning is
+    issued if there were any, a larger max_span finds them.
+
+    Whether a MonoWave has an end at all can depend on candles far behind the window: next_lo (next_hi) runs until a
+    candle reaches the previous low (high), two ties make the skip ladder stay at its end. The window is therefore
+    followed by the running minima of the lows and maxima of the highs of the rest of the history (see
+    running_min_records), which answer these searches like the whole history. Everything else they change ends
+    behind the window and is dropped with the patterns longer than max_span, so the hits are exactly the hits of a
+    scan of the whole history spanning at most max_span candles.
+    """
+    def __init__(self,
+                 lows,
+                 highs,
+                 dates,
+                 window: int = 2**16,
+                 up_to: int = 6,
+                 max_span: int = None):
+        """
+        :param lows: path of a .npy file (memory-mapped), numpy array, pandas Series or Arrow array, see open_column
+        :param highs: as lows
+        :param dates: as lows
+        :param window: number of starts per window (the core)
+        :param up_to: skip limit per wave
+        :param max_span: longest pattern in candles, the overlap of the windows. Defaults to estimate_max_span, at
+                         most MAX_SPAN_WINDOWS windows.
+        """
+        if window < 1:
+            raise ValueError('window has to be positive.')
+
+        self.lows = open_column(lows)
+        self.highs = open_column(highs)
+        self.dates = open_column(dates)
+        if not len(self.lows) == len(self.highs) == len(self.dates):
+            raise ValueError('lows, highs and dates need the same length.')
+
+        self.window = window
+        self.up_to = up_to
+
+        # minimum of the lows and maximum of the highs per block of RECORD_BLOCK_SIZE candles
+        self.block_lows, self.block_highs = self.__block_extrema()
+
+        if max_span is None:
+            max_span = min(self.estimate_max_span(), MAX_SPAN_WINDOWS * window)
+        self.max_span = max_span
+
+        # patterns of the last scan which were found but not returned, as they span more than max_span candles
+        self.dropped = 0
+
+    @classmethod
+    def from_npy(cls, path: str, **kwargs) -> ChunkedScanner:
+        """
+        :param path: .npy file of a structured array with the fields Date, Low and High, e.g. a saved
+                     df.to_records(index=False). It is memory-mapped, a window of a column is copied when it is read.
+        :param kwargs: see __init__
+        :return:
+        """
+        records = np.load(path, mmap_mode='r')
+        return cls(records['Low'], records['High'], records['Date'], **kwargs)
+
+    def __len__(self):
+        return len(self.lows)
+
+    def estimate_max_span(self) -> int:
+        """
+        Longest pattern the skip limit allows on the first window: every wave of a pattern is a MonoWave with a skip
+        below up_to, so a pattern spans at most 5 times the longest of these MonoWaves.
+
+        :return:
+        """
+        stop = min(len(self), self.window)
+        wave_analyzer = self.wave_analyzer(0, stop)
+        wave_analyzer.set_combinatorial_limits(self.up_to, self.up_to)
+
+        wave_span = 1
+        for monowave, idx_starts in [(MonoWaveUp, wave_analyzer.pivot_index.swing_lows),
+                                     (MonoWaveDown, wave_analyzer.pivot_index.swing_highs)]:
+            for idx_start in idx_starts:
+                _, indices, valid = wave_analyzer.skip_ladder(monowave, int(idx_start), self.up_to - 1)
+                if valid.any():
+                    wave_span = max(wave_span, int(indices[:self.up_to][valid[:self.up_to]].max()) - int(idx_start))
+
+        return 5 * wave_span
+
+    def windows(self) -> list:
+        """
+        :return: (start, core_start, core_stop, stop) per window, the candles start to stop - 1 are loaded, the
+                 patterns starting in core_start to core_stop - 1 are searched
+        """
+        windows = list()
+        for core_start in range(0, len(self), self.window):
+            core_stop = min(core_start + self.window, len(self))
+            # one candle before the core to decide if core_start is a swing low, one after the overlap to confirm
+            # the end of a pattern reaching to its last candle
+            windows.append((max(core_start - 1, 0), core_start, core_stop,
+                            min(core_stop + self.max_span + 1, len(self))))
+        return windows
+
+    def wave_analyzer(self, start: int, stop: int, records: bool = False) -> WaveAnalyzer:
+        """
+        :param records: append the records of the rest of the history behind stop (see remainder_records)
+        :return: WaveAnalyzer of the candles start to stop - 1, indices are relative to start
+        """
+        lows, highs = as_prices(self.lows[start:stop]), as_prices(self.highs[start:stop])
+        dates = self.dates[start:stop]
+
+        if records and stop < len(self):
+            low_records, high_records = self.remainder_records(stop, lows.min(), highs.max())
+            # the high of a low record (low of a high record) is below the high record before it, so next_hi
+            # (next_lo) passes it like the candles which are left out
+            indices = np.union1d(low_records, high_records)
+            lows = np.concatenate([lows, as_prices(self.lows[indices])])
+            highs = np.concatenate([highs, as_prices(self.highs[indices])])
+            dates = np.concatenate([dates, self.dates[indices]])
+
+        return WaveAnalyzer.from_arrays(lows, highs, dates)
+
+    def remainder_records(self, stop: int, lowest: float, highest: float) -> tuple:
+        """
+        Running minima of the lows and maxima of the highs from stop on (see running_min_records), until the first
+        below lowest (above highest), the low (high) of every wave starting in the window. Blocks which cannot
+        contain a record are skipped.
+
+        :return: (indices of the low records, indices of the high records)
+        """
+        results = list()
+        for column, blocks, sign, floor in [(self.lows, self.block_lows, 1, lowest),
+                                            (self.highs, self.block_highs, -1, highest)]:
+            indices = list()
+            current, ties = np.inf, 0
+            block = stop // RECORD_BLOCK_SIZE
+            start = stop
+            while block < len(blocks):
+                block_stop = min((block + 1) * RECORD_BLOCK_SIZE, len(self))
+                extremum = sign * blocks[block]
+                if extremum < current or extremum == current and ties < 2:
+                    found, current, ties, done = running_min_records(sign * as_prices(column[start:block_stop]),
+                                                                     current, ties, sign * floor)
+                    indices.append(found + start)
+                    if done:
+                        break
+                block += 1
+                start = block_stop
+            results.append(np.concatenate(indices) if indices else np.empty(0, dtype=np.int64))
+
+        return tuple(results)
+
+    def __block_extrema(self) -> tuple:
+        block_lows = np.empty((len(self) + RECORD_BLOCK_SIZE - 1) // RECORD_BLOCK_SIZE)
+        block_highs = np.empty_like(block_lows)
+
+        # read in windows, so a memory-mapped history is not loaded at once
+        step = max(self.window // RECORD_BLOCK_SIZE, 1) * RECORD_BLOCK_SIZE
+        for start in range(0, len(self), step):
+            blocks = np.arange(start, min(start + step, len(self)), RECORD_BLOCK_SIZE) - start
+            first = start // RECORD_BLOCK_SIZE
+            block_lows[first:first + len(blocks)] = np.minimum.reduceat(as_prices(self.lows[start:start + step]),
+                                                                        blocks)
+            block_highs[first:first + len(blocks)] = np.maximum.reduceat(as_prices(self.highs[start:start + step]),
+                                                                         blocks)
+        return block_lows, block_highs
+
+    def iter_impulsive_waves(self, rules: list = None, idx_starts: np.array = None, workers: int = None):
+        """
+        scan_impulsive_waves window by window, e.g. to write the hits of a window before the next one is read. Warns
+        after the last window if patterns longer than max_span were dropped.
+
+        :return: generator of (options, nodes, matches) per window with indices of the whole history
+        """
+        self.dropped = 0
+        for start, core_start, core_stop, stop in self.windows():
+            wave_analyzer = self.wave_analyzer(start, stop, records=True)
+
+            if idx_starts is None:
+                starts = wave_analyzer.pivot_index.swing_lows
+                starts = starts[(starts >= core_start - start) & (starts < core_stop - start)]
+            else:
+                starts = idx_starts[np.searchsorted(idx_starts, core_start):np.searchsorted(idx_starts, core_stop)]
+                starts = starts - start
+
+            options, nodes, matches = wave_analyzer.scan_impulsive_waves_from(starts, up_to=self.up_to, rules=rules,
+                                                                              workers=workers)
+            # waves reaching the appended records end behind the window
+            keep = np.all(nodes < stop - start, axis=1) & (nodes[:, -1] - nodes[:, 0] <= self.max_span)
+            self.dropped += int(len(keep) - keep.sum())
+            yield options[keep], nodes[keep] + start, matches[keep]
+
+        if self.dropped > 0:
+            warnings.warn(f'{self.dropped} patterns spanning more than max_span={self.max_span} candles were dropped, '
+                          f'a larger max_span finds them.')
+
+    def scan_impulsive_waves(self, rules: list = None, idx_starts: np.array = None, workers: int = None) -> tuple:
+        """
+        WaveAnalyzer.scan_impulsive_waves_from for the whole history, window by window
+
+        :param rules: Impulse and / or LeadingDiagonal rules, defaults to both
+        :param idx_starts: sorted indices to start from, defaults to the swing lows
+        :param workers: number of threads per window, defaults to the number of CPUs
+        :return: (options, nodes, matches) of all patterns spanning at most max_span candles, sorted by their start.
+                 The number of longer patterns is kept in dropped, see iter_impulsive_waves.
+        """
+        options, nodes, matches = zip(*self.iter_impulsive_waves(rules, idx_starts, workers))
+        return np.concatenate(options), np.concatenate(nodes), np.concatenate(matches)
@@ -0,0 +1,57 @@
+from __future__ import annotations
+import json
+
+
+class Instrumentation:
+    """
+    Opt-in counters and timings per stage of a scan, e.g. MonoWave construction, the wave2 / wave4 low checks or a
+    single condition of a WaveRule ('impulse.w3_1'). A stage records how often it ran, how often it rejected a
+    candidate and the time spent in it.
+
+    Instrumentation is enabled by passing an instance to WaveAnalyzer (or to WavePattern.check_rule). Disabled, the
+    instrumented code only checks for None, so the overhead is negligible.
+    """
+    def __init__(self):
+        # stage -> [count, rejected, nanoseconds]
+        self.stages = dict()
+
+    def record(self, stage: str, ns: int, rejected: bool = False):
+        """
+        :param stage: name of the stage
+        :param ns: time spent in nanoseconds, e.g. a difference of time.perf_counter_ns()
+        :param rejected: True if the stage rejected the candidate
+        :return:
+        """
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = [0, 0, 0]
+        entry[0] += 1
+        entry[1] += rejected
+        entry[2] += ns
+
+    def reset(self):
+        self.stages.clear()
+
+    def report(self) -> dict:
+        """
+        :return: {stage: {count, rejected, rejection_rate, seconds, mean_us}} sorted by the time spent
+        """
+        report = dict()
+        for stage, (count, rejected, ns) in sorted(self.stages.items(), key=lambda item: -item[1][2]):
+            report[stage] = {'count': count,
+                             'rejected': rejected,
+                             'rejection_rate': rejected / count if count else 0.0,
+                             'seconds': ns / 1e9,
+                             'mean_us': ns / count / 1e3 if count else 0.0}
+        return report
+
+    def to_json(self, path: str = None) -> str:
+        """
+        :param path: optional file to write the report to
+        :return: the report as JSON
+        """
+        report = json.dumps(self.report(), indent=2)
+        if path is not None:
+            with open(path, 'w') as f:
+                f.write(report)
+        return report
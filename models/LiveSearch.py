@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+
+class LiveSearch:
+    """
+    Patterns of a search of a WaveAnalyzer, e.g. find_impulsive_waves from idx_start, which are kept up to date while
+    candles are appended to the WaveAnalyzer (see WaveAnalyzer.extend).
+
+    A MonoWave is final as soon as its end is followed by another candle: the end is confirmed by that candle, so new
+    candles cannot change it anymore. A pattern is final if all its waves are final. Subtrees of the search in which
+    every wave is final are kept in memo and not searched again, only the parts with open waves are re-evaluated.
+    """
+    def __init__(self, wave_analyzer, search: str, idx_start: int, up_to: int = None, rules: list = None):
+        """
+        :param wave_analyzer:
+        :param search: name of the search of the WaveAnalyzer, 'find_impulsive_waves' or 'find_corrective_waves'
+        :param idx_start:
+        :param up_to:
+        :param rules:
+        """
+        self.wave_analyzer = wave_analyzer
+        self.search = search
+        self.idx_start = idx_start
+        self.up_to = up_to
+        self.rules = rules
+
+        self.memo = dict()
+        self.patterns = list()
+        self.update()
+
+    def update(self):
+        """
+        Re-evaluates the open parts of the search, called by WaveAnalyzer.extend
+
+        :return:
+        """
+        search = getattr(self.wave_analyzer, self.search)
+        self.patterns = list(search(self.idx_start, up_to=self.up_to, rules=self.rules, memo=self.memo))
+
+    def reset(self):
+        """
+        Forgets the final subtrees and searches again, e.g. after WaveAnalyzer.invalidate
+
+        :return:
+        """
+        self.memo.clear()
+        self.update()
+
+    @property
+    def final(self) -> list:
+        """
+        :return: for every pattern True if it cannot change anymore
+        """
+        last_idx = len(self.wave_analyzer.lows) - 1
+        return [all(wave.idx_end < last_idx for wave in waves) for _, waves in self.patterns]
+
+    @property
+    def final_patterns(self) -> list:
+        return [pattern for pattern, final in zip(self.patterns, self.final) if final]
+
+    @property
+    def open_patterns(self) -> list:
+        return [pattern for pattern, final in zip(self.patterns, self.final) if not final]
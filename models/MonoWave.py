@@ -3,30 +3,68 @@ import numpy as np
 from models.functions import hi, lo, next_hi, next_lo
 
 class MonoWave:
+    __slots__ = ('lows_arr', 'highs_arr', 'dates_arr', 'skip_n', 'range_index', 'idx_start', 'idx_end', 'count',
+                 'degree', 'date_start', 'date_end', 'low', 'high', 'low_idx', 'high_idx', '__frozen')
+
     def __init__(self,
                  lows: np.array,
                  highs: np.array,
                  dates: np.array,
                  idx_start: int,
-                 skip: int = 0):
+                 skip: int = 0,
+                 range_index=None):
+        """
+        :param range_index: optional RangeIndex of lows and highs to check ranges in find_end in O(1)
+        """
+        object.__setattr__(self, '_MonoWave__frozen', False)
 
         self.lows_arr = lows
         self.highs_arr = highs
         self.dates_arr = dates
         self.skip_n = skip
+        self.range_index = range_index
         self.idx_start = idx_start
-        self.idx_end = int
+        self.idx_end = None
 
-        self.count = int  # the count of the monowave, e.g. 1, 2, A, B, etc
+        self.count = None  # the count of the monowave, e.g. 1, 2, A, B, etc
         self.degree = 1  # 1 = lowest timeframe level, 2 as soon as a e.g. 12345 is found etc.
 
-        self.date_start = str
-        self.date_end = str
+        self.date_start = None
+        self.date_end = None
+
+        self.low = None
+        self.high = None
+        self.low_idx = None
+        self.high_idx = None
+
+    def __setattr__(self, name, value):
+        if self.__frozen:
+            raise AttributeError(f'{type(self).__name__} is frozen, cannot set {name}.')
+        super().__setattr__(name, value)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__attribute_names()}
+
+    def __setstate__(self, state: dict):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    @staticmethod
+    def __attribute_names() -> list:
+        return [f'_MonoWave{name}' if name.startswith('__') else name for name in MonoWave.__slots__]
+
+    def freeze(self):
+        """
+        Makes the MonoWave immutable, e.g. before it is shared by several patterns through a MonoWaveCache
 
-        self.low = float
-        self.high = float
-        self.low_idx = int
-        self.high_idx = int
+        :return: the MonoWave
+        """
+        object.__setattr__(self, '_MonoWave__frozen', True)
+        return self
+
+    @property
+    def frozen(self) -> bool:
+        return self.__frozen
 
     @property
     def labels(self) -> str:
@@ -84,16 +122,21 @@ class MonoWaveUp(MonoWave):
     """
     Describes a upwards movement, which can have [skip_n] smaller downtrends
     """
+    __slots__ = ()
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, end: tuple = None, **kwargs):
+        """
+        :param end: (high, high_idx) of the end if already known, e.g. from a skip ladder (hi_ladder). (None, None)
+                    marks a MonoWave without end. find_end is used otherwise.
+        """
         super().__init__(*args, **kwargs)
 
-        self.high, self.high_idx = self.find_end()
+        self.high, self.high_idx = self.find_end() if end is None else end
         self.low = self.lows_arr[self.idx_start]
         self.low_idx = self.idx_start
         self.idx_end = self.high_idx
         self.date_start = self.dates_arr[self.idx_start]
-        self.date_end = self.dates_arr[self.high_idx]
+        self.date_end = self.dates_arr[self.high_idx] if self.high_idx is not None else None
 
     def find_end(self):
         """
@@ -117,7 +160,11 @@ class MonoWaveUp(MonoWave):
             if act_high > high:
                 high = act_high
                 high_idx = act_high_idx
-                if np.min(self.lows_arr[self.idx_start:act_high_idx] < low_at_start):
+                if self.range_index is not None:
+                    undercut = self.range_index.max_low(self.idx_start, act_high_idx) < low_at_start
+                else:
+                    undercut = np.min(self.lows_arr[self.idx_start:act_high_idx] < low_at_start)
+                if undercut:
                     return None, None
 
         return high, high_idx
@@ -132,10 +179,16 @@ class MonoWaveUp(MonoWave):
 
 
 class MonoWaveDown(MonoWave):
-    def __init__(self, *args, **kwargs):
+    __slots__ = ()
+
+    def __init__(self, *args, end: tuple = None, **kwargs):
+        """
+        :param end: (low, low_idx) of the end if already known, e.g. from a skip ladder (lo_ladder). (None, None)
+                    marks a MonoWave without end. find_end is used otherwise.
+        """
         super().__init__(*args, **kwargs)
 
-        self.low, self.low_idx = self.find_end()
+        self.low, self.low_idx = self.find_end() if end is None else end
         self.high = self.highs_arr[self.idx_start]
         self.high_idx = self.idx_start
 
@@ -175,7 +228,11 @@ class MonoWaveDown(MonoWave):
             if act_low < low:
                 low = act_low
                 low_idx = act_low_idx
-                if np.max(self.highs_arr[self.idx_start:act_low_idx]) > high_at_start:
+                if self.range_index is not None:
+                    highest = self.range_index.max_high(self.idx_start, act_low_idx)
+                else:
+                    highest = np.max(self.highs_arr[self.idx_start:act_low_idx])
+                if highest > high_at_start:
                     return None, None
 
             # TODO what to do if no more minima can be found?
@@ -0,0 +1,143 @@
+from __future__ import annotations
+from collections import OrderedDict
+import numpy as np
+import sys
+
+ENTRY_OVERHEAD = 144  # bytes of the OrderedDict slot and the (value, size) tuple of an entry
+ARRAY_OVERHEAD = 256  # bytes of the header and the allocation of an array returned by a compiled function
+KINDS = ('monowave', 'ladder')  # kinds of entries, see MonoWaveCache.kind
+
+
+class MonoWaveCache:
+    """
+    LRU cache of the MonoWaves of a WaveAnalyzer, keyed by (MonoWaveUp / MonoWaveDown, idx_start, skip), and of
+    their skip ladders, keyed by (MonoWaveUp / MonoWaveDown, idx_start).
+
+    The memory of the cache is capped: the least recently used entries are evicted as soon as the estimated size
+    of all entries exceeds max_bytes. The estimate covers the MonoWave objects, the ladder arrays and the keys, not
+    the arrays of the dataframe, which are shared by all MonoWaves.
+
+    MonoWaves are frozen when they are added (see MonoWave.freeze), so the same object can be shared by many
+    patterns.
+
+    Hits, misses and evictions are counted per kind of entry ('monowave' or 'ladder', see kind), as a missing ladder
+    costs a sweep over the candles and a missing MonoWave only a lookup in its ladder.
+    """
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        """
+        :param max_bytes: memory cap of the cache, 0 disables caching and None means unbounded
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+
+        # by kind of entry
+        self.hits = dict.fromkeys(KINDS, 0)
+        self.misses = dict.fromkeys(KINDS, 0)
+        self.evictions = dict.fromkeys(KINDS, 0)
+
+        self.__entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.__entries
+
+    def get(self, key: tuple):
+        """
+        :param key: (monowave, idx_start, skip) or (monowave, idx_start) of a ladder
+        :return: the cached MonoWave or ladder, None if it is not in the cache
+        """
+        entry = self.__entries.get(key)
+        if entry is None:
+            self.misses[self.kind(key)] += 1
+            return None
+
+        self.hits[self.kind(key)] += 1
+        self.__entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: tuple, wave):
+        """
+        Adds the MonoWave as most recently used entry and evicts the least recently used ones above the memory cap
+
+        :param key: (monowave, idx_start, skip) or (monowave, idx_start) of a ladder
+        :param wave: the MonoWave, is frozen, or the ladder (values, indices, valid)
+        :return:
+        """
+        if not isinstance(wave, tuple):
+            wave.freeze()
+        if self.max_bytes == 0:
+            return
+
+        if key in self.__entries:
+            self.nbytes -= self.__entries.pop(key)[1]
+
+        size = self.sizeof(key, wave)
+        self.__entries[key] = (wave, size)
+        self.nbytes += size
+
+        while self.max_bytes is not None and self.nbytes > self.max_bytes and self.__entries:
+            evicted_key, (_, evicted_size) = self.__entries.popitem(last=False)
+            self.nbytes -= evicted_size
+            self.evictions[self.kind(evicted_key)] += 1
+
+    def discard(self, key: tuple):
+        """
+        Drops a single entry if it is in the cache, e.g. a MonoWave which may get another end with new data
+
+        :param key: (monowave, idx_start, skip)
+        :return:
+        """
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def invalidate(self):
+        """
+        Drops all entries, e.g. after the underlying data changed. The counters are kept.
+
+        :return:
+        """
+        self.__entries.clear()
+        self.nbytes = 0
+
+    @property
+    def stats(self) -> dict:
+        """
+        :return: {kind: {hits, misses, hit_rate, evictions}} of both kinds of entries and the size of the cache
+        """
+        stats = {'entries': len(self.__entries), 'nbytes': self.nbytes, 'max_bytes': self.max_bytes}
+        for kind in KINDS:
+            lookups = self.hits[kind] + self.misses[kind]
+            stats[kind] = {'hits': self.hits[kind], 'misses': self.misses[kind],
+                           'hit_rate': self.hits[kind] / lookups if lookups else 0.0,
+                           'evictions': self.evictions[kind]}
+        return stats
+
+    @staticmethod
+    def kind(key: tuple) -> str:
+        """
+        :param key: (monowave, idx_start, skip) or (monowave, idx_start) of a ladder
+        :return: 'monowave' or 'ladder'
+        """
+        return 'ladder' if len(key) == 2 else 'monowave'
+
+    @staticmethod
+    def sizeof(key: tuple, wave) -> int:
+        """
+        Estimated size of an entry in bytes: the key, the MonoWave and its attributes without the shared arrays or
+        the arrays of a ladder
+
+        :param key:
+        :param wave:
+        :return:
+        """
+        size = ENTRY_OVERHEAD + sys.getsizeof(key) + sys.getsizeof(wave)
+        if isinstance(wave, tuple):
+            # the data of arrays allocated by numba is not counted by sys.getsizeof
+            return size + sum(ARRAY_OVERHEAD + array.nbytes for array in wave)
+        attributes = wave.__getstate__()
+        size += sum(sys.getsizeof(value) for value in attributes.values()
+                    if isinstance(value, (int, float, str, np.generic)))
+        return size
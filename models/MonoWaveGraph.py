@@ -0,0 +1,177 @@
+from __future__ import annotations
+from models.MonoWave import MonoWaveUp, MonoWaveDown
+from models.WaveOptions import WaveOptions
+from models.PatternTable import PatternTable
+from models.MonoWaveTable import MonoWaveTable
+from models.RangeIndex import RangeIndex
+from models.PivotIndex import PivotIndex
+from models.functions import build_monowave_graph, graph_paths
+import numpy as np
+
+
+class MonoWaveGraph:
+    """
+    All MonoWaves of a dataframe as a directed graph. Nodes are the indices of the data, an edge is a valid
+    MonoWaveUp or MonoWaveDown from its start to its end, one edge per reachable skip level.
+
+    The graph is build once with numba and stored in CSR arrays, e.g. the ends of the MonoWaveUps starting at idx are
+    up_end[up_indptr[idx]:up_indptr[idx + 1]], indexed by skip.
+
+    Searching patterns becomes enumerating paths: 5 hops (up, down, up, down, up) for an impulse, 3 hops
+    (down, up, down) for a correction and 2 hops (up, down) for a TD wave.
+    """
+    def __init__(self,
+                 lows: np.array,
+                 highs: np.array,
+                 dates: np.array,
+                 max_skip: int = 9,
+                 range_index: RangeIndex = None,
+                 pivot_index: PivotIndex = None):
+
+        self.lows = lows
+        self.highs = highs
+        self.dates = dates
+        self.max_skip = max_skip
+        self.range_index = RangeIndex(lows, highs) if range_index is None else range_index
+        self.pivot_index = PivotIndex(lows, highs, self.range_index) if pivot_index is None else pivot_index
+
+        (self.up_indptr, self.up_end, self.up_value,
+         self.down_indptr, self.down_end, self.down_value) = build_monowave_graph(lows, highs, max_skip,
+                                                                                  self.range_index.lows_max,
+                                                                                  self.range_index.highs_max,
+                                                                                  self.pivot_index.table)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.up_end) + len(self.down_end)
+
+    def monowave(self, monowave: type, idx_start: int, skip: int = 0):
+        """
+        MonoWaveUp or MonoWaveDown for the edge of idx_start with the given skip
+
+        :param monowave: MonoWaveUp or MonoWaveDown
+        :param idx_start:
+        :param skip:
+        :return: the MonoWave, idx_end is None if there is no such edge
+        """
+        if monowave is MonoWaveUp:
+            indptr, ends, values = self.up_indptr, self.up_end, self.up_value
+        else:
+            indptr, ends, values = self.down_indptr, self.down_end, self.down_value
+
+        edge = indptr[idx_start] + skip
+        if skip < indptr[idx_start + 1] - indptr[idx_start]:
+            end = (values[edge], int(ends[edge]))
+        else:
+            end = (None, None)
+
+        return monowave(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=idx_start, skip=skip, end=end)
+
+    def impulse_paths(self, idx_start: int, up_to: int):
+        """
+        Paths of all WaveOptions up to [up_to - 1, ...] for which WaveAnalyzer.find_impulsive_wave finds 5 waves
+
+        :param idx_start:
+        :param up_to:
+        :return: (skips, nodes, values) arrays, one row per path, see graph_paths
+        """
+        self.__check_limit(up_to)
+        return graph_paths(self.range_index.lows_min, self.range_index.lows_max,
+                           self.up_indptr, self.up_end, self.up_value,
+                           self.down_indptr, self.down_end, self.down_value,
+                           idx_start, 5, up_to, True)
+
+    def corrective_paths(self, idx_start: int, up_to: int):
+        """
+        Paths of all WaveOptions up to [up_to - 1, ...] for which WaveAnalyzer.find_corrective_wave finds 3 waves
+
+        :param idx_start:
+        :param up_to:
+        :return: (skips, nodes, values) arrays, one row per path, see graph_paths
+        """
+        self.__check_limit(up_to)
+        return graph_paths(self.range_index.lows_min, self.range_index.lows_max,
+                           self.down_indptr, self.down_end, self.down_value,
+                           self.up_indptr, self.up_end, self.up_value,
+                           idx_start, 3, up_to, False)
+
+    def td_paths(self, idx_start: int, up_to: int):
+        """
+        Paths of all WaveOptions up to [up_to - 1, up_to - 1] for which WaveAnalyzer.find_td_wave finds 2 waves
+
+        :param idx_start:
+        :param up_to:
+        :return: (skips, nodes, values) arrays, one row per path, see graph_paths
+        """
+        self.__check_limit(up_to)
+        return graph_paths(self.range_index.lows_min, self.range_index.lows_max,
+                           self.up_indptr, self.up_end, self.up_value,
+                           self.down_indptr, self.down_end, self.down_value,
+                           idx_start, 2, up_to, False)
+
+    def impulses(self, idx_start: int, up_to: int):
+        """
+        Same as WaveAnalyzer.find_impulsive_waves, but enumerated on the graph
+
+        :return: generator of (WaveOptions, list of the 5 MonoWaves)
+        """
+        skips, _, _ = self.impulse_paths(idx_start, up_to)
+        yield from self.__materialize(idx_start, skips, [MonoWaveUp, MonoWaveDown] * 2 + [MonoWaveUp])
+
+    def corrections(self, idx_start: int, up_to: int):
+        """
+        Patterns of find_corrective_wave for all WaveOptions of a WaveOptionsGenerator3(up_to)
+
+        :return: generator of (WaveOptions, list of the 3 MonoWaves)
+        """
+        skips, _, _ = self.corrective_paths(idx_start, up_to)
+        yield from self.__materialize(idx_start, skips, [MonoWaveDown, MonoWaveUp, MonoWaveDown])
+
+    def td_waves(self, idx_start: int, up_to: int):
+        """
+        Patterns of find_td_wave for all WaveOptions [i, j] with i, j < up_to
+
+        :return: generator of (WaveOptions, list of the 2 MonoWaves)
+        """
+        skips, _, _ = self.td_paths(idx_start, up_to)
+        yield from self.__materialize(idx_start, skips, [MonoWaveUp, MonoWaveDown])
+
+    def pattern_table(self, paths: tuple, monowaves: list) -> PatternTable:
+        """
+        PatternTable of paths, e.g. to check WaveRules for all of them at once with WaveRule.check_batch
+
+        :param paths: (skips, nodes, values) as returned by impulse_paths, corrective_paths or td_paths
+        :param monowaves: MonoWaveUp / MonoWaveDown for every wave, e.g. [MonoWaveDown, MonoWaveUp, MonoWaveDown]
+        :return:
+        """
+        _, nodes, values = paths
+        return PatternTable.from_paths(self.lows, self.highs, nodes, values, monowaves)
+
+    def monowave_table(self, paths: tuple, monowaves: list) -> MonoWaveTable:
+        """
+        MonoWaveTable of paths, a compact alternative to materializing MonoWaves for many candidates. The waves of
+        path i are table.pattern(i).
+
+        :param paths: (skips, nodes, values) as returned by impulse_paths, corrective_paths or td_paths
+        :param monowaves: MonoWaveUp / MonoWaveDown for every wave, e.g. [MonoWaveDown, MonoWaveUp, MonoWaveDown]
+        :return:
+        """
+        return MonoWaveTable.from_paths(self.lows, self.highs, self.dates, paths, monowaves)
+
+    def __materialize(self, idx_start: int, skips: np.array, monowaves: list):
+        for path in skips:
+            waves = list()
+            wave_start = idx_start
+            for monowave, skip in zip(monowaves, path):
+                wave = self.monowave(monowave, wave_start, int(skip))
+                waves.append(wave)
+                wave_start = wave.idx_end
+
+            values = [int(skip) for skip in path]
+            if len(values) == 3:
+                values.extend([None, None])
+            yield WaveOptions(*values), waves
+
+    def __check_limit(self, up_to: int):
+        if up_to - 1 > self.max_skip:
+            raise ValueError(f'Graph is build up to skip {self.max_skip}, cannot search up to {up_to - 1}.')
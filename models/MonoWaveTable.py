@@ -0,0 +1,170 @@
+from __future__ import annotations
+from models.MonoWave import MonoWaveUp
+import numpy as np
+
+
+class MonoWaveView:
+    """
+    Lightweight read-only view on one row of a MonoWaveTable. Has the same attributes as a MonoWave (low, high,
+    length, duration, dates, points, ...), so it can be used in a WavePattern and with the WaveRules.
+    """
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table: MonoWaveTable, row: int):
+        self.table = table
+        self.row = row
+
+    @property
+    def up(self) -> bool:
+        return bool(self.table.up[self.row])
+
+    @property
+    def idx_start(self) -> int:
+        return int(self.table.idx_start[self.row])
+
+    @property
+    def idx_end(self) -> int:
+        return int(self.table.idx_end[self.row])
+
+    @property
+    def skip_n(self) -> int:
+        return int(self.table.skip[self.row])
+
+    @property
+    def degree(self) -> int:
+        return int(self.table.degree[self.row])
+
+    @property
+    def low(self) -> float:
+        return self.table.low[self.row]
+
+    @property
+    def high(self) -> float:
+        return self.table.high[self.row]
+
+    @property
+    def low_idx(self) -> int:
+        return self.idx_start if self.up else self.idx_end
+
+    @property
+    def high_idx(self) -> int:
+        return self.idx_end if self.up else self.idx_start
+
+    @property
+    def length(self) -> float:
+        return abs(self.high - self.low)
+
+    @property
+    def duration(self) -> int:
+        return self.idx_end - self.idx_start
+
+    @property
+    def date_start(self):
+        return self.table.dates[self.idx_start]
+
+    @property
+    def date_end(self):
+        return self.table.dates[self.idx_end]
+
+    @property
+    def dates(self) -> list:
+        return [self.date_start, self.date_end]
+
+    @property
+    def points(self):
+        return (self.low, self.high) if self.up else (self.high, self.low)
+
+
+class MonoWaveTable:
+    """
+    Columnar store of many MonoWaves (int32 indices, float64 prices), e.g. to keep millions of candidate waves alive
+    for ranking. A row needs 27 bytes instead of a MonoWave object, the waves are read through MonoWaveViews.
+
+    Rows of patterns are stored consecutively, e.g. the 5 waves of impulse i are the rows 5 * i to 5 * i + 4.
+    """
+    def __init__(self,
+                 dates: np.array,
+                 up: np.array,
+                 idx_start: np.array,
+                 idx_end: np.array,
+                 low: np.array,
+                 high: np.array,
+                 skip: np.array = None,
+                 degree: np.array = None,
+                 number_of_waves: int = 1):
+        """
+        :param dates: dates of the dataframe, shared by all rows
+        :param up: True for MonoWaveUp, False for MonoWaveDown
+        :param number_of_waves: waves per pattern, rows are grouped by this in pattern
+        """
+        n = len(up)
+        self.dates = dates
+        self.up = np.asarray(up, dtype=bool)
+        self.idx_start = np.asarray(idx_start, dtype=np.int32)
+        self.idx_end = np.asarray(idx_end, dtype=np.int32)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.skip = np.zeros(n, dtype=np.int8) if skip is None else np.asarray(skip, dtype=np.int8)
+        self.degree = np.ones(n, dtype=np.int8) if degree is None else np.asarray(degree, dtype=np.int8)
+        self.number_of_waves = number_of_waves
+
+    def __len__(self) -> int:
+        return len(self.up)
+
+    def __getitem__(self, row: int) -> MonoWaveView:
+        if not -len(self) <= row < len(self):
+            raise IndexError(f'row {row} out of range for {len(self)} MonoWaves')
+        return MonoWaveView(self, row % len(self))
+
+    @property
+    def number_of_patterns(self) -> int:
+        return len(self) // self.number_of_waves
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in [self.up, self.idx_start, self.idx_end, self.low, self.high,
+                                                self.skip, self.degree])
+
+    def pattern(self, i: int) -> list:
+        """
+        :param i: number of the pattern
+        :return: the MonoWaveViews of the waves of pattern i, e.g. to build a WavePattern
+        """
+        return [MonoWaveView(self, row) for row in range(i * self.number_of_waves, (i + 1) * self.number_of_waves)]
+
+    @classmethod
+    def from_monowaves(cls, waves: list, dates: np.array, number_of_waves: int = 1):
+        """
+        :param waves: MonoWaves with an end, e.g. the waves of several patterns concatenated
+        :param dates: dates of the dataframe
+        :param number_of_waves:
+        :return:
+        """
+        return cls(dates,
+                   [isinstance(wave, MonoWaveUp) for wave in waves],
+                   [wave.idx_start for wave in waves],
+                   [wave.idx_end for wave in waves],
+                   [wave.low for wave in waves],
+                   [wave.high for wave in waves],
+                   [wave.skip_n for wave in waves],
+                   [wave.degree for wave in waves],
+                   number_of_waves)
+
+    @classmethod
+    def from_paths(cls, lows: np.array, highs: np.array, dates: np.array, paths: tuple, monowaves: list):
+        """
+        Builds the table from the paths of a MonoWaveGraph without creating MonoWaves
+
+        :param paths: (skips, nodes, values) as returned by e.g. MonoWaveGraph.impulse_paths
+        :param monowaves: MonoWaveUp / MonoWaveDown for every wave of the pattern
+        :return:
+        """
+        skips, nodes, values = paths
+        idx_start, idx_end = nodes[:, :-1], nodes[:, 1:]
+        up = np.broadcast_to(np.array([monowave is MonoWaveUp for monowave in monowaves]), idx_start.shape)
+
+        low = np.where(up, lows[idx_start], values[:, 1:])
+        high = np.where(up, values[:, 1:], highs[idx_start])
+
+        return cls(dates, up.ravel(), idx_start.ravel(), idx_end.ravel(), low.ravel(), high.ravel(),
+                   np.asarray(skips).ravel(), number_of_waves=len(monowaves))
@@ -0,0 +1,86 @@
+from __future__ import annotations
+from models.WavePattern import pattern_key
+from models.functions import bloom_add
+import numpy as np
+import math
+
+
+class PatternFilter:
+    """
+    Set of seen patterns with bounded memory, e.g. to drop duplicates from scans finding millions of patterns.
+    Patterns are identified by their wave indices (see WavePattern.nodes), a scan result can be added as nodes array
+    at once (see add_nodes).
+
+    Every pattern is added to a Bloom filter sized for capacity patterns at the false positive rate error_rate. As
+    long as at most exact_limit patterns were added, their keys are also kept in a set which answers exactly. Beyond
+    that the set is dropped and a new pattern is taken for a duplicate with a probability of at most error_rate (up
+    to capacity patterns), a seen pattern is always recognized.
+    """
+    def __init__(self, capacity: int = 10**6, error_rate: float = 1e-6, exact_limit: int = 2**20):
+        """
+        :param capacity: number of patterns the error rate is guaranteed for
+        :param error_rate: false positive rate of the Bloom filter at capacity patterns
+        :param exact_limit: number of patterns which are deduplicated exactly, 0 for the Bloom filter only
+        """
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError('capacity has to be positive and error_rate between 0 and 1.')
+
+        # optimal size and number of hashes of a Bloom filter, e.g. 3.4 MiB and 20 hashes for the defaults
+        n_bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.bits = np.zeros(max(math.ceil(n_bits / 64), 1), dtype=np.uint64)
+        self.n_hashes = max(round(-math.log2(error_rate)), 1)
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.exact_limit = exact_limit
+
+        self.count = 0
+        self.__keys = set() if exact_limit > 0 else None
+
+    @property
+    def exact(self) -> bool:
+        return self.__keys is not None
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes + (len(self.__keys) * 64 if self.exact else 0)
+
+    def add(self, pattern) -> bool:
+        """
+        :param pattern: WavePattern or its nodes
+        :return: True if the pattern was not seen before
+        """
+        nodes = pattern.nodes if hasattr(pattern, 'nodes') else tuple(pattern)
+        return bool(self.add_nodes(np.array([nodes], dtype=np.int64))[0])
+
+    def add_nodes(self, nodes: np.array) -> np.array:
+        """
+        :param nodes: (patterns x indices) array, e.g. of WaveAnalyzer.scan_impulsive_waves_from
+        :return: bool array, True for the rows which were not seen before (the first of duplicates within nodes)
+        """
+        nodes = np.ascontiguousarray(nodes, dtype=np.int64)
+        new = bloom_add(self.bits, nodes, self.n_hashes)
+
+        if self.exact:
+            # the Bloom filter can only be wrong about a pattern being seen, the set decides these rows
+            for row in range(len(nodes)):
+                key = pattern_key(nodes[row])
+                if not new[row]:
+                    new[row] = key not in self.__keys
+                if new[row]:
+                    self.__keys.add(key)
+
+        self.count += int(new.sum())
+        if self.exact and self.count > self.exact_limit:
+            self.__keys = None
+
+        return new
+
+    def __contains__(self, pattern) -> bool:
+        nodes = pattern.nodes if hasattr(pattern, 'nodes') else tuple(pattern)
+        if self.exact:
+            return pattern_key(nodes) in self.__keys
+        return not bloom_add(self.bits, np.array([nodes], dtype=np.int64), self.n_hashes, False)[0]
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from models.MonoWave import MonoWaveUp
+import numpy as np
+
+
+class WaveColumns:
+    """
+    One wave of all patterns of a PatternTable. Has the same attributes as a MonoWave, but every attribute is a
+    NumPy column, so the WaveRule conditions can be evaluated for all patterns at once.
+    """
+    def __init__(self, low: np.array, high: np.array, low_idx: np.array, high_idx: np.array, idx_start: np.array,
+                 idx_end: np.array):
+        self.low = low
+        self.high = high
+        self.low_idx = low_idx
+        self.high_idx = high_idx
+        self.idx_start = idx_start
+        self.idx_end = idx_end
+
+    @property
+    def length(self) -> np.array:
+        return np.abs(self.high - self.low)
+
+    @property
+    def duration(self) -> np.array:
+        return self.idx_end - self.idx_start
+
+
+class PatternTable:
+    """
+    Struct-of-arrays of N candidate patterns with the same number of waves. Every column is a (N x waves) array,
+    e.g. low[:, 0] are the lows of wave1 of all candidates.
+    """
+    def __init__(self,
+                 low: np.array,
+                 high: np.array,
+                 low_idx: np.array,
+                 high_idx: np.array,
+                 idx_start: np.array,
+                 idx_end: np.array):
+
+        self.low = low
+        self.high = high
+        self.low_idx = low_idx
+        self.high_idx = high_idx
+        self.idx_start = idx_start
+        self.idx_end = idx_end
+
+    @property
+    def number(self) -> int:
+        return self.low.shape[0]
+
+    @property
+    def number_of_waves(self) -> int:
+        return self.low.shape[1]
+
+    def wave(self, no: int) -> WaveColumns:
+        """
+        :param no: number of the wave, starting with 1 like in 'wave1'
+        :return:
+        """
+        col = no - 1
+        return WaveColumns(self.low[:, col], self.high[:, col], self.low_idx[:, col], self.high_idx[:, col],
+                           self.idx_start[:, col], self.idx_end[:, col])
+
+    @classmethod
+    def from_waves(cls, patterns: list):
+        """
+        :param patterns: lists of MonoWaves, e.g. as returned by WaveAnalyzer.find_impulsive_wave
+        :return:
+        """
+        shape = (len(patterns), len(patterns[0]) if patterns else 0)
+        columns = [[[getattr(wave, attribute) for wave in waves] for waves in patterns]
+                   for attribute in ['low', 'high', 'low_idx', 'high_idx', 'idx_start', 'idx_end']]
+
+        return cls(np.array(columns[0], dtype=np.float64).reshape(shape),
+                   np.array(columns[1], dtype=np.float64).reshape(shape),
+                   *[np.array(column, dtype=np.int64).reshape(shape) for column in columns[2:]])
+
+    @classmethod
+    def from_paths(cls, lows: np.array, highs: np.array, nodes: np.array, values: np.array, monowaves: list):
+        """
+        Builds the table from the paths of a MonoWaveGraph without creating MonoWaves
+
+        :param nodes: (N x waves + 1) pivot indices of the paths
+        :param values: (N x waves + 1) values at the ends of the waves, values[:, 0] is unused
+        :param monowaves: MonoWaveUp / MonoWaveDown for every wave of the pattern
+        :return:
+        """
+        idx_start, idx_end = nodes[:, :-1], nodes[:, 1:]
+        up = np.array([monowave is MonoWaveUp for monowave in monowaves])
+
+        low = np.where(up, lows[idx_start], values[:, 1:])
+        high = np.where(up, values[:, 1:], highs[idx_start])
+        low_idx = np.where(up, idx_start, idx_end)
+        high_idx = np.where(up, idx_end, idx_start)
+
+        return cls(low, high, low_idx, high_idx, idx_start, idx_end)
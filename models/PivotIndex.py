@@ -0,0 +1,87 @@
+from __future__ import annotations
+from models.RangeIndex import RangeIndex
+from models.functions import build_pivot_index, pivot_index_extend, hi_indexed, lo_indexed, next_hi_indexed, \
+    next_lo_indexed
+import numpy as np
+
+
+class PivotIndex:
+    """
+    Swing pivots of a dataframe, so hi, lo, next_hi and next_lo become lookups instead of walking candle by candle.
+
+    run_end_hi[idx] is the local maximum reached by the rise of the highs starting at idx (run_end_lo the same for
+    falling lows), -1 if the run is still going on at the last candle of a growing series. Together with the range
+    tables of a RangeIndex, which find the next high (low) exceeding a value in O(log n), next_hi / next_lo are
+    answered without scanning the candles in between.
+    """
+    def __init__(self, lows: np.array, highs: np.array, range_index: RangeIndex = None):
+        self.lows = lows
+        self.highs = highs
+        self.range_index = RangeIndex(lows, highs) if range_index is None else range_index
+        self.run_end_hi, self.run_end_lo = build_pivot_index(lows, highs)
+
+        # buffers with spare capacity once candles are appended, see extend
+        self.__buffers = None
+
+    def extend(self, lows: np.array, highs: np.array):
+        """
+        Updates the index after candles were appended, amortized O(1) per candle like RangeIndex.extend. From now on
+        the runs reaching the last candle are marked with -1 in run_end_hi / run_end_lo (see pivot_index_extend).
+
+        :param lows: all lows including the appended ones
+        :param highs: all highs including the appended ones
+        :return:
+        """
+        start, stop = len(self.run_end_hi), len(lows)
+        if stop <= start:
+            return
+
+        if self.__buffers is None or len(self.__buffers[0]) < stop:
+            capacity = max(stop, 2 * len(self.__buffers[0]) if self.__buffers is not None else 2 * start)
+            buffers = (np.empty(capacity, dtype=np.int64), np.empty(capacity, dtype=np.int64))
+            for buffer, run_end in zip(buffers, [self.run_end_hi, self.run_end_lo]):
+                buffer[:start] = run_end
+                if self.__buffers is None:
+                    buffer[:start][run_end == start - 1] = -1
+            self.__buffers = buffers
+
+        pivot_index_extend(lows, highs, self.__buffers[0], self.__buffers[1], start, stop)
+        self.lows, self.highs = lows, highs
+        self.run_end_hi, self.run_end_lo = self.__buffers[0][:stop], self.__buffers[1][:stop]
+
+    @property
+    def table(self) -> tuple:
+        """
+        the index as passed to the compiled functions: (run_end_hi, run_end_lo, highs_max, lows_min)
+        """
+        return self.run_end_hi, self.run_end_lo, self.range_index.highs_max, self.range_index.lows_min
+
+    @property
+    def swing_highs(self) -> np.array:
+        """
+        indices of the local maxima of the highs, i.e. ends of a rise
+        """
+        idx = np.arange(len(self.highs))
+        run_end_hi = np.where(self.run_end_hi < 0, len(idx) - 1, self.run_end_hi)
+        return idx[(run_end_hi == idx) & (np.concatenate([[True], self.highs[1:] > self.highs[:-1]]))]
+
+    @property
+    def swing_lows(self) -> np.array:
+        """
+        indices of the local minima of the lows, i.e. ends of a fall, e.g. to start impulse scans from
+        """
+        idx = np.arange(len(self.lows))
+        run_end_lo = np.where(self.run_end_lo < 0, len(idx) - 1, self.run_end_lo)
+        return idx[(run_end_lo == idx) & (np.concatenate([[True], self.lows[1:] < self.lows[:-1]]))]
+
+    def hi(self, idx_start: int):
+        return hi_indexed(self.lows, self.highs, idx_start, self.table)
+
+    def lo(self, idx_start: int):
+        return lo_indexed(self.lows, self.highs, idx_start, self.table)
+
+    def next_hi(self, idx_start: int, prev_high: float):
+        return next_hi_indexed(self.lows, self.highs, idx_start, prev_high, self.table)
+
+    def next_lo(self, idx_start: int, prev_low: float):
+        return next_lo_indexed(self.lows, self.highs, idx_start, prev_low, self.table)
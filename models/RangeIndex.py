@@ -0,0 +1,78 @@
+from __future__ import annotations
+from models.functions import build_range_table, range_query, range_table_extend, RANGE_BLOCK_SIZE
+import numpy as np
+
+
+class RangeIndex:
+    """
+    O(1) min / max queries over ranges of the lows and highs of a dataframe, e.g. the lowest low between the end of
+    wave 2 and the end of wave 4. Build once per WaveAnalyzer and shared by all checks which used to scan slices.
+
+    The tables (see build_range_table) can be passed to the compiled functions directly.
+    """
+    def __init__(self, lows: np.array, highs: np.array):
+        self.lows_min = build_range_table(np.ascontiguousarray(lows, dtype=np.float64), False)
+        self.lows_max = build_range_table(np.ascontiguousarray(lows, dtype=np.float64), True)
+        self.highs_max = build_range_table(np.ascontiguousarray(highs, dtype=np.float64), True)
+
+        # buffers with spare capacity once candles are appended, see extend
+        self.__buffers = None
+        self.__capacity = len(lows)
+
+    def extend(self, lows: np.array, highs: np.array):
+        """
+        Updates the tables after candles were appended. The tables are backed by buffers with spare capacity, which is
+        doubled when it runs out, so appending a candle is amortized O(1).
+
+        :param lows: all lows including the appended ones
+        :param highs: all highs including the appended ones
+        :return:
+        """
+        start, stop = len(self.lows_min[0]), len(lows)
+        if stop <= start:
+            return
+
+        if self.__buffers is None or self.__capacity < stop:
+            self.__grow(max(stop, 2 * self.__capacity))
+
+        new_lows = np.ascontiguousarray(lows[start:], dtype=np.float64)
+        new_highs = np.ascontiguousarray(highs[start:], dtype=np.float64)
+        for name, values in [('lows_min', new_lows), ('lows_max', new_lows), ('highs_max', new_highs)]:
+            arr, prefix, suffix, sparse, log_table, is_max = self.__buffers[name]
+            range_table_extend(arr, prefix, suffix, sparse, log_table, is_max, start, values)
+            setattr(self, name, (arr[:stop], prefix[:stop], suffix[:stop], sparse, log_table, is_max))
+
+    def __grow(self, capacity: int):
+        n_blocks = -(-capacity // RANGE_BLOCK_SIZE)
+        log_table = np.zeros(n_blocks + 1, dtype=np.int64)
+        log_table[1:] = np.floor(np.log2(np.arange(1, n_blocks + 1))).astype(np.int64)
+
+        buffers = dict()
+        for name in ['lows_min', 'lows_max', 'highs_max']:
+            arr, prefix, suffix, sparse, _, is_max = getattr(self, name)
+            columns = [np.empty(capacity) for _ in range(3)]
+            for column, values in zip(columns, [arr, prefix, suffix]):
+                column[:len(values)] = values
+
+            grown_sparse = np.zeros((log_table[n_blocks] + 1, n_blocks))
+            grown_sparse[:sparse.shape[0], :sparse.shape[1]] = sparse
+            buffers[name] = (*columns, grown_sparse, log_table, is_max)
+
+        self.__buffers = buffers
+        self.__capacity = capacity
+
+    def min_low(self, start: int, stop: int) -> float:
+        """
+        same as np.min(lows[start:stop]), but inf for an empty range
+
+        :param start:
+        :param stop:
+        :return:
+        """
+        return range_query(self.lows_min, start, stop)
+
+    def max_low(self, start: int, stop: int) -> float:
+        return range_query(self.lows_max, start, stop)
+
+    def max_high(self, start: int, stop: int) -> float:
+        return range_query(self.highs_max, start, stop)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import numpy as np
+import hashlib
+import io
+import sqlite3
+import time
+
+CACHE_VERSION = 2  # part of every key, increase when the searches or rules change their results
+HEAD_LENGTH = 64  # candles of the head fingerprint, only prefixes of at least this length are reused
+
+
+class ScanCache:
+    """
+    Persistent cache of scan results in a SQLite file, e.g. for a job scanning the same history every night.
+
+    A scan is stored with the fingerprint of the lows and highs, the search, the rules and the skip limit. Per start
+    the accepted options, the wave indices (nodes) and the rule matches are kept together with a flag telling if the
+    result is final, i.e. cannot change when candles are appended (see ladder_final and LiveSearch). A repeated scan
+    of the same data is read from the cache. If the data was only extended, the scan of the longest cached prefix is
+    reused for its final starts and only the other starts are scanned again, the scan of the prefix is replaced by
+    the new one. The candidates for a prefix are found by the fingerprint of the first HEAD_LENGTH candles, so only
+    the scans of the same series are compared.
+
+    The size of the file is capped: the least recently used scans are deleted as soon as the stored results exceed
+    max_bytes.
+    """
+    def __init__(self, path: str, max_bytes: int = 256 * 2**20):
+        """
+        :param path: SQLite file, created if it does not exist
+        :param max_bytes: cap of the stored results, None means unbounded
+        """
+        self.path = str(path)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+
+        # several processes may share the file (see BatchScanner), a writer waits for the others
+        self.__connection = sqlite3.connect(self.path, timeout=60)
+        columns = [row[1] for row in self.__connection.execute('PRAGMA table_info(scans)')]
+        if columns and 'head' not in columns:
+            # a file of an older version, its scans cannot be looked up by head
+            self.__connection.execute('DROP TABLE scans')
+        self.__connection.execute('CREATE TABLE IF NOT EXISTS scans ('
+                                  'id INTEGER PRIMARY KEY, fingerprint TEXT, head TEXT, length INTEGER, config TEXT, '
+                                  'results BLOB, nbytes INTEGER, last_used REAL)')
+        self.__connection.execute('DROP INDEX IF EXISTS scans_config')
+        self.__connection.execute('CREATE INDEX IF NOT EXISTS scans_head ON scans (config, head, length)')
+        self.__connection.commit()
+
+    @staticmethod
+    def fingerprint(lows: np.array, highs: np.array) -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(lows, dtype=np.float64).tobytes())
+        digest.update(np.ascontiguousarray(highs, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def config(search: str, rules: list, up_to: int) -> str:
+        return f"{CACHE_VERSION}:{search}:{','.join(type(rule).__name__ for rule in rules)}:{up_to}"
+
+    def scan(self, lows: np.array, highs: np.array, config: str, idx_starts, scan_starts) -> tuple:
+        """
+        Results of the starts idx_starts, read from the cache as far as possible
+
+        :param lows: lows the scan runs on
+        :param highs: highs the scan runs on
+        :param config: search, rules and skip limit, see config
+        :param idx_starts: indices to start from
+        :param scan_starts: function scanning a list of starts, returns per start (options, nodes, matches, final)
+        :return: (options, nodes, matches) per start in the order of idx_starts
+        """
+        idx_starts = [int(idx_start) for idx_start in idx_starts]
+        fingerprint = self.fingerprint(lows, highs)
+        head = self.fingerprint(lows[:HEAD_LENGTH], highs[:HEAD_LENGTH])
+
+        cached, exact, scan_id = self.__lookup(lows, highs, fingerprint, head, config)
+        if exact:
+            # final or not, the results of the same data are the same
+            missing = [idx_start for idx_start in idx_starts if idx_start not in cached]
+        else:
+            missing = [idx_start for idx_start in idx_starts if idx_start not in cached or not cached[idx_start][3]]
+
+        if exact and not missing:
+            self.hits += 1
+        elif cached:
+            self.prefix_hits += 1
+        else:
+            self.misses += 1
+
+        results = {idx_start: result for idx_start, result in cached.items() if exact or result[3]}
+        results.update(zip(missing, scan_starts(missing)))
+        if results and (missing or not exact):
+            self.__store(fingerprint, head, len(lows), config, results, None if exact else scan_id)
+
+        return [results[idx_start][:3] for idx_start in idx_starts]
+
+    def __lookup(self, lows: np.array, highs: np.array, fingerprint: str, head: str, config: str) -> tuple:
+        """
+        :return: (results by start, True if they are of the same data and not of a prefix, id of the scan or None)
+        """
+        row = self.__connection.execute('SELECT id, results FROM scans WHERE fingerprint = ? AND config = ?',
+                                        (fingerprint, config)).fetchone()
+        if row is not None:
+            self.__touch(row[0])
+            return self.__decode(row[1]), True, row[0]
+
+        # the longest cached prefix of the data among the scans of the same series
+        rows = self.__connection.execute('SELECT id, fingerprint, length FROM scans '
+                                         'WHERE config = ? AND head = ? AND length >= ? AND length < ? '
+                                         'ORDER BY length DESC', (config, head, HEAD_LENGTH, len(lows))).fetchall()
+        for scan_id, prefix_fingerprint, length in rows:
+            if self.fingerprint(lows[:length], highs[:length]) == prefix_fingerprint:
+                self.__touch(scan_id)
+                results = self.__connection.execute('SELECT results FROM scans WHERE id = ?', (scan_id, ))
+                return self.__decode(results.fetchone()[0]), False, scan_id
+
+        return dict(), False, None
+
+    def __touch(self, scan_id: int):
+        self.__connection.execute('UPDATE scans SET last_used = ? WHERE id = ?', (time.time(), scan_id))
+        self.__connection.commit()
+
+    def __store(self, fingerprint: str, head: str, length: int, config: str, results: dict, prefix_id: int = None):
+        """
+        Stores the scan and deletes an older scan of the same data as well as the scan of the prefix it replaces
+
+        :param prefix_id: id of the scan of the prefix which was reused, None if there is none
+        """
+        blob = self.__encode(results)
+        with self.__connection:
+            self.__connection.execute('DELETE FROM scans WHERE fingerprint = ? AND config = ?', (fingerprint, config))
+            if prefix_id is not None:
+                self.__connection.execute('DELETE FROM scans WHERE id = ?', (prefix_id, ))
+            self.__connection.execute('INSERT INTO scans (fingerprint, head, length, config, results, nbytes, '
+                                      'last_used) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                      (fingerprint, head, length, config, blob, len(blob), time.time()))
+        self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used scans until the results fit into max_bytes
+
+        :return:
+        """
+        if self.max_bytes is None:
+            return
+
+        with self.__connection:
+            total = self.nbytes
+            for scan_id, nbytes in self.__connection.execute('SELECT id, nbytes FROM scans ORDER BY last_used'):
+                if total <= self.max_bytes:
+                    break
+                self.__connection.execute('DELETE FROM scans WHERE id = ?', (scan_id, ))
+                total -= nbytes
+
+    @property
+    def nbytes(self) -> int:
+        return self.__connection.execute('SELECT COALESCE(SUM(nbytes), 0) FROM scans').fetchone()[0]
+
+    def __len__(self):
+        return self.__connection.execute('SELECT COUNT(*) FROM scans').fetchone()[0]
+
+    def clear(self):
+        with self.__connection:
+            self.__connection.execute('DELETE FROM scans')
+        self.__connection.execute('VACUUM')
+
+    def close(self):
+        self.__connection.close()
+
+    @staticmethod
+    def __encode(results: dict) -> bytes:
+        idx_starts = sorted(results)
+        counts = [len(results[idx_start][0]) for idx_start in idx_starts]
+        arrays = {'idx_starts': np.array(idx_starts, dtype=np.int64),
+                  'final': np.array([results[idx_start][3] for idx_start in idx_starts], dtype=bool),
+                  'counts': np.array(counts, dtype=np.int64)}
+        for column, name in enumerate(['options', 'nodes', 'matches']):
+            arrays[name] = np.concatenate([results[idx_start][column] for idx_start in idx_starts])
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    @staticmethod
+    def __decode(blob: bytes) -> dict:
+        arrays = np.load(io.BytesIO(blob))
+        offsets = np.concatenate([[0], np.cumsum(arrays['counts'])])
+        options, nodes, matches = arrays['options'], arrays['nodes'], arrays['matches']
+        return {int(idx_start): (options[start:stop], nodes[start:stop], matches[start:stop], bool(final))
+                for idx_start, final, start, stop in zip(arrays['idx_starts'], arrays['final'], offsets[:-1],
+                                                         offsets[1:])}
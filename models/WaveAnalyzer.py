@@ -1,10 +1,24 @@
+from __future__ import annotations
 from models.MonoWave import MonoWaveUp, MonoWaveDown
-from models.WaveOptions import WaveOptionsGenerator5, WaveOptionsGenerator3
+from models.MonoWaveCache import MonoWaveCache
+from models.MonoWaveGraph import MonoWaveGraph
+from models.LiveSearch import LiveSearch
+from models.Instrumentation import Instrumentation
+from models.ScanCache import ScanCache
+from models.ingest import as_prices, as_dates
+from models.RangeIndex import RangeIndex
+from models.PivotIndex import PivotIndex
+from models.functions import hi_ladder, lo_ladder, ladder_final, impulse_scan, check_wave2_wave4, check_wave4_wave5, \
+    distinct_skips, IMPULSE, LEADING_DIAGONAL
+from models.WaveOptions import WaveOptions, WaveOptionsGenerator5, WaveOptionsGenerator3
 from models.WaveCycle import WaveCycle
 from models.WavePattern import WavePattern
-from models.WaveRules import Impulse, Correction, TDWave
+from models.WaveRules import Impulse, LeadingDiagonal, Correction, TDWave
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
+import os
+import time
 
 
 class WaveAnalyzer:
@@ -13,13 +27,28 @@ class WaveAnalyzer:
     """
     def __init__(self,
                  df: pd.DataFrame,
-                 verbose: bool = False):
+                 verbose: bool = False,
+                 cache_bytes: int = 64 * 2**20,
+                 instrumentation: Instrumentation = None,
+                 result_cache: ScanCache = None):
+        """
+        :param df: dataframe with the columns Date, Low and High or any mapping of these names to columns, e.g. a dict
+                   of numpy arrays or a pyarrow.Table. Columns of fitting dtype are used without copying, see ingest.
+        :param cache_bytes: memory cap of the MonoWave cache, 0 disables it, see MonoWaveCache
+        :param instrumentation: records counts, timings and rejections of the stages of the searches (MonoWave
+                                construction, low checks, rule conditions), disabled if None
+        :param result_cache: persistent cache of the results of scan_impulsive_waves_from and
+                             scan_corrective_waves_from, disabled if None
+        """
 
         self.df = df
-        self.lows = np.array(list(self.df['Low']))
-        self.highs = np.array(list(self.df['High']))
-        self.dates = np.array(list(self.df['Date']))
         self.verbose = verbose
+        self.instrumentation = instrumentation
+        self.result_cache = result_cache
+
+        # MonoWaves by (MonoWaveUp / MonoWaveDown, idx_start, skip), shared by all patterns built with build_monowave,
+        # and skip ladders by (MonoWaveUp / MonoWaveDown, idx_start), see skip_ladder
+        self.monowave_cache = MonoWaveCache(cache_bytes)
 
         self.impulse_rules = list()
         self.correction_rules = list()
@@ -27,8 +56,155 @@ class WaveAnalyzer:
         self.__waveoptions_up: WaveOptionsGenerator5
         self.__waveoptions_down: WaveOptionsGenerator3
 
+        self.__max_skip = 0
+        self.__graph = None
+
+        # streaming mode, see extend: buffers (lows, highs, dates) with spare capacity, the ladders and MonoWaves which
+        # may change with the next candle (only recorded while streaming) and the searches to update
+        self.__buffers = None
+        self.__streaming = False
+        self.__open_ladders = set()
+        self.__open_monowaves = set()
+        self.__live_searches = list()
+
+        self.invalidate()
         self.set_combinatorial_limits()
 
+    @classmethod
+    def from_arrays(cls, lows, highs, dates, **kwargs) -> WaveAnalyzer:
+        """
+        WaveAnalyzer of arrays instead of a dataframe, e.g. memory-mapped .npy files of a long minute series
+
+        :param lows: numpy array, pandas Series, Arrow array or path of a .npy file
+        :param highs: as lows
+        :param dates: as lows, datetime64 or int64 are used as they are, strings are parsed once
+        :param kwargs: see __init__
+        :return:
+        """
+        return cls(df={'Low': as_prices(lows), 'High': as_prices(highs), 'Date': as_dates(dates)}, **kwargs)
+
+    def invalidate(self):
+        """
+        Reads lows, highs and dates from the dataframe again and drops everything derived from them (range and pivot
+        index, skip ladders, graph and cached MonoWaves). Has to be called after the dataframe changed.
+
+        :return:
+        """
+        self.lows = as_prices(self.df['Low'])
+        self.highs = as_prices(self.df['High'])
+        self.dates = as_dates(self.df['Date'])
+
+        # O(1) range min / max of lows and highs for the checks in the skip ladders and the impulse searches
+        self.range_index = RangeIndex(self.lows, self.highs)
+        # swing pivots, so the ends of all MonoWaves are found by lookups
+        self.pivot_index = PivotIndex(self.lows, self.highs, self.range_index)
+
+        self.__graph = None
+        self.monowave_cache.invalidate()
+
+        self.__buffers = None
+        self.__streaming = False
+        self.__open_ladders.clear()
+        self.__open_monowaves.clear()
+        for live_search in self.__live_searches:
+            live_search.reset()
+
+    def append(self, candle):
+        """
+        Appends a single candle, see extend
+
+        :param candle: mapping with 'Date', 'Low' and 'High', e.g. a row of a dataframe
+        :return:
+        """
+        self.extend([candle])
+
+    def extend(self, candles):
+        """
+        Streaming mode: appends candles to lows, highs and dates. The arrays are backed by buffers with spare capacity,
+        which is doubled when it runs out, and the range and pivot index are updated in place, so a candle costs
+        amortized O(1) independent of the length of the history.
+
+        Only what may change with the new candles is dropped: skip ladders and MonoWaves without end or ending at the
+        former last candle. All other MonoWaves are final, their end is confirmed by the candle after it. The searches
+        of watch_impulsive_waves / watch_corrective_waves are updated and only re-evaluate their open parts.
+
+        The dataframe df is not changed, invalidate() reads the data from df again.
+
+        :param candles: dataframe or iterable of mappings with 'Date', 'Low' and 'High'
+        :return:
+        """
+        if isinstance(candles, pd.DataFrame):
+            lows, highs, dates = candles['Low'], candles['High'], candles['Date']
+        else:
+            candles = list(candles)
+            lows = [candle['Low'] for candle in candles]
+            highs = [candle['High'] for candle in candles]
+            dates = [candle['Date'] for candle in candles]
+        lows, highs, dates = as_prices(lows), as_prices(highs), as_dates(dates)
+
+        start = len(self.lows)
+        stop = start + len(lows)
+        if stop == start:
+            return
+        self.__start_streaming()
+
+        if self.__buffers is None or len(self.__buffers[0]) < stop:
+            capacity = max(stop, 2 * (len(self.__buffers[0]) if self.__buffers is not None else start))
+            buffers = (np.empty(capacity), np.empty(capacity), np.empty(capacity, dtype=self.dates.dtype))
+            for buffer, values in zip(buffers, [self.lows, self.highs, self.dates]):
+                buffer[:start] = values
+            self.__buffers = buffers
+
+        for buffer, values in zip(self.__buffers, [lows, highs, dates]):
+            buffer[start:stop] = values
+        self.lows, self.highs, self.dates = (buffer[:stop] for buffer in self.__buffers)
+
+        self.range_index.extend(self.lows, self.highs)
+        self.pivot_index.extend(self.lows, self.highs)
+
+        for key in [*self.__open_ladders, *self.__open_monowaves]:
+            self.monowave_cache.discard(key)
+        self.__open_ladders.clear()
+        self.__open_monowaves.clear()
+        self.__graph = None
+
+        for live_search in self.__live_searches:
+            live_search.update()
+
+    def watch_impulsive_waves(self, idx_start: int, up_to: int = None, rules: list = None) -> LiveSearch:
+        """
+        find_impulsive_waves, kept up to date while candles are appended with append / extend
+
+        :return: the LiveSearch with the patterns and which of them are final
+        """
+        self.__start_streaming()
+        live_search = LiveSearch(self, 'find_impulsive_waves', idx_start, up_to, rules)
+        self.__live_searches.append(live_search)
+        return live_search
+
+    def watch_corrective_waves(self, idx_start: int, up_to: int = None, rules: list = None) -> LiveSearch:
+        """
+        find_corrective_waves, kept up to date while candles are appended with append / extend
+
+        :return: the LiveSearch with the patterns and which of them are final
+        """
+        self.__start_streaming()
+        live_search = LiveSearch(self, 'find_corrective_waves', idx_start, up_to, rules)
+        self.__live_searches.append(live_search)
+        return live_search
+
+    def __start_streaming(self):
+        """
+        Starts to record the ladders and MonoWaves which may change with new candles. The entries cached before were
+        not recorded, so they are dropped.
+
+        :return:
+        """
+        if not self.__streaming:
+            self.monowave_cache.invalidate()
+            self.__graph = None
+            self.__streaming = True
+
     def get_absolute_low(self):
         """
         find the absolute low in the dataframe. Can be used to start the wave analysis from this low.
@@ -47,6 +223,87 @@ class WaveAnalyzer:
         """
         self.__waveoptions_up = WaveOptionsGenerator5(n_up)
         self.__waveoptions_down = WaveOptionsGenerator3(n_down)
+        self.__max_skip = max(n_up, n_down) - 1
+
+    def skip_ladder(self, monowave: type, idx_start: int, skip: int = 0):
+        """
+        Ends of the MonoWaves of type monowave starting at idx_start for all skips up to the combinatorial limits
+        (at least up to skip). The ladder of an idx_start is computed in a single sweep and kept in monowave_cache,
+        so it counts against cache_bytes like the MonoWaves.
+
+        :param monowave: MonoWaveUp or MonoWaveDown
+        :param idx_start:
+        :param skip: highest skip needed
+        :return: arrays (values, indices, valid) indexed by skip
+        """
+        if monowave is MonoWaveUp:
+            kernel, range_table = hi_ladder, self.range_index.lows_max
+        else:
+            kernel, range_table = lo_ladder, self.range_index.highs_max
+
+        key = (monowave, idx_start)
+        ladder = self.monowave_cache.get(key)
+        if ladder is None or len(ladder[0]) <= skip:
+            ladder = kernel(self.lows, self.highs, idx_start, max(skip, self.__max_skip), range_table,
+                            self.pivot_index.table)
+            self.monowave_cache.put(key, ladder)
+
+            if self.__streaming and not ladder_final(self.lows, self.highs, *ladder, len(ladder[0]),
+                                                     monowave is MonoWaveUp, self.pivot_index.table):
+                self.__open_ladders.add(key)
+
+        return ladder
+
+    def monowave_graph(self, up_to: int = None) -> MonoWaveGraph:
+        """
+        The MonoWaveGraph of the dataframe. It is build once and only rebuild if a higher skip limit is requested.
+
+        :param up_to: skip limit the graph has to support, defaults to the combinatorial limits
+        :return:
+        """
+        max_skip = self.__max_skip if up_to is None else max(up_to - 1, self.__max_skip)
+        if self.__graph is None or self.__graph.max_skip < max_skip:
+            self.__graph = MonoWaveGraph(self.lows, self.highs, self.dates, max_skip=max_skip,
+                                         range_index=self.range_index, pivot_index=self.pivot_index)
+
+        return self.__graph
+
+    def build_monowave(self, monowave: type, idx_start: int, skip: int = 0):
+        """
+        Builds a MonoWaveUp or MonoWaveDown with the end read from the skip ladder of idx_start. MonoWaves are
+        cached in monowave_cache, so the returned MonoWave is frozen and may be shared with other patterns.
+
+        :param monowave: MonoWaveUp or MonoWaveDown
+        :param idx_start:
+        :param skip:
+        :return: the MonoWave, idx_end is None if it has no end in the data
+        """
+        if self.instrumentation is not None:
+            start = time.perf_counter_ns()
+            wave = self.__build_monowave(monowave, idx_start, skip)
+            self.instrumentation.record('monowave', time.perf_counter_ns() - start, wave.idx_end is None)
+            return wave
+
+        return self.__build_monowave(monowave, idx_start, skip)
+
+    def __build_monowave(self, monowave: type, idx_start: int, skip: int):
+        key = (monowave, idx_start, skip)
+        wave = self.monowave_cache.get(key)
+        if wave is not None:
+            return wave
+
+        values, indices, valid = self.skip_ladder(monowave, idx_start, skip)
+        if valid[skip]:
+            end = (values[skip], int(indices[skip]))
+        else:
+            end = (None, None)
+
+        wave = monowave(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=idx_start, skip=skip, end=end)
+        self.monowave_cache.put(key, wave)
+        if self.__streaming and not ladder_final(self.lows, self.highs, values, indices, valid, skip + 1,
+                                                 monowave is MonoWaveUp, self.pivot_index.table):
+            self.__open_monowaves.add(key)
+        return wave
 
     def find_impulsive_wave(self,
                             idx_start: int,
@@ -66,51 +323,343 @@ class WaveAnalyzer:
         if wave_config is None:
             wave_config = [0, 0, 0, 0, 0]
 
-        wave1 = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=idx_start, skip=wave_config[0])
-        wave1.label = '1'
+        wave1 = self.build_monowave(MonoWaveUp, idx_start=idx_start, skip=wave_config[0])
         wave1_end = wave1.idx_end
         if wave1_end is None:
             if self.verbose: print("Wave 1 has no End in Data")
             return False
 
-        wave2 = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave1_end, skip=wave_config[1])
-        wave2.label = '2'
+        wave2 = self.build_monowave(MonoWaveDown, idx_start=wave1_end, skip=wave_config[1])
         wave2_end = wave2.idx_end
         if wave2_end is None:
             if self.verbose: print("Wave 2 has no End in Data")
             return False
 
-        wave3 = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave2_end, skip=wave_config[2])
-        wave3.label = '3'
+        wave3 = self.build_monowave(MonoWaveUp, idx_start=wave2_end, skip=wave_config[2])
         wave3_end = wave3.idx_end
         if wave3_end is None:
             if self.verbose: print("Wave 3 has no End in Data")
             return False
 
-        wave4 = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave3_end, skip=wave_config[3])
-        wave4.label = '4'
+        wave4 = self.build_monowave(MonoWaveDown, idx_start=wave3_end, skip=wave_config[3])
         wave4_end = wave4.idx_end
 
         if wave4_end is None:
             if self.verbose: print("Wave 4 has no End in Data")
             return False
 
-        if wave2.low > np.min(self.lows[wave2.low_idx:wave4.low_idx]):
+        if not self.wave2_wave4_valid(wave2, wave4):
             return False
 
-        wave5 = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=wave4_end, skip=wave_config[4])
-        wave5.label = '5'
+        wave5 = self.build_monowave(MonoWaveUp, idx_start=wave4_end, skip=wave_config[4])
         wave5_end = wave5.idx_end
         if wave5_end is None:
             if self.verbose: print("Wave 5 has no End in Data")
             return False
 
-        if self.lows[wave4.low_idx:wave5.high_idx].any() and wave4.low > np.min(self.lows[wave4.low_idx:wave5.high_idx]):
-            if self.verbose: print('Low of Wave 4 higher than a low between Wave 4 and Wave 5')
+        if not self.wave4_wave5_valid(wave4, wave5):
             return False
 
         return [wave1, wave2, wave3, wave4, wave5]
 
+    def wave2_wave4_valid(self, wave2: MonoWaveDown, wave4: MonoWaveDown) -> bool:
+        """
+        The low of wave 2 must not be undercut between the end of wave 2 and the end of wave 4
+
+        :param wave2:
+        :param wave4:
+        :return:
+        """
+        if self.instrumentation is not None:
+            start = time.perf_counter_ns()
+        valid = check_wave2_wave4(self.range_index.lows_min, wave2.low, wave2.low_idx, wave4.low_idx)
+        if self.instrumentation is not None:
+            self.instrumentation.record('wave2_wave4', time.perf_counter_ns() - start, not valid)
+
+        if not valid:
+            if self.verbose: print('Low of Wave 2 higher than a low between Wave 2 and Wave 4')
+        return valid
+
+    def wave4_wave5_valid(self, wave4: MonoWaveDown, wave5: MonoWaveUp) -> bool:
+        """
+        The low of wave 4 must not be undercut between the end of wave 4 and the end of wave 5
+
+        :param wave4:
+        :param wave5:
+        :return:
+        """
+        if self.instrumentation is not None:
+            start = time.perf_counter_ns()
+        valid = check_wave4_wave5(self.range_index.lows_min, self.range_index.lows_max, wave4.low, wave4.low_idx,
+                                  wave5.high_idx)
+        if self.instrumentation is not None:
+            self.instrumentation.record('wave4_wave5', time.perf_counter_ns() - start, not valid)
+
+        if not valid:
+            if self.verbose: print('Low of Wave 4 higher than a low between Wave 4 and Wave 5')
+        return valid
+
+    def find_impulsive_waves(self,
+                             idx_start: int,
+                             up_to: int = None,
+                             rules: list = None,
+                             memo: dict = None):
+        """
+        Depth-first variant of find_impulsive_wave for all WaveOptions of a WaveOptionsGenerator5(up_to).
+
+        The WaveOptions are walked as a tree, e.g. [2, 3, 0, 0, 0] and [2, 3, 1, 4, 0] share the node [2, 3], so
+        wave1 and wave2 are only build once for all options below that node. A node is pruned together with all
+        options below it as soon as its MonoWave has no end or the wave2 / wave4 low check fails.
+
+        Once a skip ladder saturates (ties, see next_hi), every larger skip gives the same wave and the same patterns
+        below it. These skips are not walked, see distinct_skips.
+
+        If rules are given, a node is also pruned as soon as every rule has a failing condition which can be decided
+        with the waves built so far (see WaveRule.conditions_at).
+
+        The order of the yielded options is the same as WaveOptionsGenerator5(up_to).options_sorted
+
+        :param idx_start: index in dataframe to start from
+        :param up_to: skip limit per wave, defaults to the limit of set_combinatorial_limits
+        :param rules: WaveRules, e.g. [Impulse, LeadingDiagonal]. Only patterns fulfilling at least one are returned
+        :param memo: results of the subtrees with only final waves from a former search with the same arguments,
+                     which are reused instead of searched again. Is updated by the search, see LiveSearch.
+        :return: generator of (WaveOptions, list of the 5 MonoWaves) for every option find_impulsive_wave would
+                 return waves for. Returns True if the result cannot change when candles are appended.
+        """
+        if up_to is None:
+            up_to = self.__waveoptions_up.up_to
+
+        monowaves = [MonoWaveUp, MonoWaveDown, MonoWaveUp, MonoWaveDown, MonoWaveUp]
+        return (yield from self.__walk(idx_start, up_to, monowaves, rules or [], [], [], memo,
+                                       [] if memo is not None else None))
+
+    def scan_impulsive_waves(self,
+                             idx_start: int,
+                             up_to: int = None,
+                             rules: list = None):
+        """
+        Same search as find_impulsive_waves with rules, but completely in compiled code (see impulse_scan). Only the
+        skips and wave indices of the hits are returned, the waves of a hit can be build with find_impulsive_wave.
+
+        :param idx_start: index in dataframe to start from
+        :param up_to: skip limit per wave, defaults to the limit of set_combinatorial_limits
+        :param rules: Impulse and / or LeadingDiagonal rules, defaults to both
+        :return: (options, nodes, matches) arrays: options[i] are the skips of hit i, nodes[i] the start of wave1
+                 followed by the ends of the 5 waves and matches[i, r] is True if rules[r] is fulfilled
+        """
+        if up_to is None:
+            up_to = self.__waveoptions_up.up_to
+
+        return impulse_scan(self.lows, self.highs, idx_start, up_to, self.__compiled_rule_ids(rules),
+                            self.range_index.lows_min, self.range_index.lows_max, self.range_index.highs_max,
+                            self.pivot_index.table)
+
+    def scan_impulsive_waves_from(self,
+                                  idx_starts: list,
+                                  up_to: int = None,
+                                  rules: list = None,
+                                  workers: int = None):
+        """
+        scan_impulsive_waves for many start indices, e.g. all swing lows, distributed over a pool of threads.
+        The compiled scan releases the GIL, so the starts run in parallel on all cores while sharing the arrays of
+        this WaveAnalyzer instead of copying them per task.
+
+        :param idx_starts: indices in dataframe to start from
+        :param up_to: skip limit per wave, defaults to the limit of set_combinatorial_limits
+        :param rules: Impulse and / or LeadingDiagonal rules, defaults to both
+        :param workers: number of threads, defaults to the number of CPUs
+        :return: (options, nodes, matches) like scan_impulsive_waves, the hits of all starts concatenated in the
+                 order of idx_starts. nodes[:, 0] is the start of a hit.
+        """
+        if up_to is None:
+            up_to = self.__waveoptions_up.up_to
+        if rules is None:
+            rules = [Impulse('impulse'), LeadingDiagonal('leading diagonal')]
+
+        rule_ids = self.__compiled_rule_ids(rules)
+
+        def scan(idx_start):
+            final = np.ones(1, dtype=bool)
+            return (*impulse_scan(self.lows, self.highs, int(idx_start), up_to, rule_ids, self.range_index.lows_min,
+                                  self.range_index.lows_max, self.range_index.highs_max, self.pivot_index.table,
+                                  final), final[0])
+
+        def scan_starts(starts):
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+                return list(executor.map(scan, starts))
+
+        return self.__scan_from('impulsive_waves', idx_starts, up_to, rules, scan_starts, 5)
+
+    def scan_corrective_waves_from(self,
+                                   idx_starts: list,
+                                   up_to: int = None,
+                                   rules: list = None):
+        """
+        find_corrective_waves for many start indices, with the results as arrays like scan_impulsive_waves_from
+
+        :param idx_starts: indices in dataframe to start from, e.g. the swing highs
+        :param up_to: skip limit per wave, defaults to the limit of set_combinatorial_limits
+        :param rules: WaveRules, defaults to [Correction]
+        :return: (options, nodes, matches): options[i] are the 3 skips of hit i, nodes[i] the start of waveA followed
+                 by the ends of the 3 waves and matches[i, r] is True if rules[r] is fulfilled
+        """
+        if up_to is None:
+            up_to = self.__waveoptions_down.up_to
+        if rules is None:
+            rules = [Correction('correction')]
+
+        def scan(idx_start):
+            search = self.find_corrective_waves(int(idx_start), up_to=up_to, rules=rules)
+            hits = list()
+            while True:
+                try:
+                    hits.append(next(search))
+                except StopIteration as stop:
+                    final = stop.value
+                    break
+
+            options = np.array([wave_options.values[:3] for wave_options, _ in hits], dtype=np.int64)
+            nodes = np.array([[waves[0].idx_start] + [wave.idx_end for wave in waves] for _, waves in hits],
+                             dtype=np.int64)
+            matches = np.array([[WavePattern(waves).check_rule(rule) for rule in rules] for _, waves in hits],
+                               dtype=bool)
+            return options.reshape(-1, 3), nodes.reshape(-1, 4), matches.reshape(-1, len(rules)), final
+
+        def scan_starts(starts):
+            return [scan(idx_start) for idx_start in starts]
+
+        return self.__scan_from('corrective_waves', idx_starts, up_to, rules, scan_starts, 3)
+
+    def __scan_from(self, search: str, idx_starts: list, up_to: int, rules: list, scan_starts, n_waves: int) -> tuple:
+        """
+        :param scan_starts: function scanning a list of starts, returns per start (options, nodes, matches, final)
+        :return: (options, nodes, matches) of all starts, read from result_cache as far as possible
+        """
+        if self.result_cache is not None:
+            results = self.result_cache.scan(self.lows, self.highs, ScanCache.config(search, rules, up_to),
+                                             idx_starts, scan_starts)
+        else:
+            results = [result[:3] for result in scan_starts(idx_starts)]
+
+        if not results:
+            return (np.empty((0, n_waves), dtype=np.int64), np.empty((0, n_waves + 1), dtype=np.int64),
+                    np.empty((0, len(rules)), dtype=bool))
+
+        return tuple(np.concatenate(arrays) for arrays in zip(*results))
+
+    def __compiled_rule_ids(self, rules: list = None) -> np.array:
+        if rules is None:
+            rules = [Impulse('impulse'), LeadingDiagonal('leading diagonal')]
+
+        rule_ids = list()
+        for rule in rules:
+            # a subclass may change the conditions, an adaptive rule learns from every checked pattern
+            if type(rule) is Impulse:
+                rule_ids.append(IMPULSE)
+            elif type(rule) is LeadingDiagonal:
+                rule_ids.append(LEADING_DIAGONAL)
+            else:
+                raise TypeError(f'{type(rule).__name__} is not available in compiled code, only Impulse and '
+                                f'LeadingDiagonal are.')
+            if rule.adaptive:
+                raise ValueError(f'{rule.name} is adaptive, compiled code cannot learn its statistics.')
+
+        return np.array(rule_ids, dtype=np.int64)
+
+    def find_corrective_waves(self,
+                              idx_start: int,
+                              up_to: int = None,
+                              rules: list = None,
+                              memo: dict = None):
+        """
+        Depth-first variant of find_corrective_wave for all WaveOptions of a WaveOptionsGenerator3(up_to), see
+        find_impulsive_waves
+
+        :param idx_start: index in dataframe to start from
+        :param up_to: skip limit per wave, defaults to the limit of set_combinatorial_limits
+        :param rules: WaveRules, e.g. [Correction]. Only patterns fulfilling at least one are returned
+        :param memo: results of final subtrees of a former search, see find_impulsive_waves
+        :return: generator of (WaveOptions, list of the 3 MonoWaves), returns True if the result is final
+        """
+        if up_to is None:
+            up_to = self.__waveoptions_down.up_to
+
+        monowaves = [MonoWaveDown, MonoWaveUp, MonoWaveDown]
+        return (yield from self.__walk(idx_start, up_to, monowaves, rules or [], [], [], memo,
+                                       [] if memo is not None else None))
+
+    def __walk(self, idx_start: int, up_to: int, monowaves: list, rules: list, skips: list, waves: list,
+               memo: dict = None, found: list = None, path_final: bool = True) -> bool:
+        """
+        :return: True if the subtree only has final waves (see LiveSearch), with memo the results of such subtrees
+                 are stored in memo by their skips and collected in found
+        """
+        depth = len(waves)
+        is_impulse = len(monowaves) == 5
+        last_idx = len(self.lows) - 1
+        final = True
+
+        # WaveOptions are zero padded after the first 0, e.g. [2, 0, 0, 0, 0], skips repeating the wave of the skip
+        # before (saturated ladder) are left out
+        _, indices, _ = self.skip_ladder(monowaves[depth], idx_start, up_to - 1)
+        skip_range = range(0, distinct_skips(indices, up_to if depth == 0 or skips[-1] != 0 else 1))
+
+        for skip in skip_range:
+            if memo is not None and (*skips, skip) in memo:
+                found.extend(memo[(*skips, skip)])
+                yield from memo[(*skips, skip)]
+                continue
+
+            wave = self.build_monowave(monowaves[depth], idx_start=idx_start, skip=skip)
+            if wave.idx_end is None:
+                if self.verbose: print(f"Wave {depth + 1} has no End in Data")
+                final = False
+                continue
+
+            wave_final = wave.idx_end < last_idx
+            final = final and wave_final
+
+            if is_impulse and depth == 3 and not self.wave2_wave4_valid(waves[1], wave):
+                continue
+
+            if is_impulse and depth == 4 and not self.wave4_wave5_valid(waves[3], wave):
+                continue
+
+            rules_left = rules
+            if rules:
+                instrumentation = self.instrumentation
+                if instrumentation is not None:
+                    start = time.perf_counter_ns()
+                partial_pattern = WavePattern([*waves, wave])
+                rules_left = [rule for rule in rules
+                              if partial_pattern.check_rule(rule, depth=depth + 1, instrumentation=instrumentation)]
+                if instrumentation is not None:
+                    instrumentation.record(f'rules_wave{depth + 1}', time.perf_counter_ns() - start, not rules_left)
+                if not rules_left:
+                    continue
+
+            if depth == len(monowaves) - 1:
+                result = (WaveOptions(*skips, skip), [*waves, wave])
+                if found is not None:
+                    found.append(result)
+                yield result
+                continue
+
+            found_below = list() if memo is not None else None
+            subtree_final = yield from self.__walk(wave.idx_end, up_to, monowaves, rules_left, [*skips, skip],
+                                                   [*waves, wave], memo, found_below, path_final and wave_final)
+            final = final and subtree_final
+
+            if memo is not None:
+                found.extend(found_below)
+                if path_final and wave_final and subtree_final:
+                    memo[(*skips, skip)] = found_below
+                    for child in range(up_to):
+                        memo.pop((*skips, skip, child), None)
+
+        return final
+
     def find_corrective_wave(self,
                              idx_start: int,
                              wave_config: list = None):
@@ -125,20 +674,17 @@ class WaveAnalyzer:
         if wave_config is None:
             wave_config = [0, 0, 0]
 
-        waveA = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=idx_start, skip=wave_config[0])
-        waveA.label = 'A'
+        waveA = self.build_monowave(MonoWaveDown, idx_start=idx_start, skip=wave_config[0])
         waveA_end = waveA.idx_end
         if waveA_end is None:
             return False
 
-        waveB = MonoWaveUp(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=waveA_end, skip=wave_config[1])
-        waveB.label = 'B'
+        waveB = self.build_monowave(MonoWaveUp, idx_start=waveA_end, skip=wave_config[1])
         waveB_end = waveB.idx_end
         if waveB_end is None:
             return False
 
-        waveC = MonoWaveDown(lows=self.lows, highs=self.highs, dates=self.dates, idx_start=waveB_end, skip=wave_config[2])
-        waveC.label = 'C'
+        waveC = self.build_monowave(MonoWaveDown, idx_start=waveB_end, skip=wave_config[2])
         waveC_end = waveC.idx_end
         if waveC_end is None:
             return False
@@ -149,15 +695,13 @@ class WaveAnalyzer:
         if wave_config is None:
             wave_config = [0, 0]
 
-        wave1 = MonoWaveUp(self.df, idx_start=idx_start, skip=wave_config[0])
-        wave1.label = '1'
+        wave1 = self.build_monowave(MonoWaveUp, idx_start=idx_start, skip=wave_config[0])
         wave1_end = wave1.idx_end
         if wave1_end is None:
             if self.verbose: print("Wave 1 has no End in Data")
             return False
 
-        wave2 = MonoWaveDown(self.df, idx_start=wave1_end, skip=wave_config[1])
-        wave2.label = '2'
+        wave2 = self.build_monowave(MonoWaveDown, idx_start=wave1_end, skip=wave_config[1])
         wave2_end = wave2.idx_end
         if wave2_end is None:
             if self.verbose: print("Wave 2 has no End in Data")
@@ -167,40 +711,42 @@ class WaveAnalyzer:
 
     def next_cycle(self,
                    start_idx: int):
+        """
+        Finds WaveCycles (12345 impulse followed by an ABC correction) starting at start_idx.
+
+        Impulses and corrections are joined on the end of the impulse: the corrections starting at an index are only
+        searched once and reused for all impulses ending there, instead of repeating the search per impulse option.
 
+        :param start_idx: index in dataframe to start from
+        :return: generator of WaveCycles, one per impulse option which is followed by a correction (the correction
+                 of the largest correction option)
+        """
         impulse = Impulse('impulse')
         correction = Correction('correction')
 
-        wave_cycles = set()
-
-        for new_option_impulse in self.__waveoptions_up.options_sorted:
-
-            cycle_complete = False
-            waves_up = self.find_impulsive_wave(idx_start=start_idx,
-                                                wave_config=new_option_impulse.values)
-
-            if waves_up:
-                wavepattern_up = WavePattern(waves_up, verbose=False)
-                if wavepattern_up.check_rule(impulse):
-                    if self.verbose: ('Impulse found!', new_option_impulse.values)
-                    end = waves_up[4].idx_end
-
-                    for new_option_correction in self.__waveoptions_down.options_sorted:
-                        waves = self.find_corrective_wave(idx_start=end, wave_config=new_option_correction.values)
-                        if waves:
-                            wavepattern = WavePattern(waves, verbose=False)
-                            if wavepattern.check_rule(correction):
-
-                                cycle_complete = True
-                                wave_cycle = WaveCycle(wavepattern_up, wavepattern)
-                                wave_cycles.add(wave_cycle)
-
-                                # if wave_cycle not in wave_cycles:
-                                if self.verbose and wave_cycle not in wave_cycles:
-                                    print('Corrrection found!', new_option_correction.values)
-                                    print('*' * 40)
-
-                    if cycle_complete:
-                        yield wave_cycle
+        corrections_by_start = dict()
+
+        for new_option_impulse, waves_up in self.find_impulsive_waves(idx_start=start_idx, rules=[impulse]):
+            if self.verbose: print('Impulse found!', new_option_impulse.values)
+            end = waves_up[4].idx_end
+
+            if end not in corrections_by_start:
+                if self.instrumentation is not None:
+                    start = time.perf_counter_ns()
+                corrections_by_start[end] = [(new_option_correction, WavePattern(waves, verbose=False))
+                                             for new_option_correction, waves in
+                                             self.find_corrective_waves(idx_start=end, rules=[correction])]
+                if self.instrumentation is not None:
+                    self.instrumentation.record('corrections', time.perf_counter_ns() - start,
+                                                not corrections_by_start[end])
+
+            corrections = corrections_by_start.get(end)
+            if corrections:
+                new_option_correction, wavepattern = corrections[-1]
+                if self.verbose:
+                    print('Corrrection found!', new_option_correction.values)
+                    print('*' * 40)
+
+                yield WaveCycle(WavePattern(waves_up, verbose=False), wavepattern)
 
         return None
@@ -1,4 +1,5 @@
 from models.WavePattern import WavePattern
+from functools import cached_property
 
 class WaveCycle:
     """
@@ -13,11 +14,11 @@ class WaveCycle:
 
     @property
     def end_idx(self):
-        return self.wp_down.end_idx
+        return self.wp_down.idx_end
 
     @property
     def start_idx(self):
-        return self.wp_up.start_idx
+        return self.wp_up.idx_start
 
     def extract_waves(self):
         for key, wave in self.wp_up.waves.items():
@@ -26,23 +27,18 @@ class WaveCycle:
         for key, wave in self.wp_down.waves.items():
             self.waves.append(wave)
 
-    @property
-    def dates(self):
-        dates = self.wp_up.dates
-        dates.extend(self.wp_down.dates)
-        return dates
+    # tuples of the impulse followed by the correction, built once from the cached tuples of the WavePatterns
+    @cached_property
+    def dates(self) -> tuple:
+        return self.wp_up.dates + self.wp_down.dates
 
-    @property
-    def values(self):
-        values = self.wp_up.values
-        values.extend(self.wp_down.values)
-        return values
+    @cached_property
+    def values(self) -> tuple:
+        return self.wp_up.values + self.wp_down.values
 
-    @property
-    def labels(self):
-        labels = self.wp_up.labels
-        labels.extend(self.wp_down.labels)
-        return labels
+    @cached_property
+    def labels(self) -> tuple:
+        return self.wp_up.labels + self.wp_down.labels
 
     # @classmethod
     # def from_wave_options(cls, df: pd.DataFrame, waveoptions_up: WaveOptions, waveoptions_down: WaveOptions):
@@ -58,11 +54,7 @@ class WaveCycle:
     #     return cls(wave_pattern_up, wave_pattern_down)
 
     def __eq__(self, other):
-        if self.wp_down.values == other.wp_down.values and self.wp_up.values == other.wp_up.values:
-            return True
-        else:
-            return False
+        return self.wp_up.values == other.wp_up.values and self.wp_down.values == other.wp_down.values
 
     def __hash__(self):
-        str_to_hash = f'{self.wp_up.values}_{self.wp_down.values}'
-        return hash(str_to_hash)
+        return hash((self.wp_up.values, self.wp_down.values))
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import numpy as np
 
 class WaveOptions:
     """
@@ -26,11 +27,7 @@ class WaveOptions:
             return [self.i, self.j]
 
     def __hash__(self):
-        if self.k is not None:
-            hash_str = f'{self.i}_{self.j}_{self.k}_{self.l}_{self.m}'
-        else:
-            hash_str = f'{self.i}_{self.j}'
-        return hash(hash_str)
+        return hash((self.i, self.j, self.k, self.l, self.m))
 
     def __eq__(self, other):
         if self.k is not None:
@@ -89,7 +86,35 @@ class WaveOptions:
             return False
 
 
+def canonical_options(up_to: int, waves: int) -> np.array:
+    """
+    All WaveOptions with [waves] skips < up_to as rows of an integer array, sorted from [0, 0, ...] to
+    [up_to - 1, up_to - 1, ...]. Like in the generators, all skips after the first 0 are 0, e.g. [2, 1, 0, 0, 0].
+
+    :param up_to:
+    :param waves:
+    :return: (options x waves) array
+    """
+    dtype = np.int8 if up_to <= np.iinfo(np.int8).max else np.int32
+    if up_to <= 0:
+        return np.zeros((0, waves), dtype=dtype)
+
+    # the sorted options of n waves are [0, ...] followed by the sorted options of n - 1 waves prefixed with 1, 2, ...
+    options = np.zeros((1, 0), dtype=dtype)
+    for n in range(1, waves + 1):
+        prefixed = np.empty(((up_to - 1) * len(options), n), dtype=dtype)
+        prefixed[:, 0] = np.repeat(np.arange(1, up_to, dtype=dtype), len(options))
+        prefixed[:, 1:] = np.tile(options, (up_to - 1, 1))
+        options = np.concatenate([np.zeros((1, n), dtype=dtype), prefixed])
+
+    return options
+
+
 class WaveOptionsGenerator(ABC):
+    """
+    Generates all WaveOptions up to a limit. The options are stored as integer array in sorted order and WaveOptions
+    are only created while iterating over the generator.
+    """
     def __init__(self, up_to: int):
         self.__up_to = up_to
         self.options = self.populate()
@@ -103,17 +128,28 @@ class WaveOptionsGenerator(ABC):
         return len(self.options)
 
     @abstractmethod
-    def populate(self) -> set:
+    def populate(self) -> np.array:
         pass
 
+    def __iter__(self):
+        """
+        Yields the WaveOptions from small to large values [0,0,0,0,0] -> [n, n, n, n, n]
+        :return:
+        """
+        chunk_size = 4096
+        for chunk_start in range(0, len(self.options), chunk_size):
+            for values in self.options[chunk_start:chunk_start + chunk_size].tolist():
+                yield WaveOptions(*values)
+
     @property
     def options_sorted(self):
         """
         Will sort from small to large values [0,0,0,0,0] -> [n, n, n, n, n]
+
+        Builds all WaveOptions at once, iterate over the generator itself to create them one by one.
         :return:
         """
-        all_options = list(self.options)
-        return sorted(all_options)
+        return list(self)
 
 
 class WaveOptionsGenerator5(WaveOptionsGenerator):
@@ -121,60 +157,21 @@ class WaveOptionsGenerator5(WaveOptionsGenerator):
     WaveOptionsGenerator for impulsive 12345 movements
 
     """
-    def populate(self) -> set:
-        checked = set()
-
-        for i in range(0, self.up_to):
-            for j in range(0, self.up_to):
-                for k in range(0, self.up_to):
-                    for l in range(0, self.up_to):
-                        for m in range(0, self.up_to):
-
-                            if i == 0:
-                                j = k = l = m = 0
-                            if j == 0:
-                                k = l = m = 0
-                            if k == 0:
-                                l = m = 0
-                            if l == 0:
-                                m = 0
-                            wave_options = WaveOptions(i, j, k, l, m)
-                            checked.add(wave_options)
-        return checked
+    def populate(self) -> np.array:
+        return canonical_options(self.up_to, 5)
 
 
 class WaveOptionsGenerator2(WaveOptionsGenerator):
     """
     WaveOptions for 12 Waves
     """
-    def populate(self) -> set:
-        checked = list
-
-        for i in range(0, self.up_to):
-            for j in range(0, self.up_to):
-                if i == 0:
-                    j = 0
-
-                wave_options = WaveOptions(i, j, None, None, None)
-                checked.append(wave_options)
-        return checked
+    def populate(self) -> np.array:
+        return canonical_options(self.up_to, 2)
 
 
 class WaveOptionsGenerator3(WaveOptionsGenerator):
     """
     WaveOptions for corrective (ABC) like movements
     """
-    def populate(self) -> set:
-        checked = set()
-
-        for i in range(0, self.up_to):
-            for j in range(0, self.up_to):
-                for k in range(0, self.up_to):
-                    if i == 0:
-                        j = k = 0
-                    if j == 0:
-                        k = 0
-
-                    wave_options = WaveOptions(i, j, k, None, None)
-                    checked.add(wave_options)
-        return checked
+    def populate(self) -> np.array:
+        return canonical_options(self.up_to, 3)
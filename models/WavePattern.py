@@ -1,5 +1,23 @@
+from __future__ import annotations
 from models.WaveRules import WaveRule
-from models.MonoWave import MonoWaveUp, MonoWaveDown
+from models.Instrumentation import Instrumentation
+from functools import cached_property
+import time
+
+WAVE_LABELS = {5: '12345', 3: 'ABC', 2: '12'}
+
+
+def pattern_key(nodes) -> int:
+    """
+    Packs the wave indices of a pattern into one int: the number of indices followed by every index in 32 bits
+
+    :param nodes: start of the first wave followed by the ends of the waves, see WavePattern.nodes
+    :return:
+    """
+    key = len(nodes)
+    for node in nodes:
+        key = key << 32 | int(node)
+    return key
 
 
 class WavePattern:
@@ -22,52 +40,65 @@ class WavePattern:
 
         self.waves = __waves_dict
 
-    def check_rule(self, waverule: WaveRule) -> bool:
+    def check_rule(self, waverule: WaveRule, depth: int = None, instrumentation: Instrumentation = None) -> bool:
         """
         Checks if WaveRule is valid for the WavePattern
 
         :param waverule:
+        :param depth: only check the conditions which become decidable with wave [depth], e.g. to check a partial
+                      pattern while it is build up wave by wave. All conditions are checked if None.
+        :param instrumentation: records every evaluated condition as stage '<rule name>.<condition>'
         :return: True if all WaveRules are fullfilled, False otherwise
 
         """
-        for rule, conditions in waverule.conditions.items():
+        # the conditions are checked in the order of the WaveRule, which an adaptive WaveRule learns from the results
+        adaptive = waverule.adaptive
+
+        for rule, conditions in waverule.ordered_conditions(depth):
 
             no_of_waves = len(conditions.get('waves'))
             function = conditions.get('function')
             message = conditions.get('message')
 
+            # an adaptive WaveRule only samples the cost of a condition COST_SAMPLES times
+            sampled = adaptive and waverule.needs_timing(rule)
+            timed = instrumentation is not None or sampled
+            if timed:
+                start = time.perf_counter_ns()
+
             if no_of_waves == 2:
                 wave1 = self.waves.get(conditions.get('waves')[0])
                 wave2 = self.waves.get(conditions.get('waves')[1])
-                if not function(wave1, wave2):
-                    if self.__verobse:
-                        print(f'Rule Violation of {waverule.name} for condition {rule}: {message}')
-                    return False
+                valid = function(wave1, wave2)
 
             elif no_of_waves == 3:
                 wave1 = self.waves.get(conditions.get('waves')[0])
                 wave2 = self.waves.get(conditions.get('waves')[1])
                 wave3 = self.waves.get(conditions.get('waves')[2])
-
-                if not function(wave1, wave2, wave3):
-                    if self.__verobse:
-                        print(f'Rule Violation of {waverule.name} for condition {rule}: {message}')
-                    return False
+                valid = function(wave1, wave2, wave3)
 
             elif no_of_waves == 4:
                 wave1 = self.waves.get(conditions.get('waves')[0])
                 wave2 = self.waves.get(conditions.get('waves')[1])
                 wave3 = self.waves.get(conditions.get('waves')[2])
                 wave4 = self.waves.get(conditions.get('waves')[3])
-
-                if not function(wave1, wave2, wave3, wave4):
-                    if self.__verobse:
-                        print(f'Rule Violation of {waverule.name} for condition {rule}: {message}')
-                    return False
+                valid = function(wave1, wave2, wave3, wave4)
 
             else:
                 raise NotImplementedError('other than 2 or 3 waves as argument not implemented')
 
+            if timed:
+                ns = time.perf_counter_ns() - start
+                if instrumentation is not None:
+                    instrumentation.record(f'{waverule.name}.{rule}', ns, not valid)
+            if adaptive:
+                waverule.record(rule, not valid, ns if sampled else None)
+
+            if not valid:
+                if self.__verobse:
+                    print(f'Rule Violation of {waverule.name} for condition {rule}: {message}')
+                return False
+
         return True
 
     @property
@@ -89,50 +120,63 @@ class WavePattern:
         else:
             return self.waves.get('wave3').idx_end
 
-    @property
-    def dates(self):
-        dates = list()
-        for wave_no, wave in self.waves.items():
-            dates.extend(wave.dates)
-
-        return dates
-
-    @property
-    def values(self):
-        values = list()
-        for wave_no, wave in self.waves.items():
-            if isinstance(wave, MonoWaveUp):
-                values.extend([wave.low, wave.high])
-            elif isinstance(wave, MonoWaveDown):
-                values.extend([wave.high, wave.low])
-            else:
-                raise NotImplementedError()
+    @cached_property
+    def dates(self) -> tuple:
+        """
+        Start and end date of every wave, computed on first access like values and labels. The waves of a pattern do
+        not change, so the tuples can be shared, e.g. by WaveCycle and plots.
+        """
+        return tuple(date for wave in self.waves.values() for date in wave.dates)
 
-        return values
+    @cached_property
+    def values(self) -> tuple:
+        return tuple(value for wave in self.waves.values() for value in wave.points)
 
-    @property
-    def labels(self) -> list:
+    @cached_property
+    def labels(self) -> tuple:
         """
         Labels 12345 for impulse and ABC for correction to be placed at the end of the waves in the plots.
 
+        The label of a wave follows from its position in the pattern, MonoWaves do not carry labels as the same
+        (cached) MonoWave can be e.g. wave 3 of one pattern and wave B of another.
+
         :return:
         """
         labels = list()
         reference_length = next(iter(self.waves.items()))[1].length
 
-        for wave_no, wave in self.waves.items():
-            if wave.label in ['B', '2', '3']:
-                labels.extend([" ", f'{wave.label} ({round(wave.length/reference_length, 3)})'])
+        for label, wave in zip(self.wave_labels, self.waves.values()):
+            if label in ['B', '2', '3']:
+                labels.extend([" ", f'{label} ({round(wave.length/reference_length, 3)})'])
             else:
-                labels.extend([" ", f'{wave.label}'])
-        return labels
+                labels.extend([" ", f'{label}'])
+        return tuple(labels)
+
+    @property
+    def wave_labels(self) -> str:
+        """
+        :return: the label of every wave, e.g. '12345' for 5 waves and 'ABC' for 3 waves
+        """
+        return WAVE_LABELS.get(len(self.waves), ''.join(str(i + 1) for i in range(len(self.waves))))
+
+    @cached_property
+    def nodes(self) -> tuple:
+        """
+        :return: start of the first wave followed by the ends of the waves, the indices which define the pattern
+        """
+        waves = list(self.waves.values())
+        return (int(waves[0].idx_start), *(int(wave.idx_end) for wave in waves))
+
+    @cached_property
+    def key(self) -> int:
+        """
+        Identity of the pattern, see pattern_key. Options which lead to the same waves, e.g. a skip beyond the last
+        extremum, give the same key.
+        """
+        return pattern_key(self.nodes)
 
     def __eq__(self, other):
-        if all([self.waves[key].low == other.waves[key].low and self.waves[key].high == other.waves[key].high for key, value in self.waves.items()]):
-            return True
-        else:
-            return False
+        return isinstance(other, WavePattern) and self.key == other.key
 
     def __hash__(self):
-        hash_str = f'{self.low}{self.high}'
-        return hash(hash_str)
+        return hash(self.key)
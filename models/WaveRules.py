@@ -1,23 +1,195 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+import numpy as np
+
+
+COST_SAMPLES = 64  # evaluations per condition which are timed to estimate its cost in the adaptive mode
 
 
 class WaveRule(ABC):
     """
     base class for implementing wave rules
+
+    A pattern fulfills the rule if all conditions are fulfilled, so they can be checked in any order. As check_rule
+    stops at the first violated condition, checking cheap and often violated conditions first saves time. In the
+    adaptive mode a rule learns rejection rate and cost of its conditions while patterns are checked and sorts them by
+    cost / rejection rate every adapt_every evaluations. The order can also be set from a profile, see load_profile.
     """
-    def __init__(self, name: str):
+    def __init__(self, name: str, adaptive: bool = False, adapt_every: int = 1024):
+        """
+        :param name:
+        :param adaptive: learn rejection rate and cost of the conditions and reorder them
+        :param adapt_every: number of evaluated conditions between two reorderings
+        """
         self.name = name
         self.conditions = self.set_conditions()
 
+        # depth of a condition = number of waves that have to exist to decide it, e.g. 3 for ["wave1", "wave3"]
+        self.depths = {rule: max(int(wave[len('wave'):]) for wave in conditions.get('waves'))
+                       for rule, conditions in self.conditions.items()}
+
+        self.adaptive = adaptive
+        self.adapt_every = adapt_every
+        # order in which check_rule evaluates the conditions
+        self.order = list(self.conditions.keys())
+        # rule -> [evaluations, rejections, timed evaluations, nanoseconds of the timed evaluations]
+        self.statistics = {rule: [0, 0, 0, 0] for rule in self.conditions}
+
+        self.__evaluations = 0
+        self.__ordered = dict()
+
     @abstractmethod
     def set_conditions(self):
         pass
 
+    def ordered_conditions(self, depth: int = None) -> list:
+        """
+        (rule, conditions) in the order of evaluation
+
+        :param depth: only the conditions of conditions_at(depth), all if None
+        :return:
+        """
+        ordered = self.__ordered.get(depth)
+        if ordered is None:
+            ordered = [(rule, self.conditions[rule]) for rule in self.order
+                       if depth is None or self.depths[rule] == depth]
+            self.__ordered[depth] = ordered
+        return ordered
+
+    def needs_timing(self, rule: str) -> bool:
+        """
+        True if the next evaluation of the condition should be timed to learn its cost (adaptive mode only)
+        """
+        return self.adaptive and self.statistics[rule][2] < COST_SAMPLES
+
+    def record(self, rule: str, rejected: bool, ns: int = None):
+        """
+        Records an evaluation of a condition in the adaptive mode and reorders the conditions every adapt_every
+        evaluations
+
+        :param rule: name of the condition
+        :param rejected: True if the condition was violated
+        :param ns: duration of the evaluation if it was timed
+        :return:
+        """
+        statistics = self.statistics[rule]
+        statistics[0] += 1
+        statistics[1] += rejected
+        if ns is not None:
+            statistics[2] += 1
+            statistics[3] += ns
+
+        self.__evaluations += 1
+        if self.__evaluations % self.adapt_every == 0:
+            self.reorder()
+
+    def reorder(self):
+        """
+        Sorts the conditions by expected cost per rejection, cost / P(rejection). The rejection rate is smoothed, so
+        conditions which were (almost) never evaluated get a neutral estimate.
+
+        :return:
+        """
+        timed = [ns / samples for _, _, samples, ns in self.statistics.values() if samples]
+        default_cost = sum(timed) / len(timed) if timed else 1.0
+
+        def expected_cost(rule):
+            evaluations, rejections, samples, ns = self.statistics[rule]
+            cost = ns / samples if samples else default_cost
+            return cost * (evaluations + 2) / (rejections + 1)
+
+        self.order = sorted(self.conditions.keys(), key=expected_cost)
+        self.__ordered.clear()
+
+    def profile(self) -> dict:
+        """
+        :return: the learned statistics like an Instrumentation report, {'<name>.<rule>': {count, rejected, ...}}
+        """
+        return {f'{self.name}.{rule}': {'count': evaluations,
+                                        'rejected': rejections,
+                                        'rejection_rate': rejections / evaluations if evaluations else 0.0,
+                                        'seconds': ns / samples * evaluations / 1e9 if samples else 0.0,
+                                        'mean_us': ns / samples / 1e3 if samples else 0.0}
+                for rule, (evaluations, rejections, samples, ns) in self.statistics.items()}
+
+    def load_profile(self, profile: dict):
+        """
+        Sets the statistics from a profile and reorders the conditions, e.g. profile() of a former scan or the report
+        of an Instrumentation which recorded this rule (stages '<name>.<rule>')
+
+        :param profile:
+        :return:
+        """
+        for rule in self.conditions:
+            entry = profile.get(f'{self.name}.{rule}')
+            if entry is not None:
+                samples = min(entry['count'], COST_SAMPLES)
+                self.statistics[rule] = [entry['count'], entry['rejected'], samples,
+                                         entry['mean_us'] * 1e3 * samples]
+        self.reorder()
+
+    def conditions_at(self, depth: int) -> dict:
+        """
+        Conditions which can be decided as soon as the first [depth] waves of a pattern exist, but not before
+
+        :param depth: number of waves built so far
+        :return:
+        """
+        return dict(self.ordered_conditions(depth))
+
+    def check_batch(self, table) -> RuleMask:
+        """
+        Checks the WaveRule for all candidate patterns of a PatternTable at once. The condition functions are called
+        with columns of the table instead of MonoWaves, conditions which cannot be evaluated element-wise (e.g. using
+        `and` / `not`) provide a "vectorized" function.
+
+        :param table: PatternTable
+        :return: RuleMask with the result and the failed conditions per pattern
+        """
+        waves = {f'wave{no}': table.wave(no) for no in range(1, table.number_of_waves + 1)}
+        failures = np.zeros(table.number, dtype=np.uint64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for bit, conditions in enumerate(self.conditions.values()):
+                function = conditions.get('vectorized', conditions.get('function'))
+                fulfilled = function(*[waves.get(wave) for wave in conditions.get('waves')])
+                failed = np.logical_not(np.broadcast_to(fulfilled, (table.number, )))
+                failures |= failed.astype(np.uint64) << np.uint64(bit)
+
+        return RuleMask(self, failures)
+
     def __repr__(self):
         return str(self.conditions)
 
 
+class RuleMask:
+    """
+    Result of WaveRule.check_batch: bit n of failures[i] is set if the n-th condition (in order of the conditions
+    dict) is violated by pattern i
+    """
+    def __init__(self, waverule: WaveRule, failures: np.array):
+        self.waverule = waverule
+        self.failures = failures
+
+    @property
+    def mask(self) -> np.array:
+        return self.failures == 0
+
+    def failed_conditions(self, idx: int) -> list:
+        """
+        names of the conditions pattern idx violates in the order of evaluation (WaveRule.order), the first one is the
+        one check_rule stops at
+
+        :param idx:
+        :return:
+        """
+        bits = {rule: bit for bit, rule in enumerate(self.waverule.conditions.keys())}
+        return [rule for rule in self.waverule.order if int(self.failures[idx]) >> bits[rule] & 1]
+
+    def messages(self, idx: int) -> list:
+        return [self.waverule.conditions[rule].get('message') for rule in self.failed_conditions(idx)]
+
+
 class Impulse(WaveRule):
     """
     Rules for an impulsive wave according to
@@ -50,6 +222,9 @@ class Impulse(WaveRule):
                 "function": lambda wave1, wave3, wave5: not (
                     wave3.length < wave5.length and wave3.length < wave1.length
                 ),
+                "vectorized": lambda wave1, wave3, wave5: ~(
+                    (wave3.length < wave5.length) & (wave3.length < wave1.length)
+                ),
                 "message": "Wave3 is the shortest Wave.",
             },
             "w3_2": {
@@ -209,6 +384,11 @@ class LeadingDiagonal(WaveRule):
                 > self.slope(wave1.idx_end, wave3.idx_end, wave1.high, wave3.high)
                 and self.slope(wave1.idx_end, wave3.idx_end, wave1.high, wave3.high)
                 > 0,
+                "vectorized": lambda wave1, wave2, wave3, wave4: (
+                    self.slope(wave2.idx_end, wave4.idx_end, wave2.low, wave4.low)
+                    > self.slope(wave1.idx_end, wave3.idx_end, wave1.high, wave3.high)
+                )
+                & (self.slope(wave1.idx_end, wave3.idx_end, wave1.high, wave3.high) > 0),
                 "message": "Trend lines of Wave1-3 and Wave2-4 not forming Leading Diagonal.",
             },
             "w2_1": {
@@ -232,6 +412,9 @@ class LeadingDiagonal(WaveRule):
                 "function": lambda wave1, wave3, wave5: not (
                     wave3.length < wave5.length and wave3.length < wave1.length
                 ),
+                "vectorized": lambda wave1, wave3, wave5: ~(
+                    (wave3.length < wave5.length) & (wave3.length < wave1.length)
+                ),
                 "message": "Wave3 is the shortest Wave.",
             },
             "w3_2": {
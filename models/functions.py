@@ -1,7 +1,7 @@
 from numba import njit
 import numpy as np
 
-@njit
+@njit(cache=True)
 def hi(lows_arr: np.array, highs_arr: np.array, idx_start: int = 0):
     """
     Given idx_start (and a previous high), this returns the next high, high_idx
@@ -23,7 +23,7 @@ def hi(lows_arr: np.array, highs_arr: np.array, idx_start: int = 0):
 
     return high, high_idx
 
-@njit
+@njit(cache=True)
 def next_hi(lows_arr: np.array, highs_arr: np.array, idx_start: int = 0, prev_high: float = 0):
     """
     Given idx_start (and a previous high), this returns the next high, high_idx
@@ -58,7 +58,7 @@ def next_hi(lows_arr: np.array, highs_arr: np.array, idx_start: int = 0, prev_hi
 
     return None, None
 
-@njit
+@njit(cache=True)
 def next_lo(lows_arr: np.array, highs_arr: np.array, idx_start: int, prev_low: float):
     low = highs_arr[idx_start]
     prev_low_reached = False
@@ -84,7 +84,7 @@ def next_lo(lows_arr: np.array, highs_arr: np.array, idx_start: int, prev_low: f
 
     return None, None
 
-@njit
+@njit(cache=True)
 def lo(lows_arr: np.array, highs_arr: np.array, idx_start):
     low_idx = idx_start
     low = highs_arr[idx_start]
@@ -97,4 +97,855 @@ def lo(lows_arr: np.array, highs_arr: np.array, idx_start):
         else:
             return low, low_idx
 
-    return low, low_idx
\ No newline at end of file
+    return low, low_idx
+
+RANGE_BLOCK_SIZE = 64
+
+
+@njit(cache=True)
+def build_range_table(arr: np.array, is_max: bool):
+    """
+    Builds a block sparse table to answer min (or max) queries over arbitrary ranges of arr in O(1).
+
+    Within a block of RANGE_BLOCK_SIZE values the prefix and suffix minima are stored, across blocks a sparse table
+    of the block minima. A query spanning several blocks combines the suffix of its first block, the prefix of its last
+    block and two overlapping entries of the sparse table. Needs about 2.2 x the memory of arr.
+
+    :param arr:
+    :param is_max: build a table for max instead of min queries
+    :return: table (arr, prefix, suffix, sparse, log_table, is_max) to be used with range_query
+    """
+    n = len(arr)
+    n_blocks = (n + RANGE_BLOCK_SIZE - 1) // RANGE_BLOCK_SIZE
+    prefix = np.empty(n)
+    suffix = np.empty(n)
+
+    log_table = np.zeros(n_blocks + 1, dtype=np.int64)
+    for i in range(2, n_blocks + 1):
+        log_table[i] = log_table[i // 2] + 1
+
+    sparse = np.empty((log_table[n_blocks] + 1 if n_blocks else 1, max(n_blocks, 1)))
+
+    for block in range(n_blocks):
+        start = block * RANGE_BLOCK_SIZE
+        stop = min(start + RANGE_BLOCK_SIZE, n)
+
+        prefix[start] = arr[start]
+        for idx in range(start + 1, stop):
+            prefix[idx] = max(prefix[idx - 1], arr[idx]) if is_max else min(prefix[idx - 1], arr[idx])
+
+        suffix[stop - 1] = arr[stop - 1]
+        for idx in range(stop - 2, start - 1, -1):
+            suffix[idx] = max(suffix[idx + 1], arr[idx]) if is_max else min(suffix[idx + 1], arr[idx])
+
+        sparse[0, block] = prefix[stop - 1]
+
+    for level in range(1, len(sparse)):
+        half = 1 << (level - 1)
+        for block in range(n_blocks - (1 << level) + 1):
+            left, right = sparse[level - 1, block], sparse[level - 1, block + half]
+            sparse[level, block] = max(left, right) if is_max else min(left, right)
+
+    return arr, prefix, suffix, sparse, log_table, is_max
+
+
+@njit(cache=True)
+def range_query(table: tuple, start: int, stop: int):
+    """
+    min (or max) of arr[start:stop] for a table of build_range_table
+
+    :param table:
+    :param start:
+    :param stop: exclusive like in a slice
+    :return: the min (max), inf (-inf) for an empty range
+    """
+    arr, prefix, suffix, sparse, log_table, is_max = table
+    if start >= stop:
+        return -np.inf if is_max else np.inf
+
+    last = stop - 1
+    first_block, last_block = start // RANGE_BLOCK_SIZE, last // RANGE_BLOCK_SIZE
+
+    if first_block == last_block:
+        result = arr[start]
+        for idx in range(start + 1, stop):
+            result = max(result, arr[idx]) if is_max else min(result, arr[idx])
+        return result
+
+    result = max(suffix[start], prefix[last]) if is_max else min(suffix[start], prefix[last])
+    if last_block - first_block > 1:
+        level = log_table[last_block - first_block - 1]
+        left, right = sparse[level, first_block + 1], sparse[level, last_block - (1 << level)]
+        result = max(result, max(left, right)) if is_max else min(result, min(left, right))
+
+    return result
+
+
+@njit(cache=True)
+def range_table_extend(arr: np.array, prefix: np.array, suffix: np.array, sparse: np.array, log_table: np.array,
+                       is_max: bool, start: int, values: np.array):
+    """
+    Appends values at arr[start:] and updates a table of build_range_table in place. The buffers need spare capacity
+    for the new values: arr, prefix and suffix for all values, sparse for all blocks and log_table has to be filled
+    up to the number of blocks of the capacity.
+
+    Per value the suffix of its block (at most RANGE_BLOCK_SIZE entries) and one entry per level of the sparse table
+    change, so appending does not depend on the length of arr.
+    """
+    for i in range(len(values)):
+        idx = start + i
+        arr[idx] = values[i]
+
+        block = idx // RANGE_BLOCK_SIZE
+        block_start = block * RANGE_BLOCK_SIZE
+        if idx == block_start:
+            prefix[idx] = arr[idx]
+        else:
+            prefix[idx] = max(prefix[idx - 1], arr[idx]) if is_max else min(prefix[idx - 1], arr[idx])
+
+        suffix[idx] = arr[idx]
+        for j in range(idx - 1, block_start - 1, -1):
+            suffix[j] = max(suffix[j + 1], arr[j]) if is_max else min(suffix[j + 1], arr[j])
+
+        sparse[0, block] = prefix[idx]
+        for level in range(1, len(sparse)):
+            first = block - (1 << level) + 1
+            if first < 0:
+                break
+            left, right = sparse[level - 1, first], sparse[level - 1, first + (1 << (level - 1))]
+            sparse[level, first] = max(left, right) if is_max else min(left, right)
+
+
+@njit(cache=True)
+def range_first(table: tuple, start: int, value: float):
+    """
+    First index >= start with arr[idx] >= value for a max table (arr[idx] <= value for a min table) of
+    build_range_table. Skips whole blocks with the block extrema, so it needs O(log n) instead of a linear scan.
+
+    :param table:
+    :param start:
+    :param value:
+    :return: the index, len(arr) if there is none
+    """
+    arr, prefix, suffix, sparse, log_table, is_max = table
+    n = len(arr)
+    if start >= n:
+        return n
+
+    first_block = start // RANGE_BLOCK_SIZE
+    if (suffix[start] >= value) if is_max else (suffix[start] <= value):
+        for idx in range(start, min((first_block + 1) * RANGE_BLOCK_SIZE, n)):
+            if (arr[idx] >= value) if is_max else (arr[idx] <= value):
+                return idx
+
+    # skip blocks without a match, largest jumps first. sparse can have spare capacity, see range_table_extend
+    n_blocks = (n + RANGE_BLOCK_SIZE - 1) // RANGE_BLOCK_SIZE
+    block = first_block + 1
+    for level in range(len(sparse) - 1, -1, -1):
+        if block + (1 << level) <= n_blocks:
+            extremum = sparse[level, block]
+            if (extremum < value) if is_max else (extremum > value):
+                block += 1 << level
+
+    if block >= n_blocks:
+        return n
+
+    for idx in range(block * RANGE_BLOCK_SIZE, min((block + 1) * RANGE_BLOCK_SIZE, n)):
+        if (arr[idx] >= value) if is_max else (arr[idx] <= value):
+            return idx
+    return n
+
+
+@njit(cache=True)
+def build_pivot_index(lows_arr: np.array, highs_arr: np.array):
+    """
+    For every index the end of the run of rising highs (falling lows) starting there. The ends of the runs are the
+    local maxima (minima) of the series.
+
+    The pivot index of a growing series (see pivot_index_extend) marks the runs reaching the last index with -1, as
+    they may still go on with the next candle.
+
+    :return: (run_end_hi, run_end_lo)
+    """
+    n = len(highs_arr)
+    run_end_hi = np.arange(n)
+    run_end_lo = np.arange(n)
+
+    for idx in range(n - 2, -1, -1):
+        if highs_arr[idx + 1] > highs_arr[idx]:
+            run_end_hi[idx] = run_end_hi[idx + 1]
+        if lows_arr[idx + 1] < lows_arr[idx]:
+            run_end_lo[idx] = run_end_lo[idx + 1]
+
+    return run_end_hi, run_end_lo
+
+
+@njit(cache=True)
+def pivot_index_extend(lows_arr: np.array, highs_arr: np.array, run_end_hi: np.array, run_end_lo: np.array,
+                       start: int, stop: int):
+    """
+    Updates the pivot index after the candles start to stop - 1 were appended to lows_arr and highs_arr. The buffers
+    run_end_hi and run_end_lo need room for stop entries, the runs reaching stop - 1 are marked with -1.
+
+    A run is only closed once, so appending is amortized O(1) per candle.
+    """
+    for idx in range(start, stop):
+        if idx == 0:
+            run_end_hi[idx], run_end_lo[idx] = -1, -1
+            continue
+
+        if highs_arr[idx] <= highs_arr[idx - 1]:
+            close = idx - 1
+            while close >= 0 and run_end_hi[close] < 0:
+                run_end_hi[close] = idx - 1
+                close -= 1
+        run_end_hi[idx] = -1
+
+        if lows_arr[idx] >= lows_arr[idx - 1]:
+            close = idx - 1
+            while close >= 0 and run_end_lo[close] < 0:
+                run_end_lo[close] = idx - 1
+                close -= 1
+        run_end_lo[idx] = -1
+
+
+@njit(nogil=True, cache=True)
+def running_min_records(values: np.array, current: float, ties: int, floor: float):
+    """
+    Indices of the candles which are at least as low as all candles before them (and current), at most 2 per value.
+    For any prev_low these contain the first two candles <= prev_low, which is all next_lo needs to tell if its
+    search ends in a tie (a fixed point of the skip ladder) or runs below prev_low. Use -values and -floor for the
+    highs and next_hi.
+
+    :param values: lows of a part of the series
+    :param current: lowest value before values, inf at the start
+    :param ties: number of records with the value current
+    :param floor: the search stops after the first record below floor
+    :return: (indices, current, ties, done), done is True if a record below floor was found
+    """
+    indices = np.empty(len(values), dtype=np.int64)
+    count = 0
+    for idx in range(len(values)):
+        value = values[idx]
+        if value < current:
+            current, ties = value, 1
+        elif value == current and ties < 2:
+            ties += 1
+        else:
+            continue
+
+        indices[count] = idx
+        count += 1
+        if value < floor:
+            return indices[:count].copy(), current, ties, True
+
+    return indices[:count].copy(), current, ties, False
+
+
+@njit(cache=True)
+def hi_indexed(lows_arr: np.array, highs_arr: np.array, idx_start: int, pivots: tuple):
+    """
+    Same as hi, but a lookup in the pivot index (run_end_hi, run_end_lo, highs_max, lows_min)
+    """
+    run_end_hi = pivots[0]
+    if idx_start + 1 < len(highs_arr) and highs_arr[idx_start + 1] > lows_arr[idx_start]:
+        high_idx = run_end_hi[idx_start + 1]
+        if high_idx < 0:
+            high_idx = len(highs_arr) - 1
+        return highs_arr[high_idx], high_idx
+
+    return lows_arr[idx_start], idx_start
+
+
+@njit(cache=True)
+def lo_indexed(lows_arr: np.array, highs_arr: np.array, idx_start: int, pivots: tuple):
+    """
+    Same as lo, but a lookup in the pivot index (run_end_hi, run_end_lo, highs_max, lows_min)
+    """
+    run_end_lo = pivots[1]
+    if idx_start + 1 < len(lows_arr) and lows_arr[idx_start + 1] < highs_arr[idx_start]:
+        low_idx = run_end_lo[idx_start + 1]
+        if low_idx < 0:
+            low_idx = len(lows_arr) - 1
+        return lows_arr[low_idx], low_idx
+
+    return highs_arr[idx_start], idx_start
+
+
+@njit(cache=True)
+def next_hi_indexed(lows_arr: np.array, highs_arr: np.array, idx_start: int, prev_high: float, pivots: tuple):
+    """
+    Same as next_hi: the first high exceeding prev_high is found in the range table of the highs, the end of its
+    rise in run_end_hi. A high equal to prev_high is resolved by next_hi.
+    """
+    run_end_hi, highs_max = pivots[0], pivots[2]
+    idx = range_first(highs_max, idx_start + 1, prev_high)
+    if idx >= len(highs_arr):
+        return None, None
+    if highs_arr[idx] == prev_high:
+        return next_hi(lows_arr, highs_arr, idx_start, prev_high)
+
+    high_idx = run_end_hi[idx]
+    if high_idx < 0 or high_idx == len(highs_arr) - 1:
+        return None, None
+    return highs_arr[high_idx], high_idx
+
+
+@njit(cache=True)
+def next_lo_indexed(lows_arr: np.array, highs_arr: np.array, idx_start: int, prev_low: float, pivots: tuple):
+    """
+    Same as next_lo: the first low below prev_low is found in the range table of the lows, the end of its fall in
+    run_end_lo. A low equal to prev_low is resolved by next_lo.
+    """
+    run_end_lo, lows_min = pivots[1], pivots[3]
+    idx = range_first(lows_min, idx_start + 1, prev_low)
+    if idx >= len(lows_arr):
+        return None, None
+    if lows_arr[idx] == prev_low:
+        return next_lo(lows_arr, highs_arr, idx_start, prev_low)
+
+    low_idx = run_end_lo[idx]
+    if low_idx < 0 or low_idx == len(lows_arr) - 1:
+        return None, None
+    return lows_arr[low_idx], low_idx
+
+
+@njit(cache=True)
+def check_wave2_wave4(lows_min: tuple, wave2_low: float, wave2_low_idx: int, wave4_low_idx: int):
+    """
+    The low of wave 2 must not be undercut between the end of wave 2 and the end of wave 4
+
+    :param lows_min: min range table of the lows
+    :return:
+    """
+    return not wave2_low > range_query(lows_min, wave2_low_idx, wave4_low_idx)
+
+
+@njit(cache=True)
+def check_wave4_wave5(lows_min: tuple, lows_max: tuple, wave4_low: float, wave4_low_idx: int, wave5_high_idx: int):
+    """
+    The low of wave 4 must not be undercut between the end of wave 4 and the end of wave 5. Like the original slice
+    check, the check is skipped if there are no (non zero) lows in between.
+
+    :param lows_min: min range table of the lows
+    :param lows_max: max range table of the lows
+    :return:
+    """
+    lowest = range_query(lows_min, wave4_low_idx, wave5_high_idx)
+    if wave4_low_idx >= wave5_high_idx or (lowest == 0 and range_query(lows_max, wave4_low_idx, wave5_high_idx) == 0):
+        return True
+
+    return not wave4_low > lowest
+
+
+@njit(cache=True)
+def hi_ladder(lows_arr: np.array, highs_arr: np.array, idx_start: int, max_skip: int, lows_max: tuple = None,
+              pivots: tuple = None):
+    """
+    Ends of the MonoWaveUp starting at idx_start for all skips 0..max_skip in one forward sweep.
+
+    Finding the end for skip n repeats the first n - 1 steps of skip n - 1, so the state after every step of the
+    skip loop in MonoWaveUp.find_end is the end for that skip.
+
+    :param idx_start:
+    :param max_skip:
+    :param lows_max: optional max range table of the lows (build_range_table)
+    :param pivots: optional pivot index (run_end_hi, run_end_lo, highs_max, lows_min) to find the highs by lookup
+    :return: arrays (values, indices, valid) of length max_skip + 1, indexed by skip
+    """
+    values = np.full(max_skip + 1, np.nan)
+    indices = np.full(max_skip + 1, -1, dtype=np.int64)
+    valid = np.zeros(max_skip + 1, dtype=np.bool_)
+
+    if pivots is None:
+        high, high_idx = hi(lows_arr, highs_arr, idx_start)
+    else:
+        high, high_idx = hi_indexed(lows_arr, highs_arr, idx_start, pivots)
+    low_at_start = lows_arr[idx_start]
+    values[0] = high
+    indices[0] = high_idx
+    valid[0] = True
+
+    for skip in range(1, max_skip + 1):
+        if pivots is None:
+            act_high, act_high_idx = next_hi(lows_arr, highs_arr, high_idx, high)
+        else:
+            act_high, act_high_idx = next_hi_indexed(lows_arr, highs_arr, high_idx, high, pivots)
+        if act_high is None:
+            break
+
+        if act_high > high:
+            if act_high_idx is None:
+                break
+            high = act_high
+            high_idx = int(act_high_idx)
+
+            # all lows between start and the new high are lower than the start -> no valid end for this skip
+            if lows_max is None:
+                undercut = True
+                for idx in range(idx_start, act_high_idx):
+                    if not lows_arr[idx] < low_at_start:
+                        undercut = False
+                        break
+            else:
+                undercut = range_query(lows_max, idx_start, act_high_idx) < low_at_start
+            if undercut:
+                break
+
+        values[skip] = high
+        indices[skip] = high_idx
+        valid[skip] = True
+
+    return values, indices, valid
+
+
+@njit(cache=True)
+def lo_ladder(lows_arr: np.array, highs_arr: np.array, idx_start: int, max_skip: int, highs_max: tuple = None,
+              pivots: tuple = None):
+    """
+    Ends of the MonoWaveDown starting at idx_start for all skips 0..max_skip in one forward sweep.
+
+    :param idx_start:
+    :param max_skip:
+    :param highs_max: optional max range table of the highs (build_range_table)
+    :param pivots: optional pivot index (run_end_hi, run_end_lo, highs_max, lows_min) to find the lows by lookup
+    :return: arrays (values, indices, valid) of length max_skip + 1, indexed by skip
+    """
+    values = np.full(max_skip + 1, np.nan)
+    indices = np.full(max_skip + 1, -1, dtype=np.int64)
+    valid = np.zeros(max_skip + 1, dtype=np.bool_)
+
+    if pivots is None:
+        low, low_idx = lo(lows_arr, highs_arr, idx_start)
+    else:
+        low, low_idx = lo_indexed(lows_arr, highs_arr, idx_start, pivots)
+    high_at_start = highs_arr[idx_start]
+    values[0] = low
+    indices[0] = low_idx
+    valid[0] = True
+
+    for skip in range(1, max_skip + 1):
+        if pivots is None:
+            act_low, act_low_idx = next_lo(lows_arr, highs_arr, low_idx, low)
+        else:
+            act_low, act_low_idx = next_lo_indexed(lows_arr, highs_arr, low_idx, low, pivots)
+        if act_low is None:
+            break
+
+        if act_low < low:
+            if act_low_idx is None:
+                break
+            low = act_low
+            low_idx = int(act_low_idx)
+
+            # a high between start and the new low exceeds the start -> no valid end for this skip
+            if highs_max is None:
+                highest = np.max(highs_arr[idx_start:act_low_idx])
+            else:
+                highest = range_query(highs_max, idx_start, act_low_idx)
+            if highest > high_at_start:
+                break
+
+        values[skip] = low
+        indices[skip] = low_idx
+        valid[skip] = True
+
+    return values, indices, valid
+
+
+@njit(cache=True)
+def build_monowave_graph(lows_arr: np.array, highs_arr: np.array, max_skip: int, lows_max: tuple,
+                         highs_max: tuple, pivots: tuple):
+    """
+    Builds the skip ladders of all indices as two graphs in CSR format, one for MonoWaveUp and one for MonoWaveDown
+    moves. The edges of node idx are the valid ends of the MonoWave starting at idx, ordered by skip. As the valid
+    skips of a ladder are always 0..n, edge indptr[idx] + skip is the end for skip.
+
+    :param max_skip:
+    :param lows_max: max range table of the lows
+    :param highs_max: max range table of the highs
+    :param pivots: pivot index (run_end_hi, run_end_lo, highs_max, lows_min)
+    :return: (up_indptr, up_end, up_value, down_indptr, down_end, down_value)
+    """
+    n = len(lows_arr)
+    up_indptr = np.zeros(n + 1, dtype=np.int64)
+    down_indptr = np.zeros(n + 1, dtype=np.int64)
+    up_end = np.empty(2 * n, dtype=np.int64)
+    up_value = np.empty(2 * n)
+    down_end = np.empty(2 * n, dtype=np.int64)
+    down_value = np.empty(2 * n)
+
+    for idx in range(n):
+        values, indices, valid = hi_ladder(lows_arr, highs_arr, idx, max_skip, lows_max, pivots)
+        pos = up_indptr[idx]
+        if pos + max_skip + 1 > len(up_end):
+            up_end = _grow(up_end, 2 * len(up_end) + max_skip + 1)
+            up_value = _grow(up_value, len(up_end))
+        for skip in range(max_skip + 1):
+            if not valid[skip]:
+                break
+            up_end[pos] = indices[skip]
+            up_value[pos] = values[skip]
+            pos += 1
+        up_indptr[idx + 1] = pos
+
+        values, indices, valid = lo_ladder(lows_arr, highs_arr, idx, max_skip, highs_max, pivots)
+        pos = down_indptr[idx]
+        if pos + max_skip + 1 > len(down_end):
+            down_end = _grow(down_end, 2 * len(down_end) + max_skip + 1)
+            down_value = _grow(down_value, len(down_end))
+        for skip in range(max_skip + 1):
+            if not valid[skip]:
+                break
+            down_end[pos] = indices[skip]
+            down_value[pos] = values[skip]
+            pos += 1
+        down_indptr[idx + 1] = pos
+
+    return (up_indptr, up_end[:up_indptr[n]].copy(), up_value[:up_indptr[n]].copy(),
+            down_indptr, down_end[:down_indptr[n]].copy(), down_value[:down_indptr[n]].copy())
+
+
+@njit(cache=True)
+def _grow(arr: np.array, size: int):
+    grown = np.empty(size, dtype=arr.dtype)
+    grown[:len(arr)] = arr
+    return grown
+
+
+@njit(cache=True)
+def distinct_skips(ends: np.array, limit: int):
+    """
+    Number of skips worth searching from a ladder: a tie makes a ladder stay at its end (see next_hi), every larger
+    skip then repeats the wave and everything that can follow it. The skips from the first repetition on are left
+    out, except skip 1 repeating skip 0, as only skip 0 is followed by zero padding (WaveOptions convention).
+
+    :param ends: ends of the ladder by skip, e.g. the indices of hi_ladder or the edges of a node of the graph
+    :param limit: number of skips allowed
+    :return:
+    """
+    for skip in range(2, limit):
+        if ends[skip] == ends[skip - 1]:
+            return skip
+    return limit
+
+
+@njit(cache=True)
+def graph_paths(lows_min: tuple,
+                lows_max: tuple,
+                first_indptr: np.array,
+                first_end: np.array,
+                first_value: np.array,
+                second_indptr: np.array,
+                second_end: np.array,
+                second_value: np.array,
+                idx_start: int,
+                hops: int,
+                up_to: int,
+                impulse_checks: bool):
+    """
+    Enumerates the paths with [hops] edges alternating between the first and the second graph, starting at idx_start.
+    The skips of a path follow the WaveOptions convention (zero padded after the first 0, every skip < up_to) and
+    paths are returned in the order of the sorted WaveOptions. Skips repeating the wave of the skip before are left
+    out, see distinct_skips.
+
+    :param lows_min: min range table of the lows
+    :param lows_max: max range table of the lows
+    :param impulse_checks: apply the wave2 / wave4 and wave4 / wave5 low checks of WaveAnalyzer.find_impulsive_wave
+    :return: (skips, nodes, values), skips is a (paths x hops) array, nodes a (paths x hops + 1) array of the pivot
+             indices and values a (paths x hops + 1) array of the values at the ends of the waves
+    """
+    capacity = 64
+    path_skips = np.empty((capacity, hops), dtype=np.int64)
+    path_nodes = np.empty((capacity, hops + 1), dtype=np.int64)
+    path_values = np.empty((capacity, hops + 1))
+    count = 0
+
+    skips = np.zeros(hops, dtype=np.int64)
+    nodes = np.zeros(hops + 1, dtype=np.int64)
+    values = np.full(hops + 1, np.nan)
+    limits = np.zeros(hops, dtype=np.int64)
+    nodes[0] = idx_start
+    limits[0] = distinct_skips(first_end[first_indptr[idx_start]:],
+                               min(up_to, first_indptr[idx_start + 1] - first_indptr[idx_start]))
+    skips[0] = -1
+    depth = 0
+
+    while depth >= 0:
+        skips[depth] += 1
+        skip = skips[depth]
+        if skip >= limits[depth]:
+            depth -= 1
+            continue
+
+        node = nodes[depth]
+        if depth % 2 == 0:
+            end = first_end[first_indptr[node] + skip]
+            values[depth + 1] = first_value[first_indptr[node] + skip]
+        else:
+            end = second_end[second_indptr[node] + skip]
+            values[depth + 1] = second_value[second_indptr[node] + skip]
+        nodes[depth + 1] = end
+
+        if impulse_checks and depth == 3 and not check_wave2_wave4(lows_min, values[2], nodes[2], end):
+            continue
+
+        if impulse_checks and depth == 4 and not check_wave4_wave5(lows_min, lows_max, values[4], nodes[4], end):
+            continue
+
+        if depth == hops - 1:
+            if count == capacity:
+                capacity *= 2
+                grown_skips = np.empty((capacity, hops), dtype=np.int64)
+                grown_skips[:count] = path_skips
+                path_skips = grown_skips
+                grown_nodes = np.empty((capacity, hops + 1), dtype=np.int64)
+                grown_nodes[:count] = path_nodes
+                path_nodes = grown_nodes
+                grown_values = np.empty((capacity, hops + 1))
+                grown_values[:count] = path_values
+                path_values = grown_values
+            path_skips[count] = skips
+            path_nodes[count] = nodes
+            path_values[count] = values
+            count += 1
+            continue
+
+        depth += 1
+        skips[depth] = -1
+        if depth % 2 == 0:
+            degree = first_indptr[end + 1] - first_indptr[end]
+            limits[depth] = distinct_skips(first_end[first_indptr[end]:], min(degree, up_to if skip != 0 else 1))
+        else:
+            degree = second_indptr[end + 1] - second_indptr[end]
+            limits[depth] = distinct_skips(second_end[second_indptr[end]:], min(degree, up_to if skip != 0 else 1))
+
+    return path_skips[:count].copy(), path_nodes[:count].copy(), path_values[:count].copy()
+
+
+IMPULSE = 0
+LEADING_DIAGONAL = 1
+
+
+@njit(cache=True)
+def _slope(x1: int, x2: int, y1: float, y2: float):
+    return (y2 - y1) / (x2 - x1)
+
+
+@njit(cache=True)
+def impulse_conditions(rule: int, depth: int, low: np.array, high: np.array, idx_start: np.array, idx_end: np.array):
+    """
+    Compiled version of the conditions of the Impulse (rule = IMPULSE) and LeadingDiagonal (rule = LEADING_DIAGONAL)
+    WaveRules which become decidable with wave [depth], see WaveRule.conditions_at. Has to be kept in sync with
+    models/WaveRules.py.
+
+    :param low: lows of wave1 .. wave[depth], index 0 is wave1
+    :return: True if all these conditions are fulfilled
+    """
+    length = np.abs(high[:depth] - low[:depth])
+    duration = idx_end[:depth] - idx_start[:depth]
+
+    if depth == 2:
+        return (low[1] > low[0]
+                and length[1] >= 0.2 * length[0]
+                and 9 * duration[1] > duration[0])
+
+    if depth == 3:
+        return (high[2] > high[0]
+                and length[2] >= length[0] / 3.0
+                and length[2] > length[1]
+                and 7 * duration[2] > duration[0])
+
+    if depth == 4:
+        if rule == IMPULSE:
+            return low[3] > high[0] and length[3] > length[1] / 3.0
+
+        slope_13 = _slope(idx_end[0], idx_end[2], high[0], high[2])
+        return (_slope(idx_end[1], idx_end[3], low[1], low[3]) > slope_13 and slope_13 > 0
+                and low[3] < high[0]
+                and length[3] > length[1] / 3.0)
+
+    if depth == 5:
+        fulfilled = (not (length[2] < length[4] and length[2] < length[0])
+                     and high[2] < high[4]
+                     and length[4] < 2.0 * length[0])
+        if rule == IMPULSE:
+            return fulfilled
+
+        return fulfilled and length[4] > 0.70 * length[0] and length[4] < length[2]
+
+    return True
+
+
+@njit(cache=True)
+def ladder_final(lows_arr: np.array, highs_arr: np.array, values: np.array, indices: np.array, valid: np.array,
+                 limit: int, up: bool, pivots: tuple):
+    """
+    True if the first limit entries of a skip ladder cannot change when candles are appended: no end reaches the last
+    candle and the first invalid entry, if any, is not invalid for lack of data (next_hi / next_lo found a candle
+    beyond the previous end, but the range check failed).
+
+    :param up: ladder of hi_ladder, lo_ladder otherwise
+    :return:
+    """
+    last_idx = len(lows_arr) - 1
+    for skip in range(limit):
+        if not valid[skip]:
+            if up:
+                value, _ = next_hi_indexed(lows_arr, highs_arr, indices[skip - 1], values[skip - 1], pivots)
+            else:
+                value, _ = next_lo_indexed(lows_arr, highs_arr, indices[skip - 1], values[skip - 1], pivots)
+            return value is not None
+        if indices[skip] >= last_idx:
+            return False
+    return True
+
+
+@njit(nogil=True, cache=True)
+def impulse_scan(lows_arr: np.array, highs_arr: np.array, idx_start: int, up_to: int, rules: np.array,
+                 lows_min: tuple, lows_max: tuple, highs_max: tuple, pivots: tuple, final: np.array = None):
+    """
+    Complete impulse search in compiled code: walks all WaveOptions of a WaveOptionsGenerator5(up_to) depth-first,
+    builds the waves from skip ladders, applies the low checks of WaveAnalyzer.find_impulsive_wave and the
+    conditions of the given rules. A node is pruned as soon as no rule can be fulfilled anymore, skips repeating the
+    wave of the skip before are left out (see distinct_skips).
+
+    :param rules: rule ids (IMPULSE, LEADING_DIAGONAL) to check
+    :param lows_min: min range table of the lows
+    :param lows_max: max range table of the lows
+    :param highs_max: max range table of the highs
+    :param pivots: pivot index (run_end_hi, run_end_lo, highs_max, lows_min)
+    :param final: optional array of one bool, set to False if the result may change when candles are appended, i.e.
+                  a ladder of the search is not final (see ladder_final)
+    :return: (options, nodes, matches) of the patterns fulfilling at least one rule in sorted WaveOptions order.
+             options is a (hits x 5) array of skips, nodes a (hits x 6) array of the wave start / end indices and
+             matches a (hits x rules) boolean array. Releases the GIL, so scans from several starts can run in threads.
+    """
+    hops = 5
+    n_rules = len(rules)
+    capacity = 64
+    hit_options = np.empty((capacity, hops), dtype=np.int64)
+    hit_nodes = np.empty((capacity, hops + 1), dtype=np.int64)
+    hit_matches = np.empty((capacity, n_rules), dtype=np.bool_)
+    count = 0
+
+    ladder_values = np.empty((hops, up_to))
+    ladder_indices = np.empty((hops, up_to), dtype=np.int64)
+    ladder_valid = np.empty((hops, up_to), dtype=np.bool_)
+    alive = np.ones((hops + 1, n_rules), dtype=np.bool_)
+
+    skips = np.zeros(hops, dtype=np.int64)
+    limits = np.zeros(hops, dtype=np.int64)
+    nodes = np.zeros(hops + 1, dtype=np.int64)
+    low = np.zeros(hops)
+    high = np.zeros(hops)
+
+    nodes[0] = idx_start
+    values, indices, valid = hi_ladder(lows_arr, highs_arr, idx_start, up_to - 1, lows_max, pivots)
+    ladder_values[0], ladder_indices[0], ladder_valid[0] = values, indices, valid
+    limits[0] = distinct_skips(indices, up_to)
+    skips[0] = -1
+    depth = 0
+    if final is not None:
+        final[0] = ladder_final(lows_arr, highs_arr, values, indices, valid, limits[0], True, pivots)
+
+    while depth >= 0:
+        skips[depth] += 1
+        skip = skips[depth]
+        if skip >= limits[depth] or not ladder_valid[depth, skip]:
+            depth -= 1
+            continue
+
+        end = ladder_indices[depth, skip]
+        nodes[depth + 1] = end
+        if depth % 2 == 0:
+            low[depth], high[depth] = lows_arr[nodes[depth]], ladder_values[depth, skip]
+        else:
+            low[depth], high[depth] = ladder_values[depth, skip], highs_arr[nodes[depth]]
+
+        if depth == 3 and not check_wave2_wave4(lows_min, low[1], nodes[2], end):
+            continue
+
+        if depth == 4 and not check_wave4_wave5(lows_min, lows_max, low[3], nodes[4], end):
+            continue
+
+        any_alive = False
+        for r in range(n_rules):
+            alive[depth + 1, r] = alive[depth, r] and impulse_conditions(rules[r], depth + 1, low, high,
+                                                                         nodes[:hops], nodes[1:])
+            any_alive = any_alive or alive[depth + 1, r]
+        if not any_alive:
+            continue
+
+        if depth == hops - 1:
+            if count == capacity:
+                capacity *= 2
+                grown_options = np.empty((capacity, hops), dtype=np.int64)
+                grown_options[:count] = hit_options
+                hit_options = grown_options
+                grown_nodes = np.empty((capacity, hops + 1), dtype=np.int64)
+                grown_nodes[:count] = hit_nodes
+                hit_nodes = grown_nodes
+                grown_matches = np.empty((capacity, n_rules), dtype=np.bool_)
+                grown_matches[:count] = hit_matches
+                hit_matches = grown_matches
+            hit_options[count] = skips
+            hit_nodes[count] = nodes
+            hit_matches[count] = alive[hops]
+            count += 1
+            continue
+
+        depth += 1
+        skips[depth] = -1
+        if depth % 2 == 0:
+            values, indices, valid = hi_ladder(lows_arr, highs_arr, end, up_to - 1, lows_max, pivots)
+        else:
+            values, indices, valid = lo_ladder(lows_arr, highs_arr, end, up_to - 1, highs_max, pivots)
+        ladder_values[depth], ladder_indices[depth], ladder_valid[depth] = values, indices, valid
+        limits[depth] = distinct_skips(indices, up_to if skip != 0 else 1)
+        if final is not None and final[0]:
+            final[0] = ladder_final(lows_arr, highs_arr, values, indices, valid, limits[depth], depth % 2 == 0,
+                                    pivots)
+
+    return hit_options[:count].copy(), hit_nodes[:count].copy(), hit_matches[:count].copy()
+
+
+@njit(cache=True)
+def _mix64(x):
+    """
+    splitmix64 finalizer, spreads the bits of x over the whole word
+    """
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return x ^ (x >> np.uint64(31))
+
+
+@njit(cache=True)
+def bloom_add(bits: np.array, nodes: np.array, n_hashes: int, insert: bool = True):
+    """
+    Adds the rows of nodes (wave indices of patterns) to a Bloom filter, one row after the other, so duplicates within
+    nodes are detected as well.
+
+    :param bits: uint64 words of the filter
+    :param nodes: (patterns x indices) int array
+    :param n_hashes: number of bits per row (double hashing)
+    :param insert: False only looks the rows up without adding them
+    :return: bool array, True for the rows which were not in the filter before
+    """
+    n_bits = np.uint64(len(bits) * 64)
+    new = np.zeros(len(nodes), dtype=np.bool_)
+    for row in range(len(nodes)):
+        h1 = np.uint64(len(nodes[row]))
+        for node in nodes[row]:
+            h1 = _mix64(h1 ^ np.uint64(node))
+        h2 = _mix64(h1 ^ np.uint64(0x9e3779b97f4a7c15)) | np.uint64(1)
+
+        for i in range(n_hashes):
+            bit = (h1 + np.uint64(i) * h2) % n_bits
+            word, offset = bit >> np.uint64(6), bit & np.uint64(63)
+            if not bits[word] & (np.uint64(1) << offset):
+                new[row] = True
+                if not insert:
+                    break
+                bits[word] |= np.uint64(1) << offset
+    return new
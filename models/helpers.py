@@ -1,44 +1,68 @@
 from models.WavePattern import WavePattern
 import pandas as pd
-import time
 import plotly.graph_objects as go
 import os
 import random
 import string
 
 
-def timeit(func):
-    def wrapper(*arg, **kw):
-
-        t1 = time.perf_counter_ns()
-        res = func(*arg, **kw)
-        t2 = time.perf_counter_ns()
-        print("took:", t2-t1, 'ns')
-        return res
-    return wrapper
-
-
-def plot_cycle(df, wave_cycle, title: str = ''):
-
-    data = go.Ohlc(x=df['Date'],
+def ohlc_trace(df: pd.DataFrame) -> go.Ohlc:
+    return go.Ohlc(x=df['Date'],
                    open=df['Open'],
                    high=df['High'],
                    low=df['Low'],
                    close=df['Close'])
 
-    monowaves = go.Scatter(x=wave_cycle.dates,
-                           y=wave_cycle.values,
-                           text=wave_cycle.labels,
-                           mode='lines+markers+text',
-                           textposition='middle right',
-                           textfont=dict(size=15, color='#2c3035'),
-                           line=dict(
-                               color=('rgb(111, 126, 130)'),
-                               width=3),
-                           )
-    layout = dict(title=title)
-    fig = go.Figure(data=[data, monowaves], layout=layout)
+
+def wave_trace(dates, values, labels=None, name: str = None, color: str = 'rgb(111, 126, 130)') -> go.Scatter:
+    return go.Scatter(x=dates,
+                      y=values,
+                      text=labels,
+                      name=name,
+                      mode='lines+markers+text',
+                      textposition='middle right',
+                      textfont=dict(size=15, color='#2c3035'),
+                      line=dict(
+                          color=color,
+                          width=3),
+                      )
+
+
+def chart_points(wave) -> tuple:
+    """
+    :param wave: MonoWave, WavePattern or WaveCycle
+    :return: (dates, values, labels) of the line drawn for wave, labels are None for a MonoWave
+    """
+    if hasattr(wave, 'values'):
+        return list(wave.dates), list(wave.values), list(wave.labels)
+    return list(wave.dates), list(wave.points), None
+
+
+def chart_figure(df: pd.DataFrame, traces: list, title: str = '') -> go.Figure:
+    fig = go.Figure(data=[ohlc_trace(df), *traces], layout=dict(title=title))
     fig.update(layout_xaxis_rangeslider_visible=False)
+    return fig
+
+
+def write_figure(fig: go.Figure, path: str):
+    """
+    Writes fig by the suffix of path: .html (plotly.js from the CDN), .json or an image via kaleido, e.g. .png
+
+    :param fig:
+    :param path:
+    :return:
+    """
+    suffix = os.path.splitext(path)[1]
+    if suffix == '.html':
+        fig.write_html(path, include_plotlyjs='cdn')
+    elif suffix == '.json':
+        fig.write_json(path)
+    else:
+        fig.write_image(path)
+
+
+def plot_cycle(df, wave_cycle, title: str = ''):
+    fig = chart_figure(df, [wave_trace(*chart_points(wave_cycle))], title)
 
     save_chart_as_image(fig)
     #fig.show()
@@ -68,49 +92,14 @@ def convert_yf_data(df: pd.DataFrame) -> pd.DataFrame:
     return df_output
 
 def plot_pattern(df: pd.DataFrame, wave_pattern: WavePattern, title: str = ''):
-    data = go.Ohlc(x=df['Date'],
-                   open=df['Open'],
-                   high=df['High'],
-                   low=df['Low'],
-                   close=df['Close'])
-
-    monowaves = go.Scatter(x=wave_pattern.dates,
-                           y=wave_pattern.values,
-                           text=wave_pattern.labels,
-                           mode='lines+markers+text',
-                           textposition='middle right',
-                           textfont=dict(size=15, color='#2c3035'),
-                           line=dict(
-                               color=('rgb(111, 126, 130)'),
-                               width=3),
-                           )
-    layout = dict(title=title)
-    fig = go.Figure(data=[data, monowaves], layout=layout)
-    fig.update(layout_xaxis_rangeslider_visible=False)
+    fig = chart_figure(df, [wave_trace(*chart_points(wave_pattern))], title)
 
     save_chart_as_image(fig)
     #fig.show()
 
 
 def plot_monowave(df, monowave, title: str = ''):
-    data = go.Ohlc(x=df['Date'],
-                   open=df['Open'],
-                   high=df['High'],
-                   low=df['Low'],
-                   close=df['Close'])
-
-    monowaves = go.Scatter(x=monowave.dates,
-                           y=monowave.points,
-                           mode='lines+markers+text',
-                           textposition='middle right',
-                           textfont=dict(size=15, color='#2c3035'),
-                           line=dict(
-                               color=('rgb(111, 126, 130)'),
-                               width=3),
-                           )
-    layout = dict(title=title)
-    fig = go.Figure(data=[data, monowaves], layout=layout)
-    fig.update(layout_xaxis_rangeslider_visible=False)
+    fig = chart_figure(df, [wave_trace(*chart_points(monowave))], title)
 
     save_chart_as_image(fig)
     # fig.show()
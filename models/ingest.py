@@ -0,0 +1,94 @@
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+import os
+
+# Conversion of lows, highs and dates to the numpy arrays used by WaveAnalyzer, MonoWave and the compiled functions.
+# Inputs whose dtype already fits are not copied: numpy arrays, pandas columns (to_numpy), Arrow arrays without nulls
+# and .npy files, which are memory-mapped instead of read.
+
+
+def as_array(values, dtype=None) -> np.ndarray:
+    """
+    contiguous numpy array of values, a view of values if possible
+
+    :param values: numpy array, pandas Series / Index, (chunked) Arrow array, list or path of a .npy file
+    :param dtype: dtype of the array, None keeps the dtype of values
+    :return:
+    """
+    if isinstance(values, (str, os.PathLike)):
+        values = np.load(values, mmap_mode='r')
+
+    elif isinstance(values, (pd.Series, pd.Index)):
+        values = values.to_numpy(dtype=dtype, copy=False)
+
+    elif hasattr(values, 'combine_chunks'):
+        # pyarrow.ChunkedArray, only a single chunk can be viewed without copying
+        values = values.chunk(0) if values.num_chunks == 1 else values.combine_chunks()
+
+    if hasattr(values, 'to_numpy') and not isinstance(values, np.ndarray):
+        # pyarrow.Array, zero-copy for numeric and timestamp arrays without nulls
+        values = values.to_numpy(zero_copy_only=False)
+
+    # also turns a np.memmap into a plain ndarray view of the mapped file
+    return np.ascontiguousarray(values, dtype=dtype)
+
+
+def open_column(values):
+    """
+    numpy array which can be sliced without loading it, e.g. to read a long history window by window: .npy files are
+    memory-mapped and numpy arrays are returned as they are, even if not contiguous (e.g. a field of a structured
+    array). Other inputs are converted by as_array.
+
+    :param values: see as_array
+    :return:
+    """
+    if isinstance(values, (str, os.PathLike)):
+        return np.load(values, mmap_mode='r')
+    if isinstance(values, np.ndarray):
+        return values
+    return as_array(values)
+
+
+def as_prices(values) -> np.ndarray:
+    """
+    :param values: lows or highs, see as_array
+    :return: float64 array
+    """
+    return as_array(values, np.float64)
+
+
+def as_dates(values) -> np.ndarray:
+    """
+    Dates as datetime64 or int64 (e.g. epoch seconds), both are kept without copying. ISO strings, e.g. the Date
+    column of a csv file, and Timestamps are parsed once into datetime64, timezone aware dates are converted to UTC.
+    Other labels cannot be parsed and are kept as they are.
+
+    :param values: see as_array
+    :return:
+    """
+    dates = as_array(values)
+    if dates.dtype.kind == 'M':
+        return dates
+    if dates.dtype.kind in 'iu':
+        return dates.astype(np.int64, copy=False)
+    if dates.dtype.kind not in 'OUS':
+        return dates
+
+    try:
+        parsed = pd.to_datetime(dates, format='ISO8601')
+    except (ValueError, TypeError):
+        return dates
+    if parsed.tz is not None:
+        parsed = parsed.tz_convert(None)
+    return parsed.to_numpy()
+
+
+def format_date(date) -> str:
+    """
+    :param date: element of an array of as_dates
+    :return: ISO string without the trailing zeros of the time, e.g. '2020-01-02', or the int as string
+    """
+    if isinstance(date, np.datetime64):
+        return np.datetime_as_string(date, unit='auto')
+    return str(date)
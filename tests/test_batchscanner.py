@@ -0,0 +1,50 @@
+from models.BatchScanner import BatchScanner, scan_file, warm_up, HIT_COLUMNS, RULES
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WaveRules import Impulse
+import models.functions
+import pandas as pd
+import pytest
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_scan_file_finds_the_hits_of_the_wave_analyzer():
+    path = os.path.join(DATA_DIR, 'aapl_1d_2020.csv')
+    hits = scan_file(path, ('impulse', 'correction'), up_to=4)
+
+    wa = WaveAnalyzer(df=pd.read_csv(path))
+    expected = list()
+    for idx_start in wa.pivot_index.swing_lows:
+        for wave_options, waves in wa.find_impulsive_waves(int(idx_start), up_to=4, rules=[Impulse('impulse')]):
+            expected.append((wave_options.values, [waves[0].idx_start] + [wave.idx_end for wave in waves]))
+
+    found = [(options, nodes) for rule, options, nodes in zip(hits['rule'], hits['options'], hits['nodes'])
+             if rule == 'impulse']
+    assert sorted(found) == sorted(expected)
+    assert set(hits['symbol']) == {'aapl_1d_2020'}
+    assert all(len(nodes) == 4 for rule, nodes in zip(hits['rule'], hits['nodes']) if rule == 'correction')
+
+
+def test_warm_up_compiles_the_kernels_of_scan_file():
+    warm_up()
+    kernels = [kernel for kernel in vars(models.functions).values() if hasattr(kernel, 'signatures')]
+    signatures = [len(kernel.signatures) for kernel in kernels]
+
+    scan_file(os.path.join(DATA_DIR, 'btc-usd_1d.csv'), tuple(RULES), up_to=4)
+    assert [len(kernel.signatures) for kernel in kernels] == signatures
+
+
+def test_write_hits_as_parquet_and_arrow(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    hits = pd.DataFrame(scan_file(os.path.join(DATA_DIR, 'btc-usd_1d.csv'), ('impulse', 'correction'), up_to=4))
+    assert list(hits.columns) == HIT_COLUMNS
+
+    BatchScanner.write(hits, str(tmp_path / 'hits.parquet'))
+    BatchScanner.write(hits, str(tmp_path / 'hits.arrow'))
+
+    for table in [pq.read_table(tmp_path / 'hits.parquet'), pa.ipc.open_file(tmp_path / 'hits.arrow').read_all()]:
+        assert table.num_rows == len(hits)
+        assert table.column('options').to_pylist() == hits['options'].tolist()
@@ -0,0 +1,21 @@
+from benchmarks.run_benchmarks import compare, measure, timed, bench_waveoptions_generator
+import time
+
+
+def test_compare_reports_regressions_beyond_tolerance():
+    result = measure(bench_waveoptions_generator, repeat=1)
+    assert result['unit'] == 'options' and result['throughput'] > 0
+
+    baseline = {'a': {'seconds': 1.0, 'peak_bytes': 2**30}, 'b': {'seconds': 1.0, 'peak_bytes': 2**30}}
+    results = {'a': {'seconds': 1.2, 'peak_bytes': 2**30}, 'b': {'seconds': 2.0, 'peak_bytes': 2**31},
+               'c': {'seconds': 5.0, 'peak_bytes': 0}}
+
+    regressions = compare(results, baseline, tolerance=0.3)
+    assert len(regressions) == 2 and all(regression.startswith('b:') for regression in regressions)
+
+
+def test_tiny_benchmarks_are_repeated_for_the_minimal_duration():
+    runs, setups = [], []
+    seconds = timed(lambda: runs.append(time.sleep(1e-3)), lambda: setups.append(None), min_seconds=0.05)
+    assert len(runs) == len(setups) > 1
+    assert 1e-3 <= seconds < 0.05
@@ -0,0 +1,38 @@
+from models.ChartRenderer import ChartRenderer
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WavePattern import WavePattern
+import pandas as pd
+import json
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_rendered_charts_show_the_submitted_patterns(tmp_path):
+    df = pd.read_csv(os.path.join(DATA_DIR, 'btc-usd_1d.csv'))
+    wa = WaveAnalyzer(df=df)
+    patterns = [WavePattern(waves) for _, waves in wa.find_impulsive_waves(idx_start=0, up_to=3)][:3]
+    assert len(patterns) == 3
+
+    with ChartRenderer(df, directory=str(tmp_path), format='json', workers=2) as renderer:
+        for i, pattern in enumerate(patterns):
+            renderer.submit(pattern, title=str(i))
+    paths = renderer.wait()
+    assert len(paths) == 3
+
+    for i, (path, pattern) in enumerate(zip(paths, patterns)):
+        with open(path) as file:
+            figure = json.load(file)
+        assert figure['layout']['title']['text'] == str(i)
+        assert len(figure['data'][0]['x']) == len(df)
+        assert figure['data'][1]['y'] == list(pattern.values)
+        assert figure['data'][1]['text'] == list(pattern.labels)
+
+    path = renderer.overlay(patterns, 'overlay.html')
+    assert os.path.getsize(path) > 0
+
+    with open(renderer.overlay(patterns, 'overlay.json')) as file:
+        figure = json.load(file)
+    assert figure['layout']['showlegend']
+    assert [trace['name'] for trace in figure['data'][1:]] == ['0', '1', '2']
+    assert len({trace['line']['color'] for trace in figure['data'][1:]}) == 3
@@ -0,0 +1,35 @@
+from models.ChunkedScanner import ChunkedScanner
+from models.WaveAnalyzer import WaveAnalyzer
+import numpy as np
+import pandas as pd
+import warnings
+
+
+def test_chunked_scan_matches_scan_of_the_whole_history(tmp_path):
+    # rounded prices have many ties, which make MonoWaves depend on candles far behind a window
+    rng = np.random.default_rng(1)
+    closes = np.round(100 + np.cumsum(rng.normal(0, 1, 5000)))
+    df = pd.DataFrame({'Date': np.arange(5000).astype('datetime64[m]'),
+                       'Low': closes - np.round(rng.random(5000)),
+                       'High': closes + np.round(rng.random(5000))})
+    np.save(tmp_path / 'ohlc.npy', df.to_records(index=False))
+
+    wa = WaveAnalyzer(df=df)
+    options, nodes, matches = wa.scan_impulsive_waves_from(wa.pivot_index.swing_lows, up_to=4, workers=1)
+
+    for window, max_span in [(333, 15), (1000, None)]:
+        scanner = ChunkedScanner.from_npy(tmp_path / 'ohlc.npy', window=window, up_to=4, max_span=max_span)
+        assert len(scanner.windows()) == -(-5000 // window)
+
+        assert scanner.max_span <= window
+        keep = nodes[:, -1] - nodes[:, 0] <= scanner.max_span
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            chunked = scanner.scan_impulsive_waves(workers=1)
+        assert keep.sum() > 0
+        # the longer patterns of a window are counted, the ones reaching behind its records are not found
+        assert (scanner.dropped > 0) == (len(keep) > keep.sum())
+        assert scanner.dropped <= len(keep) - keep.sum()
+        assert len(caught) == (scanner.dropped > 0)
+        for expected, result in zip([options[keep], nodes[keep], matches[keep]], chunked):
+            assert np.array_equal(expected, result)
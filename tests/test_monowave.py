@@ -1,4 +1,10 @@
-from models.MonoWave import MonoWaveUp
+from models.MonoWave import MonoWaveUp, MonoWaveDown
+from models.MonoWaveGraph import MonoWaveGraph
+from models.WavePattern import WavePattern
+from models.WaveRules import Impulse
+from models.functions import hi, lo, next_hi, next_lo, hi_ladder, lo_ladder
+from models.RangeIndex import RangeIndex
+from models.PivotIndex import PivotIndex
 import numpy as np
 
 
@@ -9,4 +15,91 @@ def test_monowave_instance_is_created():
 
     monowave_up = MonoWaveUp(lows, highs, dates, 0)
 
-    assert isinstance(monowave_up, MonoWaveUp)
\ No newline at end of file
+    assert isinstance(monowave_up, MonoWaveUp)
+
+def test_skip_ladder_matches_find_end():
+    rng = np.random.default_rng(7)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 300))
+    lows = closes - rng.random(300)
+    highs = closes + rng.random(300)
+    dates = np.arange(300)
+
+    for idx_start in [0, 10, 50, 120]:
+        values, indices, valid = hi_ladder(lows, highs, idx_start, 10)
+        for skip in range(11):
+            monowave_up = MonoWaveUp(lows, highs, dates, idx_start, skip=skip)
+            if valid[skip]:
+                assert (monowave_up.high, monowave_up.high_idx) == (values[skip], indices[skip])
+            else:
+                assert monowave_up.high_idx is None
+
+        values, indices, valid = lo_ladder(lows, highs, idx_start, 10)
+        for skip in range(11):
+            monowave_down = MonoWaveDown(lows, highs, dates, idx_start, skip=skip)
+            if valid[skip]:
+                assert (monowave_down.low, monowave_down.low_idx) == (values[skip], indices[skip])
+            else:
+                assert monowave_down.low_idx is None
+
+
+def test_range_index_matches_slices():
+    rng = np.random.default_rng(3)
+    lows = rng.normal(size=500)
+    highs = lows + rng.random(500)
+    range_index = RangeIndex(lows, highs)
+
+    for start, stop in rng.integers(0, 500, size=(500, 2)):
+        if start < stop:
+            assert range_index.min_low(start, stop) == np.min(lows[start:stop])
+            assert range_index.max_low(start, stop) == np.max(lows[start:stop])
+            assert range_index.max_high(start, stop) == np.max(highs[start:stop])
+
+    dates = np.arange(500)
+    for idx_start in [0, 10, 50, 120]:
+        for skip in range(8):
+            monowave_down = MonoWaveDown(lows, highs, dates, idx_start, skip=skip)
+            indexed = MonoWaveDown(lows, highs, dates, idx_start, skip=skip, range_index=range_index)
+            assert (monowave_down.low, monowave_down.low_idx) == (indexed.low, indexed.low_idx)
+
+
+def test_pivot_index_matches_linear_scans():
+    rng = np.random.default_rng(11)
+    closes = np.round(100 + np.cumsum(rng.normal(0, 1, 400)))
+    lows = closes - np.round(rng.random(400))
+    highs = closes + np.round(rng.random(400))
+    pivot_index = PivotIndex(lows, highs)
+
+    for idx_start in range(399):
+        high, high_idx = hi(lows, highs, idx_start)
+        low, low_idx = lo(lows, highs, idx_start)
+        assert pivot_index.hi(idx_start) == (high, high_idx)
+        assert pivot_index.lo(idx_start) == (low, low_idx)
+        assert pivot_index.next_hi(high_idx, high) == next_hi(lows, highs, high_idx, high)
+        assert pivot_index.next_lo(low_idx, low) == next_lo(lows, highs, low_idx, low)
+
+
+def test_monowave_table_views_match_monowaves():
+    rng = np.random.default_rng(11)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 300))
+    lows = closes - rng.random(300)
+    highs = closes + rng.random(300)
+    dates = np.arange(300)
+
+    graph = MonoWaveGraph(lows, highs, dates, max_skip=3)
+    idx_start = int(np.argmin(lows[:50]))
+    monowaves = [MonoWaveUp, MonoWaveDown, MonoWaveUp, MonoWaveDown, MonoWaveUp]
+    table = graph.monowave_table(graph.impulse_paths(idx_start, 4), monowaves)
+    patterns = [waves for _, waves in graph.impulses(idx_start, 4)]
+
+    assert table.number_of_patterns == len(patterns) > 0
+    assert not hasattr(patterns[0][0], '__dict__')
+
+    for i, waves in enumerate(patterns):
+        views = table.pattern(i)
+        for wave, view in zip(waves, views):
+            for attribute in ['low', 'high', 'low_idx', 'high_idx', 'idx_start', 'idx_end', 'length', 'duration',
+                              'dates', 'points', 'skip_n', 'degree']:
+                assert getattr(view, attribute) == getattr(wave, attribute)
+
+        assert WavePattern(views).values == WavePattern(waves).values
+        assert WavePattern(views).check_rule(Impulse('impulse')) == WavePattern(waves).check_rule(Impulse('impulse'))
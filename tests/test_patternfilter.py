@@ -0,0 +1,54 @@
+from models.PatternFilter import PatternFilter
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WavePattern import WavePattern, pattern_key
+import numpy as np
+import pandas as pd
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_patterns_are_identified_by_their_wave_indices():
+    wa = WaveAnalyzer(df=pd.read_csv(os.path.join(DATA_DIR, 'btc-usd_1d.csv')))
+    idx_start = int(np.argmin(wa.lows))
+    patterns = [WavePattern(waves) for _, waves in wa.find_impulsive_waves(idx_start=idx_start, up_to=6)]
+    # equal patterns built again from the same waves
+    patterns += [WavePattern(list(pattern.waves.values())) for pattern in patterns[::2]]
+    unique = {pattern.nodes for pattern in patterns}
+    assert len(unique) < len(patterns)
+    assert len(set(patterns)) == len(unique)
+    assert pattern_key((0, 1, 2)) != pattern_key((0, 0, 1, 2))
+
+    # exact, only the Bloom filter, and switching from exact to the Bloom filter during the scan
+    for exact_limit in [2**20, 0, len(unique) // 2]:
+        pattern_filter = PatternFilter(capacity=10**4, exact_limit=exact_limit)
+        assert [pattern_filter.add(pattern) for pattern in patterns] == \
+               [pattern.nodes not in {other.nodes for other in patterns[:i]} for i, pattern in enumerate(patterns)]
+        assert len(pattern_filter) == len(unique) and all(pattern in pattern_filter for pattern in patterns)
+        assert pattern_filter.exact == (exact_limit >= len(unique))
+
+
+def test_pattern_filter_deduplicates_scan_results():
+    wa = WaveAnalyzer(df=pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv')))
+    _, nodes, _ = wa.scan_impulsive_waves_from(wa.pivot_index.swing_lows, up_to=6)
+    nodes = np.concatenate([nodes, nodes[::-1]])
+
+    pattern_filter = PatternFilter(capacity=10**5, exact_limit=0)
+    new = pattern_filter.add_nodes(nodes)
+    _, first = np.unique(nodes, axis=0, return_index=True)
+    assert np.array_equal(np.flatnonzero(new), np.sort(first))
+    assert not pattern_filter.add_nodes(nodes).any()
+
+
+def test_bloom_filter_is_sized_for_capacity_and_error_rate():
+    pattern_filter = PatternFilter(capacity=10**4, error_rate=1e-3, exact_limit=0)
+    assert pattern_filter.n_hashes == 10
+    assert pattern_filter.nbytes <= 10**4 * 1.44 * 10 / 8 + 8
+
+    rng = np.random.default_rng(0)
+    nodes = np.unique(rng.integers(0, 2**20, (2 * 10**4, 6)), axis=0)
+    rng.shuffle(nodes)
+    pattern_filter.add_nodes(nodes[:10**4])
+    # new patterns taken for seen ones at capacity
+    false_positives = np.mean([row in pattern_filter for row in nodes[10**4:]])
+    assert false_positives < 3e-3
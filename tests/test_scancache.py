@@ -0,0 +1,53 @@
+from models.ScanCache import ScanCache
+from models.WaveAnalyzer import WaveAnalyzer
+import numpy as np
+import pandas as pd
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_cached_scans_match_the_scan_after_appending_candles(tmp_path):
+    df = pd.read_csv(os.path.join(DATA_DIR, 'btc-usd_1d.csv'))
+    cache = ScanCache(tmp_path / 'scans.sqlite')
+
+    prefix = WaveAnalyzer(df=df.iloc[:-40], result_cache=cache)
+    prefix.scan_impulsive_waves_from(prefix.pivot_index.swing_lows, up_to=4)
+    prefix.scan_corrective_waves_from(prefix.pivot_index.swing_highs, up_to=4)
+    assert cache.misses == 2 and len(cache) == 2
+
+    # the final results of the prefix are reused, the other starts are scanned again
+    wa = WaveAnalyzer(df=df, result_cache=cache)
+    expected = WaveAnalyzer(df=df)
+    for search, idx_starts in [('scan_impulsive_waves_from', wa.pivot_index.swing_lows),
+                               ('scan_corrective_waves_from', wa.pivot_index.swing_highs)]:
+        result = getattr(expected, search)(idx_starts, up_to=4)
+        assert len(result[0]) > 0
+        for _ in range(2):
+            for cached, array in zip(getattr(wa, search)(idx_starts, up_to=4), result):
+                assert np.array_equal(cached, array)
+    assert cache.prefix_hits == 2 and cache.hits == 2
+    # the scans of the prefix were replaced
+    assert len(cache) == 2
+
+    # a cache reopened from the file evicts the least recently used scans
+    cache.close()
+    cache = ScanCache(tmp_path / 'scans.sqlite', max_bytes=0)
+    assert len(cache) == 2
+    cache.evict()
+    assert len(cache) == 0
+
+
+def test_scans_of_other_series_are_not_taken_for_prefixes(tmp_path):
+    df = pd.read_csv(os.path.join(DATA_DIR, 'btc-usd_1d.csv'))
+    cache = ScanCache(tmp_path / 'scans.sqlite')
+
+    for offset in [0, 10]:
+        wa = WaveAnalyzer(df=df.iloc[offset:offset + 100].reset_index(drop=True), result_cache=cache)
+        wa.scan_impulsive_waves_from(wa.pivot_index.swing_lows, up_to=3)
+    assert cache.misses == 2 and cache.prefix_hits == 0 and len(cache) == 2
+
+    # the longer series of the first one replaces its scan, the scan of the other series is kept
+    wa = WaveAnalyzer(df=df, result_cache=cache)
+    wa.scan_impulsive_waves_from(wa.pivot_index.swing_lows, up_to=3)
+    assert cache.prefix_hits == 1 and len(cache) == 2
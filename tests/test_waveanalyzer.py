@@ -0,0 +1,316 @@
+from models.WaveAnalyzer import WaveAnalyzer
+from models.Instrumentation import Instrumentation
+from models.WaveOptions import WaveOptionsGenerator5, WaveOptionsGenerator3
+from models.WavePattern import WavePattern
+from models.WaveRules import Impulse, LeadingDiagonal, Correction
+from models.ingest import format_date
+import numpy as np
+import pandas as pd
+import pytest
+import gc
+import json
+import os
+import tracemalloc
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def load_btc() -> pd.DataFrame:
+    return pd.read_csv(os.path.join(DATA_DIR, 'btc-usd_1d.csv'))
+
+
+def serial_impulses(wa: WaveAnalyzer, idx_start: int, up_to: int) -> list:
+    found = list()
+    for wave_options in WaveOptionsGenerator5(up_to).options_sorted:
+        waves = wa.find_impulsive_wave(idx_start=idx_start, wave_config=wave_options.values)
+        if waves:
+            found.append((wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves]))
+    return found
+
+
+def test_find_impulsive_waves_matches_serial_search():
+    df = load_btc()
+    wa = WaveAnalyzer(df=df)
+
+    for idx_start in [int(np.argmin(wa.lows)), 0, 17]:
+        found = [(wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves])
+                 for wave_options, waves in wa.find_impulsive_waves(idx_start=idx_start, up_to=6)]
+
+        assert found == serial_impulses(wa, idx_start, up_to=6)
+
+
+def test_monowave_graph_matches_serial_search():
+    df = load_btc()
+    wa = WaveAnalyzer(df=df)
+    graph = wa.monowave_graph(up_to=6)
+
+    for idx_start in [int(np.argmin(wa.lows)), 0, 17]:
+        found = [(wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves])
+                 for wave_options, waves in graph.impulses(idx_start=idx_start, up_to=6)]
+        assert found == serial_impulses(wa, idx_start, up_to=6)
+
+        found = [(wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves])
+                 for wave_options, waves in graph.corrections(idx_start=idx_start, up_to=6)]
+        expected = list()
+        for wave_options in WaveOptionsGenerator3(6).options_sorted:
+            waves = wa.find_corrective_wave(idx_start=idx_start, wave_config=wave_options.values)
+            if waves:
+                expected.append((wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves]))
+        assert found == expected
+
+
+def test_find_impulsive_waves_with_rules_prunes_only_failing_patterns():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+    wa = WaveAnalyzer(df=df)
+    rules = [Impulse('impulse'), LeadingDiagonal('leading diagonal')]
+
+    for idx_start in [int(np.argmin(wa.lows)), 5, 40]:
+        expected = [(wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves])
+                    for wave_options, waves in wa.find_impulsive_waves(idx_start=idx_start, up_to=6)
+                    if any(WavePattern(waves).check_rule(rule) for rule in rules)]
+
+        found = [(wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves])
+                 for wave_options, waves in wa.find_impulsive_waves(idx_start=idx_start, up_to=6, rules=rules)]
+
+        assert found == expected
+
+
+def test_scan_impulsive_waves_matches_find_impulsive_waves():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+    wa = WaveAnalyzer(df=df)
+    rules = [Impulse('impulse'), LeadingDiagonal('leading diagonal')]
+
+    for idx_start in [int(np.argmin(wa.lows)), 5, 40]:
+        options, nodes, matches = wa.scan_impulsive_waves(idx_start=idx_start, up_to=6, rules=rules)
+
+        expected = [(wave_options.values, [waves[0].idx_start] + [wave.idx_end for wave in waves],
+                     [WavePattern(waves).check_rule(rule) for rule in rules])
+                    for wave_options, waves in wa.find_impulsive_waves(idx_start=idx_start, up_to=6, rules=rules)]
+
+        assert [(list(options[i]), list(nodes[i]), list(matches[i])) for i in range(len(options))] == expected
+
+
+def test_scan_impulsive_waves_rejects_rules_unknown_to_compiled_code():
+    wa = WaveAnalyzer(df=load_btc())
+
+    class StrictImpulse(Impulse):
+        pass
+
+    with pytest.raises(TypeError):
+        wa.scan_impulsive_waves(idx_start=0, up_to=3, rules=[StrictImpulse('strict impulse')])
+    with pytest.raises(TypeError):
+        wa.scan_impulsive_waves(idx_start=0, up_to=3, rules=[Correction('correction')])
+    with pytest.raises(ValueError):
+        wa.scan_impulsive_waves(idx_start=0, up_to=3, rules=[Impulse('impulse', adaptive=True)])
+
+
+def test_scan_impulsive_waves_from_matches_serial_scans():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+    wa = WaveAnalyzer(df=df)
+    idx_starts = list(range(0, 300, 3))
+
+    serial = [wa.scan_impulsive_waves(idx_start=idx_start, up_to=6) for idx_start in idx_starts]
+    parallel = wa.scan_impulsive_waves_from(idx_starts=idx_starts, up_to=6, workers=4)
+
+    for serial_arrays, parallel_array in zip(zip(*serial), parallel):
+        assert np.array_equal(np.concatenate(serial_arrays), parallel_array)
+
+
+def test_next_cycle_matches_nested_search():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+    wa = WaveAnalyzer(df=df)
+    wa.set_combinatorial_limits(n_up=5, n_down=6)
+    impulse, correction = Impulse('impulse'), Correction('correction')
+
+    for idx_start in [40, 72, 100]:
+        expected = list()
+        for impulse_options in WaveOptionsGenerator5(5):
+            waves_up = wa.find_impulsive_wave(idx_start=idx_start, wave_config=impulse_options.values)
+            if not waves_up or not WavePattern(waves_up).check_rule(impulse):
+                continue
+            corrections = list()
+            for correction_options in WaveOptionsGenerator3(6):
+                waves_down = wa.find_corrective_wave(idx_start=waves_up[4].idx_end,
+                                                     wave_config=correction_options.values)
+                if waves_down and WavePattern(waves_down).check_rule(correction):
+                    corrections.append(WavePattern(waves_down).values)
+            if corrections:
+                expected.append(WavePattern(waves_up).values + corrections[-1])
+
+        wave_cycles = list(wa.next_cycle(idx_start))
+        assert [wave_cycle.values for wave_cycle in wave_cycles] == expected
+
+        for wave_cycle in wave_cycles:
+            # the tuples of the cycle are concatenated without changing the ones of its patterns
+            assert wave_cycle.labels == wave_cycle.wp_up.labels + wave_cycle.wp_down.labels
+            assert len(wave_cycle.wp_up.dates) == 10 and len(wave_cycle.dates) == 16
+            assert wave_cycle.start_idx == idx_start and wave_cycle.end_idx == wave_cycle.wp_down.idx_end
+        assert len(set(wave_cycles)) == len(wave_cycles)
+
+
+def test_saturated_skips_are_not_searched():
+    # rounded prices have many ties, after which a skip ladder stays at its end
+    rng = np.random.default_rng(6)
+    closes = np.round(100 + np.cumsum(rng.normal(0, 1, 400)))
+    df = pd.DataFrame({'Date': np.arange(400), 'Low': closes - np.round(rng.random(400)),
+                       'High': closes + np.round(rng.random(400))})
+    wa = WaveAnalyzer(df=df)
+    rules = [Impulse('impulse'), LeadingDiagonal('leading diagonal')]
+
+    for idx_start in wa.pivot_index.swing_lows[:10]:
+        serial = serial_impulses(wa, int(idx_start), up_to=6)
+        found = [(wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves])
+                 for wave_options, waves in wa.find_impulsive_waves(int(idx_start), up_to=6)]
+        # the same patterns in the same order, each found fewer times
+        assert {str(waves) for _, waves in found} == {str(waves) for _, waves in serial}
+        assert [result for result in serial if result in found] == found
+
+        graph = [wave_options.values for wave_options, _ in wa.monowave_graph(6).impulses(int(idx_start), 6)]
+        assert graph == [options for options, _ in found]
+
+    options, _, _ = wa.scan_impulsive_waves_from(wa.pivot_index.swing_lows, up_to=6, rules=rules)
+    expected = [wave_options.values for idx_start in wa.pivot_index.swing_lows
+                for wave_options, _ in wa.find_impulsive_waves(int(idx_start), up_to=6, rules=rules)]
+    assert [list(skips) for skips in options] == expected and len(expected) > 0
+
+
+def test_monowave_cache_shares_frozen_monowaves_and_evicts():
+    df = load_btc()
+    wa = WaveAnalyzer(df=df)
+    uncached = WaveAnalyzer(df=df, cache_bytes=0)
+    idx_start = int(np.argmin(wa.lows))
+
+    assert serial_impulses(wa, idx_start, up_to=4) == serial_impulses(uncached, idx_start, up_to=4)
+    assert len(uncached.monowave_cache) == 0
+    # MonoWaves and ladders are counted separately, a ladder is only built for a missing MonoWave
+    stats = wa.monowave_cache.stats
+    assert stats['monowave']['hits'] > 0 and stats['ladder']['hits'] > 0
+    assert 0 < stats['ladder']['misses'] < stats['monowave']['misses']
+    assert all(0 < stats[kind]['hit_rate'] < 1 for kind in ['monowave', 'ladder'])
+
+    wave = wa.find_impulsive_wave(idx_start=idx_start)[0]
+    assert wave is wa.find_impulsive_wave(idx_start=idx_start)[0]
+    try:
+        wave.high = 0
+        assert False, 'cached MonoWaves must be immutable'
+    except AttributeError:
+        pass
+
+    # a cap of a few entries evicts the least recently used MonoWaves, the results stay the same
+    small = WaveAnalyzer(df=df, cache_bytes=5 * wa.monowave_cache.sizeof((type(wave), 0, 0), wave))
+    assert serial_impulses(small, idx_start, up_to=4) == serial_impulses(uncached, idx_start, up_to=4)
+    assert small.monowave_cache.evictions['monowave'] > 0
+    assert small.monowave_cache.nbytes <= small.monowave_cache.max_bytes
+
+    wa.invalidate()
+    assert len(wa.monowave_cache) == 0 and wa.find_impulsive_wave(idx_start=idx_start)[0] is not wave
+
+
+def test_cache_bytes_caps_the_memory_of_monowaves_and_ladders():
+    rng = np.random.default_rng(0)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 20000))
+    df = pd.DataFrame({'Date': np.arange(20000), 'Low': closes - rng.random(20000),
+                       'High': closes + rng.random(20000)})
+    wa = WaveAnalyzer(df=df, cache_bytes=2**20)
+    list(wa.find_impulsive_waves(idx_start=0, up_to=2))
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for idx_start in wa.pivot_index.swing_lows[:1500]:
+            for _ in wa.find_impulsive_waves(int(idx_start), up_to=4):
+                pass
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    assert wa.monowave_cache.evictions['monowave'] > 0 and wa.monowave_cache.evictions['ladder'] > 0
+    assert retained < 1.25 * wa.monowave_cache.max_bytes
+
+
+def test_streaming_matches_analysis_of_the_whole_history():
+    rng = np.random.default_rng(5)
+    closes = np.round(100 + np.cumsum(rng.normal(0, 1, 200)))
+    df = pd.DataFrame({'Date': [str(i) for i in range(200)],
+                       'Low': closes - np.round(rng.random(200)),
+                       'High': closes + np.round(rng.random(200))})
+
+    wa = WaveAnalyzer(df=df.iloc[:40])
+    impulses = wa.watch_impulsive_waves(idx_start=3, up_to=5)
+    corrections = wa.watch_corrective_waves(idx_start=5, up_to=5)
+
+    for n in range(41, 201):
+        wa.append(df.iloc[n - 1])
+
+        if n % 20 == 0:
+            full = WaveAnalyzer(df=df.iloc[:n])
+            for live_search, search in [(impulses, full.find_impulsive_waves),
+                                        (corrections, full.find_corrective_waves)]:
+                expected = [(wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves])
+                            for wave_options, waves in search(live_search.idx_start, up_to=5)]
+                assert [(wave_options.values, [(wave.idx_start, wave.idx_end) for wave in waves])
+                        for wave_options, waves in live_search.patterns] == expected
+
+                for (_, waves), final in zip(live_search.patterns, live_search.final):
+                    assert final == all(wave.idx_end < n - 1 for wave in waves)
+
+            assert np.array_equal(wa.pivot_index.swing_lows, full.pivot_index.swing_lows)
+
+    assert len(impulses.final_patterns) > 0 and len(impulses.memo) > 0
+
+
+def test_instrumentation_records_stages_and_rule_conditions():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+    instrumentation = Instrumentation()
+    wa = WaveAnalyzer(df=df, instrumentation=instrumentation)
+    rules = [Impulse('impulse'), LeadingDiagonal('leading diagonal')]
+
+    idx_start = int(np.argmin(wa.lows))
+    found = [wave_options.values for wave_options, _ in wa.find_impulsive_waves(idx_start, up_to=5, rules=rules)]
+    assert found == [wave_options.values for wave_options, _ in
+                     WaveAnalyzer(df=df).find_impulsive_waves(idx_start, up_to=5, rules=rules)]
+
+    report = json.loads(instrumentation.to_json())
+    assert report['monowave']['count'] > report['monowave']['rejected'] > 0
+    assert report['wave2_wave4']['count'] > 0
+    assert 'impulse.w3_1' in report and 'leading diagonal.w2_0' in report
+    assert all(0 <= stage['rejection_rate'] <= 1 and stage['seconds'] >= 0 for stage in report.values())
+
+
+def test_instrumentation_keeps_the_verbose_output(capsys):
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+
+    outputs = list()
+    for instrumentation in [None, Instrumentation()]:
+        wa = WaveAnalyzer(df=df, verbose=True, instrumentation=instrumentation)
+        for idx_start in wa.pivot_index.swing_lows[:20]:
+            list(wa.find_impulsive_waves(int(idx_start), up_to=4))
+        outputs.append(capsys.readouterr().out)
+
+    assert 'Low of Wave 2 higher' in outputs[0] and 'Low of Wave 4 higher' in outputs[0]
+    assert outputs[1] == outputs[0]
+    assert instrumentation.stages['wave4_wave5'][1] == outputs[1].count('Low of Wave 4 higher')
+
+
+def test_from_arrays_uses_the_inputs_without_copying(tmp_path):
+    df = load_btc()
+    wa = WaveAnalyzer(df=df)
+    assert wa.dates.dtype.kind == 'M' and format_date(wa.dates[0]) == df['Date'][0]
+
+    lows, highs = df['Low'].to_numpy(), df['High'].to_numpy()
+    for path, values in [('lows.npy', lows), ('highs.npy', highs), ('dates.npy', wa.dates)]:
+        np.save(tmp_path / path, values)
+
+    from_series = WaveAnalyzer.from_arrays(df['Low'], df['High'], wa.dates)
+    assert np.shares_memory(from_series.lows, lows) and np.shares_memory(from_series.dates, wa.dates)
+
+    mapped = WaveAnalyzer.from_arrays(tmp_path / 'lows.npy', tmp_path / 'highs.npy', tmp_path / 'dates.npy')
+    assert not mapped.lows.flags.writeable  # memory-mapped
+
+    expected = [(wave_options.values, [(wave.idx_start, wave.idx_end, wave.date_end) for wave in waves])
+                for wave_options, waves in wa.find_impulsive_waves(idx_start=0, up_to=5)]
+    for other in [from_series, mapped]:
+        assert [(wave_options.values, [(wave.idx_start, wave.idx_end, wave.date_end) for wave in waves])
+                for wave_options, waves in other.find_impulsive_waves(idx_start=0, up_to=5)] == expected
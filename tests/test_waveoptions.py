@@ -0,0 +1,25 @@
+from models.WaveOptions import WaveOptions, WaveOptionsGenerator5, WaveOptionsGenerator3
+
+
+def brute_force_options(up_to: int, waves: int) -> list:
+    options = set()
+    for number in range(up_to ** waves):
+        skips = [number // up_to ** (waves - 1 - position) % up_to for position in range(waves)]
+        if 0 in skips:
+            first_zero = skips.index(0)
+            skips[first_zero:] = [0] * (waves - first_zero)
+        options.add(tuple(skips))
+    return sorted(options)
+
+
+def test_generators_yield_all_options_sorted():
+    for up_to in [1, 2, 4, 6]:
+        assert [tuple(options.values) for options in WaveOptionsGenerator5(up_to)] == brute_force_options(up_to, 5)
+        assert [tuple(options.values[:3]) for options in WaveOptionsGenerator3(up_to)] == brute_force_options(up_to, 3)
+        assert WaveOptionsGenerator5(up_to).number == len(brute_force_options(up_to, 5))
+
+
+def test_sorted_options_are_ordered_by_wave_options_lt():
+    options = WaveOptionsGenerator5(4).options_sorted
+    assert options == sorted(options)
+    assert all(isinstance(wave_options, WaveOptions) for wave_options in options)
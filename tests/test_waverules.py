@@ -0,0 +1,67 @@
+from models.WaveAnalyzer import WaveAnalyzer
+from models.WavePattern import WavePattern
+from models.PatternTable import PatternTable
+from models.WaveRules import Impulse, LeadingDiagonal, Correction, COST_SAMPLES
+from models.Instrumentation import Instrumentation
+import pandas as pd
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_check_batch_matches_check_rule():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+    wa = WaveAnalyzer(df=df)
+
+    impulses = [waves for _, waves in wa.find_impulsive_waves(idx_start=5, up_to=6)]
+    corrections = [waves for _, waves in wa.find_corrective_waves(idx_start=17, up_to=8)]
+
+    for rule, patterns in [(Impulse('impulse'), impulses),
+                           (LeadingDiagonal('leading diagonal'), impulses),
+                           (Correction('correction'), corrections)]:
+        rule_mask = rule.check_batch(PatternTable.from_waves(patterns))
+
+        for idx, waves in enumerate(patterns):
+            assert rule_mask.mask[idx] == WavePattern(waves).check_rule(rule)
+            for rule_name in rule_mask.failed_conditions(idx):
+                assert not rule.conditions[rule_name]['function'](*[WavePattern(waves).waves[wave] for wave in
+                                                                   rule.conditions[rule_name]['waves']])
+
+
+def test_adaptive_rules_reorder_conditions_without_changing_results(capsys):
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+    wa = WaveAnalyzer(df=df)
+    impulses = [waves for _, waves in wa.find_impulsive_waves(idx_start=5, up_to=6)]
+
+    for rule_class in [Impulse, LeadingDiagonal]:
+        rule, adaptive = rule_class('rule'), rule_class('rule', adaptive=True, adapt_every=50)
+        for waves in impulses:
+            assert WavePattern(waves).check_rule(adaptive) == WavePattern(waves).check_rule(rule)
+        assert sorted(adaptive.order) == sorted(rule.conditions)
+        assert sum(evaluations for evaluations, *_ in adaptive.statistics.values()) > 50
+
+        # a rule loading the profile evaluates the conditions in the same order
+        loaded = rule_class('rule')
+        loaded.load_profile(adaptive.profile())
+        adaptive.reorder()
+        assert loaded.order == adaptive.order
+
+        # verbose names the first violated condition in the learned order
+        rule_mask = loaded.check_batch(PatternTable.from_waves(impulses))
+        for idx, waves in enumerate(impulses):
+            capsys.readouterr()
+            if not WavePattern(waves, verbose=True).check_rule(loaded):
+                first = rule_mask.failed_conditions(idx)[0]
+                assert capsys.readouterr().out.strip().endswith(f'{first}: {loaded.conditions[first]["message"]}')
+
+
+def test_adaptive_rules_sample_the_cost_of_a_condition_at_most_cost_samples_times():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'aapl_1d_2020.csv'))
+    wa = WaveAnalyzer(df=df)
+    impulses = [waves for _, waves in wa.find_impulsive_waves(idx_start=5, up_to=6)]
+    assert len(impulses) > 0
+
+    adaptive = Impulse('impulse', adaptive=True)
+    for waves in impulses * (2 * COST_SAMPLES // len(impulses) + 1):
+        WavePattern(waves).check_rule(adaptive, instrumentation=Instrumentation())
+    assert max(samples for _, _, samples, _ in adaptive.statistics.values()) == COST_SAMPLES